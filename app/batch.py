@@ -0,0 +1,123 @@
+import glob
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app.pipeline import ObservationPipeline
+from app.manifest import BuildManifest
+
+# Pipeline "en caliente" de cada proceso worker (parser, normalizador y macros ya cargados)
+_WORKER_PIPELINE = None
+
+def _init_worker(pipeline_config):
+    global _WORKER_PIPELINE
+    _WORKER_PIPELINE = ObservationPipeline(verbose=False, **pipeline_config)
+
+def _process_document(input_path, output_dir):
+    start = time.perf_counter()
+    try:
+        return _WORKER_PIPELINE.process(input_path, output_dir)
+    except Exception as e:
+        return {
+            "documento": os.path.basename(input_path),
+            "estado": "ERROR",
+            "error": f"{type(e).__name__}: {e}",
+            "traza": traceback.format_exc(),
+            "segundos": round(time.perf_counter() - start, 4)
+        }
+
+class BatchRunner:
+    """
+    Procesa un directorio completo de observaciones en paralelo.
+
+    Cada documento deja sus archivos en output_dir/<nombre_documento>/ y al final
+    se escribe output_dir/resumen_lote.json con escenarios, fallos y tiempos.
+
+    Con incremental=True los documentos cuyas huellas no cambiaron desde la
+    última corrida (output_dir/manifest.json) se omiten y conservan sus salidas.
+    """
+    def __init__(self, input_dir, output_dir, param_path, cache_dir, workers=None, pattern="*.txt", incremental=True,
+                 max_scenarios=None, covering_strength=None, verification="reportar", collapse_duplicates=False,
+                 streaming=False, parquet=False, parquet_dataset=None, json_format=None, json_gzip=False):
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.pattern = pattern
+        self.incremental = incremental
+        self.pipeline_config = {"param_path": param_path, "cache_dir": cache_dir, "max_scenarios": max_scenarios,
+                                "covering_strength": covering_strength, "verification": verification,
+                                "collapse_duplicates": collapse_duplicates, "streaming": streaming,
+                                "parquet": parquet, "parquet_dataset": parquet_dataset,
+                                "json_format": json_format, "json_gzip": json_gzip}
+
+    def find_documents(self):
+        return sorted(glob.glob(os.path.join(self.input_dir, self.pattern)))
+
+    def run(self):
+        start = time.perf_counter()
+        documents = self.find_documents()
+        os.makedirs(self.output_dir, exist_ok=True)
+        print(f"📚 {len(documents)} documentos en {self.input_dir} ({self.workers} procesos)")
+
+        # Precalentamos las cachés (tablas LALR + macros) una sola vez antes de
+        # abrir el pool, así los workers solo leen de disco y no compiten al escribir.
+        pipeline = ObservationPipeline(verbose=False, **self.pipeline_config)
+
+        manifest = BuildManifest(os.path.join(self.output_dir, "manifest.json"))
+        results = []
+        pending = {}
+        for path in documents:
+            key = os.path.basename(path)
+            fingerprints = pipeline.fingerprints(path)
+            if self.incremental and manifest.is_fresh(key, fingerprints, self._document_output_dir(path)):
+                result = manifest.summary(key)
+                result["estado"] = "SIN_CAMBIOS"
+                results.append(result)
+            else:
+                pending[path] = fingerprints
+
+        if len(pending) < len(documents):
+            print(f"   ♻️ {len(documents) - len(pending)} documentos sin cambios (se reutilizan sus salidas)")
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.pipeline_config,)) as executor:
+            futures = {
+                executor.submit(_process_document, path, self._document_output_dir(path)): path
+                for path in pending
+            }
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if result["estado"] == "OK":
+                    path = futures[future]
+                    manifest.record(os.path.basename(path), pending[path], result)
+                icon = "✅" if result["estado"] == "OK" else "❌"
+                detail = f"{result['escenarios']} escenarios" if result["estado"] == "OK" else result["error"].splitlines()[0]
+                print(f"   {icon} {result['documento']}: {detail} ({result['segundos']}s)")
+
+        manifest.save()
+        results.sort(key=lambda r: r["documento"])
+        summary = self._summarize(results, time.perf_counter() - start)
+
+        with open(os.path.join(self.output_dir, "resumen_lote.json"), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        return summary
+
+    def _document_output_dir(self, input_path):
+        name = os.path.splitext(os.path.basename(input_path))[0]
+        return os.path.join(self.output_dir, name)
+
+    def _summarize(self, results, elapsed):
+        ok = [r for r in results if r["estado"] in ("OK", "SIN_CAMBIOS")]
+        failed = [r for r in results if r["estado"] == "ERROR"]
+        return {
+            "documentos": len(results),
+            "procesados": sum(1 for r in ok if r["estado"] == "OK"),
+            "sin_cambios": sum(1 for r in ok if r["estado"] == "SIN_CAMBIOS"),
+            "fallidos": len(failed),
+            "escenarios_totales": sum(r["escenarios"] for r in ok),
+            "segundos_totales": round(elapsed, 4),
+            "segundos_suma_documentos": round(sum(r["segundos"] for r in results), 4),
+            "detalle": results
+        }
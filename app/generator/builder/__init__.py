@@ -1 +1,2 @@
-from .core import ScenarioBuilder
\ No newline at end of file
+from .core import ScenarioBuilder
+from .verifier import ScenarioVerifier, VerificationSink
\ No newline at end of file
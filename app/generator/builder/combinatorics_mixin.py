@@ -1,13 +1,91 @@
 import itertools
 from app.generator.builder.logic_processor import LogicProcessor
+from app.generator.builder.covering import covering_array
+from app.models.domain import NODE_TYPES, node_get
 
 class CombinatoricsMixin:
     def __init__(self):
         if not hasattr(self, 'logic_processor'):
-            self.logic_processor = LogicProcessor()
+            self.logic_processor = LogicProcessor(getattr(self, 'linear_forms', None), getattr(self, 'leaf_index', None))
 
-    def _generate_ok_combinations(self, logic_block):
-        processor = getattr(self, 'logic_processor', LogicProcessor())
+    def _iter_ok_combinations(self, logic_block):
+        """Escenarios OK, uno a la vez: producto cartesiano de las opciones de cada bloque AND."""
+        component_options = self._cached_solutions("OK", logic_block, self._solve_ok_components)
+        return self._iter_combinations([component_options])
+
+    def _iter_nk_combinations(self, logic_block):
+        """Escenarios NK, uno a la vez: para cada bloque AND, el producto de sus modos de fallo."""
+        components = self._cached_solutions("NK", logic_block, self._solve_nk_components)
+        return self._iter_combinations(components)
+
+    def _cached_solutions(self, mode, logic_block, solver):
+        """
+        Las opciones resueltas de una condición solo dependen del nodo y de los
+        parámetros, así que se resuelven una vez por builder. Lo que se cachea son
+        las opciones por componente (pocas), nunca su producto cartesiano.
+        """
+        key = (id(logic_block), mode, id(self.parameters))
+        hit = self.solution_cache.get(key)
+        if hit is None or hit[0] is not logic_block:
+            hit = (logic_block, solver(logic_block))
+            self.solution_cache[key] = hit
+        return hit[1]
+
+    def _iter_combinations(self, products):
+        """
+        Recorre en orden la concatenación de varios productos cartesianos (cada uno
+        es una lista de listas de opciones) y entrega la fusión de cada combinación.
+        Con covering_strength (t) se reemplaza cada producto por un arreglo de
+        cobertura t-wise: cada alternativa y cada t-upla de alternativas de bloques
+        distintos aparece al menos una vez.
+        Si max_scenarios está definido y el total lo supera, entrega una muestra
+        determinista: índices equiespaciados sobre todo el espacio (siempre incluye
+        el primero, que es el "camino dorado").
+        """
+        spaces = [self._combination_space(options) for options in products]
+        total = sum(size for size, _, _ in spaces)
+
+        if self.max_scenarios is None or total <= self.max_scenarios:
+            for _, _, combos in spaces:
+                for combo in combos(): yield self._merge_combo(combo)
+            return
+
+        cap = max(0, self.max_scenarios)
+        for i in range(cap):
+            index = i * total // cap
+            for size, combo_at, _ in spaces:
+                if index < size: break
+                index -= size
+            yield self._merge_combo(combo_at(index))
+
+    def _combination_space(self, options):
+        """(tamaño, combinación por índice, iterador en orden) de un producto de opciones."""
+        strength = self.covering_strength
+        if strength and len(options) > strength:
+            rows = covering_array([len(opts) for opts in options], strength)
+            combo_at = lambda i: [options[c][v] for c, v in enumerate(rows[i])]
+            return len(rows), combo_at, lambda: (combo_at(i) for i in range(len(rows)))
+
+        size = 1
+        for opts in options: size *= len(opts)
+        return size, lambda i: self._decode_combo(i, options), lambda: itertools.product(*options)
+
+    def _decode_combo(self, index, options):
+        # Índice en base mixta: el último componente es el que varía más rápido (igual que itertools.product)
+        combo = []
+        for opts in reversed(options):
+            index, digit = divmod(index, len(opts))
+            combo.append(opts[digit])
+        combo.reverse()
+        return combo
+
+    def _merge_combo(self, combo):
+        merged_inputs = {}
+        for d in combo: merged_inputs.update(d)
+        return merged_inputs
+
+    def _solve_ok_components(self, logic_block):
+        processor = getattr(self, 'logic_processor', LogicProcessor(self.linear_forms, self.leaf_index))
         and_components = processor.flatten_logic(logic_block, "AND")
         component_options = []
         
@@ -24,25 +102,18 @@ class CombinatoricsMixin:
                 if inputs: solved_options.append(inputs)
             
             if solved_options: component_options.append(solved_options)
-        
-        all_combinations = []
-        for combo in itertools.product(*component_options):
-            merged_inputs = {}
-            for d in combo: merged_inputs.update(d)
-            all_combinations.append(merged_inputs)
-        return all_combinations
+        return component_options
 
     def _generate_nk_cases(self, cond_block, golden_inputs):
         """
         Genera casos negativos aplicando sabotaje sobre un 'Happy Path'.
         Garantiza contexto activo para evidenciar el fallo.
         """
-        # 1. Generamos Happy Path de referencia
-        ok_scenarios = self._generate_ok_combinations(cond_block)
-        reference_happy_input = ok_scenarios[0] if ok_scenarios else {}
+        # 1. Generamos Happy Path de referencia (solo el primero)
+        reference_happy_input = next(self._iter_ok_combinations(cond_block), {})
 
-        # 2. Generamos escenarios de ruptura
-        bad_scenarios = self._generate_nk_combinations(cond_block)
+        # 2. Generamos escenarios de ruptura (se consumen de a uno)
+        bad_scenarios = self._iter_nk_combinations(cond_block)
         
         for i, bad_inputs in enumerate(bad_scenarios):
             # 3. Construimos: Base + Contexto OK + Sabotaje
@@ -60,9 +131,9 @@ class CombinatoricsMixin:
         for k, v in bad_inputs.items():
             inputs[k] = v
 
-    def _generate_nk_combinations(self, logic_block):
-        processor = getattr(self, 'logic_processor', LogicProcessor())
-        nk_scenarios = []
+    def _solve_nk_components(self, logic_block):
+        processor = getattr(self, 'logic_processor', LogicProcessor(self.linear_forms, self.leaf_index))
+        nk_components = []
         and_components = processor.flatten_logic(logic_block, "AND")
         
         for comp in and_components:
@@ -74,11 +145,11 @@ class CombinatoricsMixin:
                 complex_handled = False
                 
                 # --- Sabotaje Proporcional (Sumas) ---
-                if isinstance(opt, dict) and "op" in opt:
-                    op = opt["op"]
+                if isinstance(opt, NODE_TYPES) and node_get(opt, "op") is not None:
+                    op = node_get(opt, "op")
                     if op in ["=", ">", "<", ">=", "<=", "≠"]:
-                        left_node = opt["left"]
-                        right_node = opt["right"]
+                        left_node = node_get(opt, "left")
+                        right_node = node_get(opt, "right")
                         pos_terms, neg_terms = [], []
                         processor.decompose_additive_expression(left_node, pos_terms, neg_terms)
                         
@@ -106,11 +177,9 @@ class CombinatoricsMixin:
                                 for p in pos_terms: self._smart_set_input(sabotage_input, p, v_pos)
                                 for n in neg_terms: self._smart_set_input(sabotage_input, n, 0)
                             
-                            elif op == "≠": # Forzar igualdad
-                                pass # Implementar si necesario
-                            
-                            elif op == "=": # Forzar diferencia
-                                pass # Implementar si necesario
+                            elif op in ["≠", "="]: # Forzar igualdad / diferencia
+                                preds = processor.extract_predicates(opt)
+                                sabotage_input = self.interval_solver.solve(preds, violate=True)
 
                             else: # Fallback a valor roto
                                 if pos_terms:
@@ -139,13 +208,9 @@ class CombinatoricsMixin:
                 
                 if current_opt_modes: options_failure_modes.append(current_opt_modes)
             
-            # Producto Cartesiano para romper ORs
-            if options_failure_modes:
-                for combo in itertools.product(*options_failure_modes):
-                    merged = {}
-                    for d in combo: merged.update(d)
-                    nk_scenarios.append(merged)
-        return nk_scenarios
+            # Producto Cartesiano para romper ORs (se recorre en _iter_combinations)
+            if options_failure_modes: nk_components.append(options_failure_modes)
+        return nk_components
 
     def _get_broken_value(self, op, ref_val):
         if isinstance(ref_val, float) and ref_val.is_integer(): ref_val = int(ref_val)
@@ -158,11 +223,11 @@ class CombinatoricsMixin:
         return None
 
     def _try_expand_complex_comparison(self, logic_node):
-        processor = getattr(self, 'logic_processor', LogicProcessor())
-        if isinstance(logic_node, dict) and "op" in logic_node:
-            op = logic_node["op"]
-            right = logic_node["right"]
-            left = logic_node.get("left")
+        processor = getattr(self, 'logic_processor', LogicProcessor(self.linear_forms, self.leaf_index))
+        if isinstance(logic_node, NODE_TYPES) and node_get(logic_node, "op") is not None:
+            op = node_get(logic_node, "op")
+            right = node_get(logic_node, "right")
+            left = node_get(logic_node, "left")
 
             if op in [">", ">="] and (right == 0 or right == "0"):
                  factors = []
@@ -183,35 +248,4 @@ class CombinatoricsMixin:
         return [logic_node]
 
     def _solve_for_true(self, predicates):
-        processor = getattr(self, 'logic_processor', LogicProcessor())
-        current_inputs = self.parameters.copy()
-        
-        for p in predicates:
-            if p['op'] in [">", ">=", "<", "<="]:
-                 all_vars = processor._extract_leaf_vars(p['right_tree'])
-                 if 'target' in p: all_vars.append(p['target'])
-                 for var in all_vars:
-                     if var not in current_inputs and (var.startswith("Vx") or var.startswith("C")):
-                         current_inputs[var] = 1000
-
-        for i in range(2): 
-            for p in predicates:
-                target = p['target']
-                op = p['op']
-                target_val = self.math_engine.evaluate(p['right_tree'], current_inputs)
-                new_val = current_inputs.get(target, 0)
-                
-                if op == ">": new_val = target_val + 1
-                elif op == ">=": new_val = target_val
-                elif op == "<": new_val = target_val - 1
-                elif op == "<=": new_val = target_val
-                elif op == "=": new_val = target_val
-                elif op == "IN": new_val = p['value'][0]
-                elif op == "≠": new_val = target_val + 1
-                
-                if op in [">", ">="] and new_val < 1000: new_val = 1000
-                if op in ["<", "<="] and new_val < 0: new_val = 0
-                if op == "=" and target_val == 0: new_val = 0
-
-                self._smart_set_input(current_inputs, target, new_val)
-        return {k: v for k, v in current_inputs.items() if k not in self.parameters}
\ No newline at end of file
+        return self.interval_solver.solve(predicates)
@@ -1,25 +1,63 @@
 from app.generator.math_engine import MathEngine
+from app.generator.linear_form import LinearFormCache
+from app.models.scenario_table import ScenarioTable
+from .leaf_index import LeafIndex
+from .interval_solver import IntervalSolver
 from .utils_mixin import BuilderUtilsMixin
 from .combinatorics_mixin import CombinatoricsMixin
 from .solvers_mixin import VariableSolverMixin
 from .norms_mixin import NormGeneratorMixin
 
 class ScenarioBuilder(BuilderUtilsMixin, CombinatoricsMixin, VariableSolverMixin, NormGeneratorMixin):
-    def __init__(self, logic_tree, parameters={}, macros={}):
+    def __init__(self, logic_tree, parameters={}, macros={}, max_scenarios=None, covering_strength=None,
+                 collapse_duplicates=False, retain_scenarios=True):
         self.logic_tree = logic_tree
         self.parameters = parameters
         self.macros = macros
-        self.math_engine = MathEngine(macros=self.macros)
-        self.scenarios = []
+        self.linear_forms = LinearFormCache()
+        self.math_engine = MathEngine(macros=self.macros, linear_forms=self.linear_forms)
+        self.scenarios = ScenarioTable()
+        # Destinos en streaming (ver add_sink). Sin retain_scenarios la tabla queda vacía y
+        # cada fila solo pasa por los sinks: lo único que crece con la suite es el conjunto
+        # de huellas de 16 bytes (una por escenario distinto) que cuenta los duplicados.
+        self.sinks = []
+        self.retain_scenarios = retain_scenarios
+        self.case_count = 0
         self.case_id = 11467
         self.var_definitions = self._map_variable_definitions()
+        # Hojas y raíces de cada nodo, calculadas una sola vez para todo el árbol
+        self.leaf_index = LeafIndex(self.var_definitions).annotate(self.logic_tree)
+        # Solver de intervalos para los predicados de cada opción (casos OK y sabotajes NK)
+        self.interval_solver = IntervalSolver(self.math_engine, self.linear_forms, self.leaf_index,
+                                              self.parameters, self._smart_set_input)
+        self.dependency_graphs = {}     # id(bloque) -> (bloque, VariableDependencyGraph)
+        # Tope de escenarios por condición (None = sin tope). Al superarlo se muestrea.
+        if max_scenarios is not None and max_scenarios < 1:
+            raise ValueError(f"max_scenarios debe ser al menos 1 (se recibió {max_scenarios})")
+        self.max_scenarios = max_scenarios
+        # Cobertura t-wise entre bloques AND en vez del producto completo (None = producto; 2 = pairwise)
+        self.covering_strength = covering_strength
+        self.solution_cache = {}        # (id(condición), "OK"/"NK", id(parámetros)) -> (condición, escenarios)
+        # Huellas canónicas (blake2b de 16 bytes de tipo, resultado y entradas filtradas).
+        # Solo al fundir duplicados en memoria hace falta saber la fila de cada huella;
+        # en los demás casos basta el conjunto de huellas para contar los repetidos.
+        self.case_index = {}            # huella -> fila en self.scenarios (solo collapse_duplicates)
+        self.case_digests = set()
+        self.duplicate_count = 0
+        # Con collapse_duplicates los escenarios repetidos se funden en la primera fila (se unen descripciones)
+        self.collapse_duplicates = collapse_duplicates
+
+    def add_sink(self, sink):
+        """Conecta un ScenarioSink: recibe cada escenario apenas se genera."""
+        self.sinks.append(sink)
+        return sink
 
     def build_suite(self):
         """Genera la suite completa de pruebas"""
         
         # 1. Condición de Entrada
         cond_block = self._find_section("Condicion_Entrada")
-        ok_scenarios_inputs = self._generate_ok_combinations(cond_block)
+        ok_scenarios_inputs = self._iter_ok_combinations(cond_block)
         
         golden_inputs = {} 
         for i, inputs in enumerate(ok_scenarios_inputs):
@@ -0,0 +1,65 @@
+import itertools
+from functools import lru_cache
+
+def covering_array(sizes, strength=2):
+    """
+    Arreglo de cobertura t-wise (greedy, determinista).
+
+    sizes: cantidad de alternativas de cada componente (ej: opciones OR de cada bloque AND).
+    Retorna una tupla de filas (tuplas de índices, una posición por componente) tal que
+    toda combinación de valores de cualquier grupo de `strength` componentes aparece en
+    al menos una fila. Con strength=2 es pairwise: cada alternativa y cada par de
+    alternativas de componentes distintos se ejercita, sin el producto completo.
+
+    La primera fila es siempre (0, 0, ..., 0), el "camino dorado".
+
+    El arreglo depende solo de (sizes, strength): se calcula una vez por forma y se
+    reutiliza en cada recorrido (por eso es una tupla, que nadie puede modificar).
+    """
+    return _covering_array(tuple(sizes), strength)
+
+@lru_cache(maxsize=256)
+def _covering_array(sizes, strength):
+    n = len(sizes)
+    if any(size == 0 for size in sizes): return ()
+    if n <= strength:
+        return tuple(itertools.product(*[range(size) for size in sizes]))
+
+    groups = list(itertools.combinations(range(n), strength))
+    uncovered = set()
+    for group in groups:
+        for values in itertools.product(*[range(sizes[c]) for c in group]):
+            uncovered.add((group, values))
+
+    # Grupos que incluyen a cada componente (para contar cobertura al fijarlo)
+    groups_by_component = {c: [g for g in groups if c in g] for c in range(n)}
+
+    rows = []
+    row = tuple(0 for _ in sizes)
+    while True:
+        covered = {(g, tuple(row[c] for c in g)) for g in groups}
+        uncovered -= covered
+        rows.append(row)
+        if not uncovered: break
+        row = _greedy_row(min(uncovered), sizes, groups_by_component, uncovered)
+    return tuple(rows)
+
+def _greedy_row(seed, sizes, groups_by_component, uncovered):
+    # Se parte fijando la primera tupla sin cubrir; el resto de los componentes
+    # toma, en orden, el valor que cubre más tuplas nuevas (empate: el menor índice).
+    group, values = seed
+    row = [None] * len(sizes)
+    for c, v in zip(group, values): row[c] = v
+
+    for c in range(len(sizes)):
+        if row[c] is not None: continue
+        best_value, best_gain = 0, -1
+        for v in range(sizes[c]):
+            row[c] = v
+            gain = 0
+            for g in groups_by_component[c]:
+                if any(row[x] is None for x in g): continue
+                if (g, tuple(row[x] for x in g)) in uncovered: gain += 1
+            if gain > best_gain: best_value, best_gain = v, gain
+        row[c] = best_value
+    return tuple(row)
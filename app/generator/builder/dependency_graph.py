@@ -0,0 +1,122 @@
+import heapq
+from app.models.domain import NODE_TYPES
+
+class VariableDependencyGraph:
+    """
+    Grafo de dependencias de un bloque de Variables: qué variables lee cada
+    instrucción (directamente o a través de macros globales).
+
+    - order: orden topológico estable (ante empates se respeta el orden del
+      archivo, así que un bloque ya ordenado se evalúa igual que antes).
+    - evaluate(): evalúa el bloque completo sobre un contexto.
+    - recompute(): dado un contexto base ya evaluado y un contexto nuevo,
+      reevalúa solo las variables afectadas por las entradas que cambiaron.
+
+    Si hay variables definidas dos veces o ciclos, el grafo no es confiable:
+    se usa el orden del archivo y recompute() evalúa todo (valid = False).
+    """
+    def __init__(self, block, math_engine):
+        self.math_engine = math_engine
+        instr_list = block if isinstance(block, list) else [block]
+        self.instructions = [item for item in instr_list if "target" in item]
+        self.targets = [item["target"] for item in self.instructions]
+        self.valid = len(set(self.targets)) == len(self.targets)
+
+        self.target_set = target_set = set(self.targets)
+        self.reads = {}
+        for item in self.instructions:
+            self.reads[item["target"]] = self._collect_reads(item["logic"])
+
+        # Aristas: variable leída -> variables que la leen
+        self.readers = {target: [] for target in self.targets}
+        for target, names in self.reads.items():
+            for name in names & target_set:
+                self.readers[name].append(target)
+
+        self.order = self._topological_order() if self.valid else None
+        if self.order is None:
+            self.valid = False
+            self.order = list(self.instructions)
+
+    def _collect_reads(self, logic):
+        names = set()
+        pending = [logic]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, str):
+                name = node.strip()
+                names.add(name)
+                if name in self.math_engine.macros:
+                    names.update(self.math_engine.macro_dependencies(name))
+            elif isinstance(node, NODE_TYPES):
+                pending.extend(v for k, v in node.items() if k not in ("op", "function", "type"))
+            elif isinstance(node, list):
+                pending.extend(node)
+        return names
+
+    def _topological_order(self):
+        position = {target: i for i, target in enumerate(self.targets)}
+        pending_deps = {target: len(self.reads[target] & self.target_set) for target in self.targets}
+        ready = [position[t] for t in self.targets if pending_deps[t] == 0]
+        heapq.heapify(ready)
+
+        order = []
+        while ready:
+            item = self.instructions[heapq.heappop(ready)]
+            order.append(item)
+            for reader in self.readers[item["target"]]:
+                pending_deps[reader] -= 1
+                if pending_deps[reader] == 0: heapq.heappush(ready, position[reader])
+
+        # Ciclo: quedaron variables sin resolver
+        if len(order) != len(self.instructions): return None
+        return order
+
+    def affected(self, changed_names):
+        """Variables cuyo valor puede cambiar si cambian changed_names (clausura transitiva)."""
+        if not self.valid: return set(self.targets)
+        affected = {t for t in self.targets if self.reads[t] & changed_names}
+        pending = list(affected)
+        while pending:
+            for reader in self.readers[pending.pop()]:
+                if reader not in affected:
+                    affected.add(reader)
+                    pending.append(reader)
+        return affected
+
+    def evaluate(self, context_inputs):
+        return self._evaluate(context_inputs, None, None)
+
+    def recompute(self, base_context, base_results, new_context):
+        """
+        Resultado equivalente a evaluate(new_context), reutilizando base_results
+        (= evaluate(base_context)) para las variables no afectadas.
+        """
+        changed = self._changed_names(base_context, new_context)
+        return self._evaluate(new_context, self.affected(changed), base_results)
+
+    def _changed_names(self, base_context, new_context):
+        # Las variables del bloque no cuentan: siempre se recalculan antes de ser leídas
+        changed = set()
+        for name in base_context.keys() | new_context.keys():
+            if name in self.target_set: continue
+            a = base_context.get(name, 0)
+            b = new_context.get(name, 0)
+            if a != b or type(a) is not type(b): changed.add(name)
+        return changed
+
+    def _evaluate(self, context_inputs, affected, base_results):
+        results = {}
+        current_context = context_inputs.copy()
+        engine = self.math_engine
+        # Un solo memo de macros para todo el bloque: assign() invalida lo que dependa de cada resultado
+        with engine.memo_scope(current_context):
+            for item in self.order:
+                name = item["target"]
+                if affected is None or name in affected:
+                    val = engine.evaluate(item["logic"], current_context)
+                else:
+                    val = base_results[name]
+                results[name] = val
+                engine.assign(current_context, name, val)
+        return results
@@ -0,0 +1,250 @@
+import math
+from app.models.domain import NODE_TYPES, node_get
+
+INF = float("inf")
+
+# Negación de cada operador (modo "violar")
+NEGATED_OPS = {">": "<=", ">=": "<", "<": ">=", "<=": ">", "=": "≠", "≠": "=", "IN": "NOT IN"}
+
+# Monto que se elige dentro de un dominio sin tope superior (x > 0 -> 1000, como siempre en la suite)
+REPRESENTATIVE_AMOUNT = 1000
+
+class Interval:
+    """Dominio [lo, hi] de una variable (extremos inclusivos, pueden ser ±inf)."""
+    __slots__ = ("lo", "hi")
+
+    def __init__(self, lo=-INF, hi=INF):
+        self.lo = lo
+        self.hi = hi
+
+    def intersect(self, other):
+        return Interval(max(self.lo, other.lo), min(self.hi, other.hi))
+
+    def is_empty(self):
+        return self.lo > self.hi
+
+    def contains(self, value):
+        return self.lo <= value <= self.hi
+
+    def pick(self, avoid=None):
+        """
+        Valor representativo del dominio: el tope superior si lo hay (x < 100 -> 99),
+        si no el mayor entre el piso y REPRESENTATIVE_AMOUNT (x > P18 -> P18 + 1).
+        avoid (≠) toma el vecino inmediato del valor prohibido que quede dentro.
+        """
+        if avoid is not None:
+            for candidate in (avoid + 1, avoid - 1):
+                if self.contains(candidate): return candidate
+        if self.hi < INF: return self.hi
+        if self.lo > -INF: return max(self.lo, REPRESENTATIVE_AMOUNT)
+        return 0
+
+    @classmethod
+    def from_bound(cls, op, q):
+        """Valores enteros x que cumplen x <op> q (≠ no restringe el intervalo)."""
+        if op == ">": return cls(math.floor(q) + 1, INF)
+        if op == ">=": return cls(math.ceil(q), INF)
+        if op == "<": return cls(-INF, math.ceil(q) - 1)
+        if op == "<=": return cls(-INF, math.floor(q))
+        if op == "=": return cls(q, q)
+        return cls()
+
+class IntervalSolver:
+    """
+    Solver de dominios acotados para los predicados de LogicProcessor.extract_predicates.
+
+    Cada predicado "left_tree <op> right_tree" se lleva a una forma lineal
+    const + Σ coef * variable, expandiendo las macros lineales (DEP, REC7...) a
+    través de LinearFormCache, y se resuelve sobre su primera hoja de entrada real
+    (Vx / C que no sea parámetro). El dominio de esa variable es la intersección de
+    las cotas enteras de TODOS los predicados que la resuelven, con el residuo
+    right - (resto de los términos) como cota: una resta (C1 - C2 < 100) o una suma
+    con términos ya fijados queda bien resuelta. Los productos A * B > 0 se separan
+    en un predicado por factor. Es una sola pasada de propagación, en el orden de
+    los predicados, y el valor final es Interval.pick del dominio.
+
+    Si el lado izquierdo no es lineal sobre entradas (una macro condicional como
+    REX_2), el caso OK resuelve el líder del predicado y delega en assign, que
+    propaga variables calculadas a sus entradas. violate=True (casos NK) resuelve
+    la negación de los predicados y solo asigna entradas reales: un sabotaje que
+    no llega a ninguna entrada no se genera.
+    """
+    def __init__(self, math_engine, linear_forms, leaf_index, parameters, assign):
+        self.math_engine = math_engine
+        self.linear_forms = linear_forms
+        self.leaf_index = leaf_index
+        self.parameters = parameters
+        self.assign = assign        # (inputs, target, valor) -> delega en _smart_set_input
+
+    def solve(self, predicates, violate=False):
+        if violate:
+            predicates = [dict(p, op=NEGATED_OPS[p["op"]]) for p in predicates if p["op"] in NEGATED_OPS]
+        predicates = self._split_products(predicates)
+        current_inputs = self.parameters.copy()
+
+        # Variable a resolver de cada predicado (depende solo de la estructura)
+        plan = []
+        for p in predicates:
+            variable = self._input_leader(p)
+            if variable is None and not violate: variable = p["target"]
+            plan.append((p, variable))
+        by_variable = {}
+        for p, variable in plan:
+            if variable is not None: by_variable.setdefault(variable, []).append(p)
+
+        for p, variable in plan:
+            if variable is None: continue
+            value = self._choose(p, variable, by_variable, current_inputs)
+            if value is not None: self.assign(current_inputs, variable, value)
+
+        if violate: return {k: v for k, v in current_inputs.items() if self._is_input(k)}
+        return {k: v for k, v in current_inputs.items() if k not in self.parameters}
+
+    def _choose(self, p, variable, by_variable, current_inputs):
+        op = p["op"]
+        if op == "IN": return p["value"][0]
+        if op == "NOT IN": return max(p["value"]) + 1
+
+        right_val = self.math_engine.evaluate(p["right_tree"], current_inputs)
+        if not isinstance(right_val, (int, float)):
+            # Resultado no numérico (ej: "K" de M11): solo la igualdad tiene solución directa
+            return right_val if op == "=" else None
+
+        domain = self._base_domain(variable)
+        for q in by_variable[variable]:
+            domain = domain.intersect(self._bound(q, variable, current_inputs))
+
+        if domain.is_empty():
+            # Sin solución con el resto de los términos fijos: se liberan los términos
+            # libres que estorban y se vuelve a acotar solo con este predicado
+            self._release_free_terms(p, variable, current_inputs, by_variable)
+            domain = self._base_domain(variable).intersect(self._bound(p, variable, current_inputs))
+            if domain.is_empty(): domain = Interval()
+
+        avoid = self._residual(p, variable, current_inputs)[0] if op == "≠" else None
+        return domain.pick(avoid)
+
+    def _split_products(self, predicates):
+        # A * B > 0 (o >= 0): cada factor por separado. Negado (<= 0, < 0) basta con el primero.
+        result = []
+        for p in predicates:
+            factors = []
+            if p["op"] in [">", ">=", "<", "<="] and p["right_tree"] in (0, "0"):
+                self._flatten_product(p.get("left_tree"), factors)
+            if len(factors) < 2:
+                result.append(p)
+                continue
+            if p["op"] in ["<", "<="]: factors = factors[:1]
+            for factor in factors:
+                leaves = self.leaf_index.leaves(factor, "processor")
+                if leaves: result.append(dict(p, target=leaves[0], left_tree=factor))
+        return result
+
+    def _flatten_product(self, node, factors):
+        if isinstance(node, NODE_TYPES) and node_get(node, "op") == "*":
+            self._flatten_product(node_get(node, "left"), factors)
+            self._flatten_product(node_get(node, "right"), factors)
+        else:
+            factors.append(node)
+
+    def _is_input(self, name):
+        # Misma regla que _filter_inputs: Vx / C que no son parámetros (ni macros / variables calculadas)
+        if not (name.startswith("Vx") or name.startswith("C")): return False
+        return (name not in self.parameters and name not in self.math_engine.macros
+                and name not in self.leaf_index.var_definitions)
+
+    def _base_domain(self, var):
+        # Los montos de entrada (Vx / C) no son negativos
+        if var.startswith("Vx") or var.startswith("C"): return Interval(0, INF)
+        return Interval()
+
+    def _linear_form(self, p, right_val):
+        """Forma lineal del lado izquierdo, si acotar su líder es equivalente al predicado."""
+        left = p.get("left_tree", p["target"])
+        if not isinstance(left, (str, *NODE_TYPES)): return None
+        form = self.linear_forms.get(left)
+        if form.exact: return form
+        # POS(x) > r (r >= 0) equivale a x > r; POS(x) < r, = r, ≠ r (r > 0) equivalen a x < r, ...
+        if node_get(left, "function") != "POS" or not node_get(left, "args"): return None
+        inner = self.linear_forms.get(node_get(left, "args")[0])
+        if not inner.exact: return None
+        if p["op"] in [">", ">="] and right_val >= 0: return inner
+        if p["op"] in ["<", "<=", "=", "≠"] and right_val > 0: return inner
+        return None
+
+    def _expanded(self, p, right_val):
+        """
+        (coefs, const) del lado izquierdo con las macros lineales sustituidas por su
+        forma. Si una macro no es lineal se retorna la forma sin expandir, y None si
+        el lado izquierdo mismo no es lineal.
+        """
+        form = self._linear_form(p, right_val)
+        if form is None: return None
+        coefs = {}
+        const = self._expand_into(form, 1, coefs, frozenset())
+        if const is None: return dict(form.coefs), form.const
+        return coefs, const
+
+    def _expand_into(self, form, scale, coefs, seen):
+        const = scale * form.const
+        for name, coef in form.coefs.items():
+            if not coef: continue
+            body = self.math_engine.macros.get(name)
+            if body is None or name in seen:
+                coefs[name] = coefs.get(name, 0) + scale * coef
+                continue
+            inner = self.linear_forms.get(body)
+            if not inner.exact: return None
+            inner_const = self._expand_into(inner, scale * coef, coefs, seen | {name})
+            if inner_const is None: return None
+            const += inner_const
+        return const
+
+    def _input_leader(self, p):
+        """Primera entrada real de la forma expandida (None si no es lineal sobre entradas)."""
+        right_val = self.math_engine.evaluate(p["right_tree"], self.parameters.copy())
+        if not isinstance(right_val, (int, float)): return None
+        form = self._linear_form(p, right_val)
+        if form is None: return None
+        coefs = {}
+        if self._expand_into(form, 1, coefs, frozenset()) is None: return None
+        return next((name for name, coef in coefs.items() if coef and self._is_input(name)), None)
+
+    def _residual(self, p, variable, current_inputs):
+        """(q, coef) tal que el predicado equivale a coef * variable <op> q (q None si no es numérico)."""
+        right_val = self.math_engine.evaluate(p["right_tree"], current_inputs)
+        if not isinstance(right_val, (int, float)): return None, 0
+        expanded = self._expanded(p, right_val)
+        if expanded is None: return right_val, 1
+        coefs, rest = expanded
+        coef = coefs.get(variable, 0)
+        # La variable está dentro de un término no lineal: se acota contra right a secas
+        if coef == 0: return right_val, 1
+        for name, c in coefs.items():
+            if name == variable or not c: continue
+            value = self.math_engine.evaluate(name, current_inputs)
+            if not isinstance(value, (int, float)): return None, 0
+            rest += c * value
+        # Con coeficiente ±1 se evita la división para no convertir enteros en float
+        if coef in (1, -1): return (right_val - rest) * coef, coef
+        return (right_val - rest) / coef, coef
+
+    def _bound(self, p, variable, current_inputs):
+        q, coef = self._residual(p, variable, current_inputs)
+        if q is None: return Interval()
+        op = p["op"]
+        if coef < 0: op = {">": "<", ">=": "<=", "<": ">", "<=": ">="}.get(op, op)
+        return Interval.from_bound(op, q)
+
+    def _release_free_terms(self, p, variable, current_inputs, by_variable):
+        # Términos libres: entradas que no resuelve ningún predicado ni son parámetros
+        right_val = self.math_engine.evaluate(p["right_tree"], current_inputs)
+        if not isinstance(right_val, (int, float)): return
+        expanded = self._expanded(p, right_val)
+        if expanded is None: return
+        upper = p["op"] in ["<", "<="]
+        for name, coef in expanded[0].items():
+            if name == variable or name in by_variable or name in self.parameters: continue
+            if not (name.startswith("Vx") or name.startswith("C")): continue
+            # Cota superior: los términos positivos estorban; cota inferior: los negativos
+            if (upper and coef > 0) or (not upper and coef < 0): current_inputs[name] = 0
@@ -0,0 +1,87 @@
+from app.models.domain import NODE_TYPES, Node
+
+# Las dos variantes históricas de _extract_leaf_vars (se conservan tal cual):
+#  - "builder"   (BuilderUtilsMixin): omite también las claves type/section.
+#  - "processor" (LogicProcessor): solo omite op/function, y excluye menos palabras.
+LEAF_FLAVORS = {
+    "builder": (
+        ("op", "function", "type", "section"),
+        {"AND", "OR", "Y", "O", "POS", "MIN", "MAX", "SI", "NO", "SINO", "+", "-", "*", "/", "div", "mod"}
+    ),
+    "processor": (
+        ("op", "function"),
+        {"AND", "OR", "SI", "NO", "POS", "+", "-", "*", "/", "div", "mod"}
+    ),
+}
+
+class LeafIndex:
+    """
+    Índice de hojas por nodo: para cada sub-árbol guarda (una sola vez) sus
+    variables hoja en orden y sus raíces de entrada resueltas a través de
+    var_definitions. annotate() recorre un árbol completo de una pasada; los
+    nodos que no se anotaron (predicados sintéticos, macros) se indexan al
+    consultarlos por primera vez.
+
+    Las consultas retornan listas nuevas: los llamadores pueden modificarlas.
+    """
+    def __init__(self, var_definitions=None):
+        self.var_definitions = var_definitions or {}
+        self._leaves = {flavor: {} for flavor in LEAF_FLAVORS}
+        self._roots = {}
+
+    def annotate(self, tree):
+        for flavor in LEAF_FLAVORS: self._leaf_tuple(tree, flavor)
+        self._root_tuple(tree)
+        return self
+
+    def leaves(self, node, flavor="builder"):
+        return list(self._leaf_tuple(node, flavor))
+
+    def roots(self, node):
+        return list(self._root_tuple(node))
+
+    def _leaf_tuple(self, node, flavor):
+        if isinstance(node, str):
+            excluded = LEAF_FLAVORS[flavor][1]
+            if len(node) > 0 and node not in excluded:
+                if node.isalnum() or node.startswith("Vx") or "_" in node:
+                    return (node,)
+            return ()
+        if not isinstance(node, (*NODE_TYPES, list)): return ()
+
+        cache = self._leaves[flavor]
+        hit = cache.get(id(node))
+        if hit is not None and hit[0] is node: return hit[1]
+
+        found = []
+        if isinstance(node, list):
+            for item in node: found.extend(self._leaf_tuple(item, flavor))
+        elif isinstance(node, Node):
+            # Nodo del modelo: sus campos por atributo (items() sin pasar por el Mapping)
+            skip = LEAF_FLAVORS[flavor][0]
+            for k in node.KEYS:
+                if k in skip: continue
+                found.extend(self._leaf_tuple(getattr(node, k), flavor))
+        else:
+            skip = LEAF_FLAVORS[flavor][0]
+            for k, v in node.items():
+                if k in skip: continue
+                found.extend(self._leaf_tuple(v, flavor))
+        result = tuple(found)
+        cache[id(node)] = (node, result)
+        return result
+
+    def _root_tuple(self, node):
+        if isinstance(node, (*NODE_TYPES, list)):
+            hit = self._roots.get(id(node))
+            if hit is not None and hit[0] is node: return hit[1]
+
+        roots = []
+        for var in self._leaf_tuple(node, "builder"):
+            if var in self.var_definitions:
+                roots.extend(self._root_tuple(self.var_definitions[var]))
+            else:
+                roots.append(var)
+        result = tuple(roots)
+        if isinstance(node, (*NODE_TYPES, list)): self._roots[id(node)] = (node, result)
+        return result
@@ -1,9 +1,16 @@
+from app.generator.linear_form import LinearFormCache
+from app.generator.builder.leaf_index import LeafIndex
+from app.models.domain import NODE_TYPES, TREE_TYPES
+
 class LogicProcessor:
     """
     Cerebro Matemático: Analiza, descompone y extrae predicados del árbol lógico.
     Separa la lógica de 'entender la fórmula' de la lógica de 'generar combinaciones'.
     """
-    
+    def __init__(self, linear_forms=None, leaf_index=None):
+        self.linear_forms = linear_forms if linear_forms is not None else LinearFormCache()
+        self.leaf_index = leaf_index if leaf_index is not None else LeafIndex()
+
     def extract_predicates(self, block):
         """
         Versión 'Puertas Abiertas': Si no es un predicado terminal,
@@ -15,7 +22,7 @@ class LogicProcessor:
             for item in block: preds.extend(self.extract_predicates(item))
             return preds
         
-        if isinstance(block, dict):
+        if isinstance(block, NODE_TYPES):
             op = block.get("op")
             left = block.get("left")
             right = block.get("right")
@@ -32,24 +39,24 @@ class LogicProcessor:
 
             # --- CASO 2: Inversión (1 - Var > 0) ---
             if op in [">", ">="] and self._is_zero(right):
-                if isinstance(left, dict) and left.get("op") in ["-", "–"]:
+                if isinstance(left, NODE_TYPES) and left.get("op") in ["-", "–"]:
                     const_left = left.get("left")
                     var_right = left.get("right")
                     if self._is_positive_constant(const_left):
                         atoms = self._extract_leaf_vars(var_right)
                         if atoms:
-                            preds.append({"target": atoms[0], "op": "<", "right_tree": const_left, "value": [0]})
+                            preds.append({"target": atoms[0], "op": "<", "right_tree": const_left, "value": [0], "left_tree": var_right})
                             return preds
 
             # --- CASO 3: Predicados Terminales ---
             if op in [">", "<", ">=", "<=", "=", "≠", "IN"]:
                 if isinstance(left, str):
-                    preds.append({"target": left, "op": op, "right_tree": right, "value": [0]})
-                elif isinstance(left, dict):
+                    preds.append({"target": left, "op": op, "right_tree": right, "value": [0], "left_tree": left})
+                elif isinstance(left, NODE_TYPES):
                     atoms = self._extract_leaf_vars(left)
                     if atoms:
                         leader = atoms[0]
-                        preds.append({"target": leader, "op": op, "right_tree": right, "value": [0]})
+                        preds.append({"target": leader, "op": op, "right_tree": right, "value": [0], "left_tree": left})
                 # ¡IMPORTANTE! Aquí retornamos para NO recursar más sobre esto mismo
                 return preds
             
@@ -57,37 +64,17 @@ class LogicProcessor:
             # Si llegamos aquí, es porque no era un > o < terminal.
             # Entramos a explorar TODO lo que haya dentro.
             for k, v in block.items():
-                if isinstance(v, (dict, list)): 
+                if isinstance(v, TREE_TYPES): 
                     preds.extend(self.extract_predicates(v))
                     
         return preds
 
     def decompose_additive_expression(self, tree, pos_list, neg_list, current_sign=1):
         """Descompone sumas y restas en listas de términos positivos y negativos."""
-        if isinstance(tree, str):
-            if current_sign > 0: pos_list.append(tree)
-            else: neg_list.append(tree)
-            return
-            
-        if isinstance(tree, dict):
-            # Manejo de POS() wrapper (Crucial para MI)
-            if tree.get("function") == "POS":
-                 args = tree.get("args", [])
-                 if args: self.decompose_additive_expression(args[0], pos_list, neg_list, current_sign)
-                 return
-
-            if "op" in tree:
-                op = tree["op"]
-                if op == "+":
-                    if "terms" in tree:
-                        for term in tree["terms"]: 
-                            self.decompose_additive_expression(term, pos_list, neg_list, current_sign)
-                    else:
-                        self.decompose_additive_expression(tree.get("left"), pos_list, neg_list, current_sign)
-                        self.decompose_additive_expression(tree.get("right"), pos_list, neg_list, current_sign)
-                elif op in ["-", "–"]:
-                    self.decompose_additive_expression(tree.get("left"), pos_list, neg_list, current_sign)
-                    self.decompose_additive_expression(tree.get("right"), pos_list, neg_list, current_sign * -1)
+        # POS() es transparente (Crucial para MI). La forma lineal queda en caché por nodo.
+        for name, sign in self.linear_forms.get(tree, ("POS",)).terms:
+            if sign * current_sign > 0: pos_list.append(name)
+            else: neg_list.append(name)
 
     def flatten_logic(self, node, split_op):
         """Aplana estructuras lógicas anidadas (AND/OR)."""
@@ -98,7 +85,7 @@ class LogicProcessor:
             else: items.append(node)
             return items
             
-        if isinstance(node, dict):
+        if isinstance(node, NODE_TYPES):
             if "op" in node:
                 op = node["op"]
                 is_target_op = False
@@ -114,7 +101,7 @@ class LogicProcessor:
 
     def _flatten_multiplication(self, node, factors):
         """Descompone recursivamente A * B * C en una lista [A, B, C]."""
-        if isinstance(node, dict) and node.get("op") == "*":
+        if isinstance(node, NODE_TYPES) and node.get("op") == "*":
             self._flatten_multiplication(node["left"], factors)
             self._flatten_multiplication(node["right"], factors)
         else:
@@ -122,18 +109,7 @@ class LogicProcessor:
 
     def _extract_leaf_vars(self, node):
         """Extrae nombres de variables (hojas) de un sub-árbol."""
-        vars_found = []
-        if isinstance(node, str):
-            if len(node) > 0 and node not in ["AND", "OR", "SI", "NO", "POS", "+", "-", "*", "/", "div", "mod"]:
-                if node.isalnum() or node.startswith("Vx") or "_" in node:
-                    vars_found.append(node)
-        elif isinstance(node, list):
-            for item in node: vars_found.extend(self._extract_leaf_vars(item))
-        elif isinstance(node, dict):
-            for k, v in node.items():
-                if k in ["op", "function"]: continue
-                vars_found.extend(self._extract_leaf_vars(v))
-        return vars_found
+        return self.leaf_index.leaves(node, "processor")
 
     def _is_zero(self, val):
         return val == 0 or val == "0"
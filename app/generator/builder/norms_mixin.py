@@ -1,3 +1,5 @@
+from app.models.domain import NODE_TYPES, node_get
+
 class NormGeneratorMixin:
     def _generate_norm_cases(self, norm_block, full_context, vars_block):
         if not norm_block: return
@@ -14,7 +16,7 @@ class NormGeneratorMixin:
         condition_node = None
         calc_nodes = []
         for item in instr_list:
-            if isinstance(item, dict) and "op" in item and item["op"] in [">", "<", ">=", "<=", "=", "≠"]:
+            if isinstance(item, NODE_TYPES) and node_get(item, "op") in [">", "<", ">=", "<=", "=", "≠"]:
                 condition_node = item
             elif isinstance(item, dict) and "target" in item:
                 calc_nodes.append(item)
@@ -23,9 +25,9 @@ class NormGeneratorMixin:
             self._add_norm_result(rich_context, calc_nodes, "Norma Genérica", "Ejecución Estándar")
             return
 
-        op = condition_node["op"]
-        left_node = condition_node["left"]
-        right_node = condition_node["right"]
+        op = node_get(condition_node, "op")
+        left_node = node_get(condition_node, "left")
+        right_node = node_get(condition_node, "right")
         
         # Variaciones
         variations = self._generate_function_variations(right_node, rich_context)
@@ -43,6 +45,10 @@ class NormGeneratorMixin:
             ctx_variant = variant["context"]
             label_suffix = variant["label"]
             
+            # Base para el recálculo incremental de OK / NK / POS=0: las entradas de la variante
+            base_ctx = {**self._filter_inputs(ctx_variant), **self.parameters}
+            base_vars = None
+
             if label_suffix:
                 recalc_vars = self._calculate_variables(vars_block, ctx_variant)
                 ctx_variant = {**ctx_variant, **recalc_vars}
@@ -62,7 +68,8 @@ class NormGeneratorMixin:
                     inputs_ok[v] = rich_context[v]
 
             ctx_ok = {**inputs_ok, **self.parameters}
-            vars_ok = self._calculate_variables(vars_block, ctx_ok)
+            if base_vars is None: base_vars = self._calculate_variables(vars_block, base_ctx)
+            vars_ok = self._recalculate_variables(vars_block, base_ctx, base_vars, ctx_ok)
             full_ctx_ok = {**ctx_ok, **vars_ok}
             
             self._add_norm_result(full_ctx_ok, calc_nodes, "Norma OK", f"Borde Cumple {label_suffix} ({target_var}={val_ok} vs {right_val})")
@@ -77,7 +84,8 @@ class NormGeneratorMixin:
                     inputs_nk[v] = rich_context[v]
 
             ctx_nk = {**inputs_nk, **self.parameters}
-            vars_nk = self._calculate_variables(vars_block, ctx_nk)
+            if base_vars is None: base_vars = self._calculate_variables(vars_block, base_ctx)
+            vars_nk = self._recalculate_variables(vars_block, base_ctx, base_vars, ctx_nk)
             full_ctx_nk = {**ctx_nk, **vars_nk}
             
             self._add_norm_result(full_ctx_nk, calc_nodes, "Norma NK", f"Borde No Cumple {label_suffix} ({target_var}={val_nk} vs {right_val})", is_nk=True)
@@ -92,7 +100,8 @@ class NormGeneratorMixin:
                         inputs_pz[v] = rich_context[v]
                 
                 ctx_pz = {**inputs_pz, **self.parameters}
-                vars_pz = self._calculate_variables(vars_block, ctx_pz)
+                if base_vars is None: base_vars = self._calculate_variables(vars_block, base_ctx)
+                vars_pz = self._recalculate_variables(vars_block, base_ctx, base_vars, ctx_pz)
                 full_ctx_pz = {**ctx_pz, **vars_pz}
                 
                 self._add_norm_result(full_ctx_pz, calc_nodes, "Valida POS=0", f"Prueba Interna {label_suffix} (Forzando {target_var}=1)", is_nk=True)
@@ -103,8 +112,8 @@ class NormGeneratorMixin:
         seen_labels = set()
 
         for node in target_nodes:
-            fname = node["function"]
-            args = node["args"]
+            fname = node_get(node, "function")
+            args = node_get(node, "args")
             
             if fname in ["MAX", "MIN"]:
                 all_involved = []
@@ -164,11 +173,11 @@ class NormGeneratorMixin:
 
     def _find_all_function_nodes(self, node, function_names):
         found = []
-        if isinstance(node, dict):
-            if "function" in node and node["function"] in function_names:
+        if isinstance(node, NODE_TYPES):
+            if node_get(node, "function") in function_names:
                 found.append(node)
-            for k, v in node.items():
-                if isinstance(v, dict):
+            for v in node.values():
+                if isinstance(v, NODE_TYPES):
                     found.extend(self._find_all_function_nodes(v, function_names))
                 elif isinstance(v, list):
                     for item in v:
@@ -176,26 +185,12 @@ class NormGeneratorMixin:
         return found
 
     def _analyze_polarity(self, tree, current_sign=1):
+        # En la polaridad A * B hereda el signo a ambos factores
         pos_atoms = []
         neg_atoms = []
-        if isinstance(tree, str):
-            if current_sign > 0: pos_atoms.append(tree)
-            else: neg_atoms.append(tree)
-            return pos_atoms, neg_atoms
-        if isinstance(tree, dict) and "op" in tree:
-            op = tree["op"]
-            if op == "+":
-                p1, n1 = self._analyze_polarity(tree.get("left") or tree.get("terms")[0], current_sign)
-                p2, n2 = self._analyze_polarity(tree.get("right") or tree.get("terms")[1], current_sign)
-                pos_atoms += p1 + p2; neg_atoms += n1 + n2
-            elif op in ["-", "–"]:
-                p1, n1 = self._analyze_polarity(tree["left"], current_sign)
-                p2, n2 = self._analyze_polarity(tree["right"], current_sign * -1) 
-                pos_atoms += p1 + p2; neg_atoms += n1 + n2
-            elif op == "*":
-                p1, n1 = self._analyze_polarity(tree["left"], current_sign)
-                p2, n2 = self._analyze_polarity(tree["right"], current_sign)
-                pos_atoms += p1 + p2; neg_atoms += n1 + n2
+        for name, sign in self.linear_forms.get(tree, ("*",)).terms:
+            if sign * current_sign > 0: pos_atoms.append(name)
+            else: neg_atoms.append(name)
         return pos_atoms, neg_atoms
 
     def _resolve_roots(self, atoms):
@@ -213,12 +208,13 @@ class NormGeneratorMixin:
         else:
             results = []
             current_context = context
-            for item in calc_nodes:
-                name = item["target"]
-                val = self.math_engine.evaluate(item["logic"], current_context)
-                if isinstance(val, float) and val.is_integer(): val = int(val)
-                current_context[name] = val 
-                results.append(f"{name}={val}")
+            with self.math_engine.memo_scope(current_context):
+                for item in calc_nodes:
+                    name = item["target"]
+                    val = self.math_engine.evaluate(item["logic"], current_context)
+                    if isinstance(val, float) and val.is_integer(): val = int(val)
+                    self.math_engine.assign(current_context, name, val)
+                    results.append(f"{name}={val}")
             res_str = " ".join(results) if results else "Cumple"
 
         inputs_only = self._filter_inputs(context)
@@ -1,4 +1,7 @@
+import itertools
 from app.generator.sii_functions import SII_POS, SII_MIN, SII_MAX
+from app.models.domain import NODE_TYPES
+from app.generator.builder.dependency_graph import VariableDependencyGraph
 
 class VariableSolverMixin:
     def _generate_variable_cases(self, block, base_inputs):
@@ -11,9 +14,9 @@ class VariableSolverMixin:
             self._dispatch_logic_solver(target_name, logic, base_inputs, prefix="")
 
     def _dispatch_logic_solver(self, target_name, logic, base_inputs, prefix=""):
-        if isinstance(logic, dict) and "type" in logic and logic["type"].startswith("conditional"):
+        if isinstance(logic, NODE_TYPES) and "type" in logic and logic["type"].startswith("conditional"):
             self._solve_conditional_variable(target_name, logic, base_inputs, prefix)
-        elif isinstance(logic, dict) and "function" in logic:
+        elif isinstance(logic, NODE_TYPES) and "function" in logic:
             fname = logic["function"]
             if fname == "POS":
                 self._solve_pos_case(target_name, logic, base_inputs, prefix)
@@ -56,27 +59,25 @@ class VariableSolverMixin:
             mode = branch.get("mode", "OK")
             label = f"{prefix}{branch['label']}"
 
-            branch_inputs_list = []
-            
+            # Los triggers se consumen de a uno desde el generador (sin materializar el producto)
             if condition:
                 if mode == "OK":
-                    triggers = self._generate_ok_combinations(condition)
+                    triggers = self._iter_ok_combinations(condition)
                 elif mode == "NK":
                     # AQUÍ ESTÁ LA MAGIA: Generamos inputs explícitos para romper la condición
-                    triggers = self._generate_nk_combinations(condition)
+                    triggers = self._iter_nk_combinations(condition)
                     
                     # Si no pudimos generar triggers (ej: condición vacía), fallback a default
-                    if not triggers: 
-                        triggers = [{}] 
+                    first = next(triggers, None)
+                    triggers = [{}] if first is None else itertools.chain([first], triggers)
                 else:
                     triggers = [{}]
 
-                for t in triggers: 
-                    branch_inputs_list.append({**base_inputs, **t})
+                branch_inputs = ({**base_inputs, **t} for t in triggers)
             else:
-                branch_inputs_list.append(base_inputs.copy())
+                branch_inputs = [base_inputs.copy()]
 
-            for i, inputs_ctx in enumerate(branch_inputs_list):
+            for inputs_ctx in branch_inputs:
                 desc_trigger = ""
                 # Generamos descripción dinámica
                 if condition:
@@ -152,14 +153,17 @@ class VariableSolverMixin:
         self._add_case(var_name, desc, inputs, str(val))
     
     def _calculate_variables(self, block, context_inputs):
-        results = {}
-        if not block: return results
-        instr_list = block if isinstance(block, list) else [block]
-        current_context = context_inputs.copy()
-        for item in instr_list:
-            if "target" in item:
-                name = item["target"]
-                val = self.math_engine.evaluate(item["logic"], current_context)
-                results[name] = val
-                current_context[name] = val
-        return results
\ No newline at end of file
+        if not block: return {}
+        return self._dependency_graph(block).evaluate(context_inputs)
+
+    def _recalculate_variables(self, block, base_context, base_results, context_inputs):
+        """Como _calculate_variables(block, context_inputs), pero reevalúa solo lo afectado respecto de base_context."""
+        if not block: return {}
+        return self._dependency_graph(block).recompute(base_context, base_results, context_inputs)
+
+    def _dependency_graph(self, block):
+        hit = self.dependency_graphs.get(id(block))
+        if hit is not None and hit[0] is block: return hit[1]
+        graph = VariableDependencyGraph(block, self.math_engine)
+        self.dependency_graphs[id(block)] = (block, graph)
+        return graph
\ No newline at end of file
@@ -1,4 +1,6 @@
+import hashlib
 import unicodedata
+from app.models.domain import NODE_TYPES, TREE_TYPES
 
 class BuilderUtilsMixin:
     def _map_variable_definitions(self):
@@ -23,7 +25,7 @@ class BuilderUtilsMixin:
         return no_accents.upper()
 
     def _find_section(self, name):
-        if hasattr(self, 'logic_tree') and isinstance(self.logic_tree, dict):
+        if hasattr(self, 'logic_tree') and isinstance(self.logic_tree, NODE_TYPES):
              if name == "Variables": return self.logic_tree.get("variables", [])
              if name == "Condicion_Entrada": return self.logic_tree.get("condicion_entrada", [])
              if name == "Norma_Observacion": return self.logic_tree.get("norma_observacion", [])
@@ -34,18 +36,30 @@ class BuilderUtilsMixin:
         return []
 
     def _add_case(self, tipo, desc, inputs, resultado):
-        self.case_id += 1
         filtered_inputs = self._filter_inputs(inputs)
-        inputs_str = "; ".join([f"{k}={v}" if k.startswith("Vx") else f"[{k[1:]}]={v}" for k, v in filtered_inputs.items()])
-        row = {
-            "ID_Caso": str(self.case_id),
-            "Tipo": tipo,
-            "Descripcion": desc,
-            "Resultado_Esperado": resultado,
-            "Contexto_Visual": inputs_str,
-            **filtered_inputs
-        }
-        self.scenarios.append(row)
+        key = self._case_key(tipo, resultado, filtered_inputs)
+        # Con sinks la fila sale apenas se genera: sus duplicados no pueden fundirse en ella después
+        merge = self.collapse_duplicates and not self.sinks and self.retain_scenarios
+        if key in (self.case_index if merge else self.case_digests):
+            self.duplicate_count += 1
+            if self.collapse_duplicates:
+                # En streaming la primera fila ya se escribió: el duplicado solo se descarta
+                if merge: self.scenarios.append_description(self.case_index[key], f" | {desc}")
+                return
+
+        self.case_id += 1
+        self.case_count += 1
+        row = None
+        if self.retain_scenarios: row = self.scenarios.append(self.case_id, tipo, desc, resultado, filtered_inputs)
+        for sink in self.sinks: sink.write(self.case_id, tipo, desc, resultado, filtered_inputs)
+        if merge: self.case_index[key] = row
+        else: self.case_digests.add(key)
+
+    def _case_key(self, tipo, resultado, filtered_inputs):
+        # Huella canónica: _filter_inputs ya ordena las claves; repr distingue 1000 de 1000.0.
+        # Se guarda solo su digest (16 bytes), no la tupla con todas las entradas de la fila.
+        canonical = repr((tipo, resultado, tuple((k, repr(v)) for k, v in filtered_inputs.items())))
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
 
     def _describe_scenario(self, inputs):
         active_vars = [f"{k}={v}" for k, v in inputs.items() if v != 0 and k not in self.parameters]
@@ -66,34 +80,29 @@ class BuilderUtilsMixin:
         preds = []
         if isinstance(block, list):
             for item in block: preds.extend(self._extract_predicates(item))
-        elif isinstance(block, dict):
+        elif isinstance(block, NODE_TYPES):
             if "op" in block and block["op"] in [">", "<", ">=", "<=", "=", "≠", "IN"]:
                 left = block["left"]
                 right = block["right"]
                 if isinstance(left, str):
-                    preds.append({"target": left, "op": block["op"], "right_tree": right, "value": [0]})
-                elif isinstance(left, dict):
+                    preds.append({"target": left, "op": block["op"], "right_tree": right, "value": [0], "left_tree": left})
+                elif isinstance(left, NODE_TYPES):
                     atoms = self._extract_leaf_vars(left)
                     if atoms:
                         leader = atoms[0]
-                        preds.append({"target": leader, "op": block["op"], "right_tree": right, "value": [0]})
+                        preds.append({"target": leader, "op": block["op"], "right_tree": right, "value": [0], "left_tree": left})
             for k, v in block.items():
-                if isinstance(v, (dict, list)): preds.extend(self._extract_predicates(v))
+                if isinstance(v, TREE_TYPES): preds.extend(self._extract_predicates(v))
         return preds
 
+    def _decompose_additive_expression(self, tree, pos_list, neg_list):
+        # Misma descomposición que LogicProcessor, sobre la caché de formas lineales del builder
+        for name, sign in self.linear_forms.get(tree, ("POS",)).terms:
+            if sign > 0: pos_list.append(name)
+            else: neg_list.append(name)
+
     def _extract_leaf_vars(self, node):
-        vars_found = []
-        if isinstance(node, str):
-            if len(node) > 0 and node not in ["AND", "OR", "Y", "O", "POS", "MIN", "MAX", "SI", "NO", "SINO", "+", "-", "*", "/", "div", "mod"]:
-                if node.isalnum() or node.startswith("Vx") or "_" in node:
-                    vars_found.append(node)
-        elif isinstance(node, list):
-            for item in node: vars_found.extend(self._extract_leaf_vars(item))
-        elif isinstance(node, dict):
-            for k, v in node.items():
-                if k in ["op", "function", "type", "section"]: continue
-                vars_found.extend(self._extract_leaf_vars(v))
-        return vars_found
+        return self.leaf_index.leaves(node)
 
     def _smart_set_input(self, inputs_dict, target, value):
         # Normalizamos la clave objetivo para búsqueda
@@ -134,7 +143,7 @@ class BuilderUtilsMixin:
             if isinstance(definition, str):
                 self._smart_set_input(inputs_dict, definition, value)
 
-            elif isinstance(definition, dict) and definition.get("type") == "conditional":
+            elif isinstance(definition, NODE_TYPES) and definition.get("type") == "conditional":
                 cond = definition.get("cond")
                 val_true = definition.get("true")
                 val_false = definition.get("false")
@@ -154,15 +163,13 @@ class BuilderUtilsMixin:
 
                 if is_true_intent:
                     inputs_dict[target] = val_true 
-                    if hasattr(self, '_generate_ok_combinations'):
-                        solutions = self._generate_ok_combinations(cond)
-                        if solutions: solution = solutions[0]
+                    if hasattr(self, '_iter_ok_combinations'):
+                        solution = next(self._iter_ok_combinations(cond), None)
 
                 elif is_false_intent:
                     inputs_dict[target] = val_false
-                    if hasattr(self, '_generate_nk_combinations'):
-                        solutions = self._generate_nk_combinations(cond)
-                        if solutions: solution = solutions[0]
+                    if hasattr(self, '_iter_nk_combinations'):
+                        solution = next(self._iter_nk_combinations(cond), None)
                 
                 if solution:
                     for k, v in solution.items():
@@ -170,7 +177,7 @@ class BuilderUtilsMixin:
                             self._smart_set_input(inputs_dict, k, v)
 
     def _find_function_node(self, node, function_names):
-        if isinstance(node, dict):
+        if isinstance(node, NODE_TYPES):
             if "function" in node and node["function"] in function_names:
                 return node
             for key in ["left", "right", "terms", "args", "cond", "true", "false", "cond_1", "val_1", "val_2"]:
@@ -188,14 +195,8 @@ class BuilderUtilsMixin:
         return None
 
     def _get_recursive_roots(self, node):
-        leaf_vars = self._extract_leaf_vars(node)
-        roots = []
-        for var in leaf_vars:
-            if hasattr(self, 'var_definitions') and var in self.var_definitions:
-                roots.extend(self._get_recursive_roots(self.var_definitions[var]))
-            else:
-                roots.append(var)
-        return roots
+        # Raíces de entrada a través de var_definitions (ver LeafIndex)
+        return self.leaf_index.roots(node)
 
     def _calculate_boundary_value(self, op, threshold, force_true):
         base = float(threshold)
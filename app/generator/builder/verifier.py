@@ -0,0 +1,195 @@
+import math
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from app.models.domain import NODE_TYPES
+from app.models.scenario_table import ScenarioTable
+from app.generator.sinks import ScenarioSink
+from app.generator.builder.dependency_graph import VariableDependencyGraph
+
+# Tipo de escenario -> valor de verdad que afirma
+CONDITION_CLAIMS = {"Cond. OK": True, "Cond. NK": False}
+NORM_CLAIMS = {"Norma OK": True, "Norma NK": False}
+
+class ScenarioVerifier:
+    """
+    Verificación de la suite generada: vuelve a evaluar lo que afirma cada escenario
+    a partir de sus entradas tal como se exportan (sin el contexto interno del builder).
+
+      - Cond. OK / Cond. NK : la condición de entrada se cumple / no se cumple.
+      - Norma OK / Norma NK : la comparación de la norma se cumple / no se cumple.
+      - Casos de variable   : el valor esperado coincide con el calculado.
+
+    Las Variables, la condición y la norma se evalúan por columnas para toda la suite
+    de una vez (MathEngine.evaluate_batch). Sin NumPy se evalúa escenario por escenario;
+    si la evaluación por lotes falla con un error de datos (ValueError / TypeError) también,
+    y el reporte lo registra en "respaldo_por_filas" (cualquier otro error es un bug y se
+    reporta en "error").
+
+    La verificación solo reporta: nunca interrumpe la suite. Si ni siquiera la
+    evaluación por escenario es posible, el reporte lo indica en "error".
+    """
+    def __init__(self, builder):
+        self.math_engine = builder.math_engine
+        self.parameters = builder.parameters
+        self.condition = builder._find_section("Condicion_Entrada")
+        vars_block = builder._find_section("Variables")
+        self.variables = VariableDependencyGraph(vars_block, self.math_engine) if vars_block else None
+        self.var_names = set(self.variables.targets) if self.variables else set()
+
+        # Igual que _generate_norm_cases: la última comparación es la condición de la norma.
+        # Los cálculos de la norma (target = ...) no se aplican: pueden reescribir entradas (C1105 = ...)
+        self.norm_condition = None
+        norm_block = builder._find_section("Norma_Observacion")
+        for item in (norm_block if isinstance(norm_block, list) else [norm_block]):
+            if isinstance(item, NODE_TYPES) and "op" in item and item["op"] in [">", "<", ">=", "<=", "=", "≠"]:
+                self.norm_condition = item
+
+    def verify(self, scenarios):
+        """
+        Retorna el reporte de verificación: totales y detalle de cada escenario inconsistente.
+        scenarios es la ScenarioTable del builder (se leen sus columnas directamente).
+        """
+        size = len(scenarios)
+        self.fallbacks = []
+        try:
+            columns = self._input_columns(scenarios)
+
+            # Variables en orden de dependencias, una columna por variable
+            if self.variables:
+                for item in self.variables.order:
+                    columns[item["target"]] = self._evaluate(item["logic"], columns, size)
+
+            condition = self._truth(self.condition, columns, size) if self.condition else None
+            norm = self._truth(self.norm_condition, columns, size) if self.norm_condition else None
+        except Exception as e:
+            return {"escenarios": size, "verificados": 0, "inconsistentes": 0, "detalle": [],
+                    "error": f"{type(e).__name__}: {e}"}
+
+        meta = scenarios.meta
+        verified = 0
+        detail = []
+        for i, tipo in enumerate(meta["Tipo"]):
+            if tipo in CONDITION_CLAIMS and condition is not None:
+                expected, obtained = CONDITION_CLAIMS[tipo], condition[i]
+                ok = expected == obtained
+            elif tipo in NORM_CLAIMS and norm is not None:
+                expected, obtained = NORM_CLAIMS[tipo], norm[i]
+                ok = expected == obtained
+            elif tipo in self.var_names:
+                expected, obtained = meta["Resultado_Esperado"][i], self._as_text(columns[tipo][i])
+                ok = self._same_value(expected, obtained)
+            else:
+                continue
+
+            verified += 1
+            if not ok:
+                detail.append({
+                    "ID_Caso": str(meta["ID_Caso"][i]),
+                    "Tipo": tipo,
+                    "Descripcion": meta["Descripcion"][i],
+                    "Esperado": expected,
+                    "Obtenido": obtained
+                })
+
+        report = {
+            "escenarios": size,
+            "verificados": verified,
+            "inconsistentes": len(detail),
+            "detalle": detail
+        }
+        if self.fallbacks: report["respaldo_por_filas"] = self.fallbacks
+        return report
+
+    def discard_invalid(self, scenarios, report):
+        """Escenarios que pasaron la verificación (descarta los del detalle del reporte)."""
+        invalid = {item["ID_Caso"] for item in report["detalle"]}
+        ids = scenarios.meta["ID_Caso"]
+        return scenarios.select([i for i in range(len(scenarios)) if str(ids[i]) not in invalid])
+
+    def _input_columns(self, scenarios):
+        # Columnas dispersas de la tabla -> columnas densas (las entradas ausentes valen 0)
+        size = len(scenarios)
+        columns = {}
+        for name, column in scenarios.columns.items():
+            if np is not None:
+                try:
+                    dense = np.zeros(size)
+                    dense[np.asarray(column.rows, dtype=np.intp)] = np.asarray(column.values, dtype=float)
+                    columns[name] = dense
+                    continue
+                except (ValueError, TypeError):
+                    pass    # Hay texto: se deja como lista (evaluate_batch cae a filas)
+            dense = [0] * size
+            for r, v in zip(column.rows, column.values): dense[r] = v
+            columns[name] = dense
+
+        # Los parámetros mandan sobre las entradas, como en el builder ({**inputs, **parameters})
+        columns.update(self.parameters)
+        return columns
+
+    def _evaluate(self, tree, columns, size):
+        if np is not None:
+            try:
+                return self.math_engine.evaluate_batch(tree, columns, size)
+            except (ValueError, TypeError) as e:
+                # Se reintenta escenario por escenario con el intérprete de referencia (queda en el reporte)
+                fallback = f"{type(e).__name__}: {e}"
+                if fallback not in self.fallbacks: self.fallbacks.append(fallback)
+        return [self.math_engine.evaluate(tree, self._row(columns, i)) for i in range(size)]
+
+    def _row(self, columns, i):
+        # Columnas: listas o arreglos NumPy (una posición por escenario); el resto son escalares
+        return {k: (v[i] if isinstance(v, list) or (np is not None and isinstance(v, np.ndarray) and v.ndim) else v)
+                for k, v in columns.items()}
+
+    def _truth(self, block, columns, size):
+        # Un bloque con varias instrucciones se cumple si se cumplen todas
+        result = [True] * size
+        for item in (block if isinstance(block, list) else [block]):
+            values = self._evaluate(item, columns, size)
+            result = [r and bool(v) for r, v in zip(result, values)]
+        return result
+
+    def _as_text(self, value):
+        if np is not None and isinstance(value, np.generic): value = value.item()
+        if isinstance(value, float) and value.is_integer(): value = int(value)
+        return str(value)
+
+    def _same_value(self, expected, obtained):
+        if expected == obtained: return True
+        try:
+            return math.isclose(float(expected), float(obtained), rel_tol=1e-9, abs_tol=1e-9)
+        except ValueError:
+            return False
+
+class VerificationSink(ScenarioSink):
+    """
+    Verificación en modo streaming: acumula las filas en bloques de block_rows, verifica
+    cada bloque por columnas y lo descarta. El reporte final suma los de todos los bloques.
+    Las filas ya se escribieron, así que aquí solo se reporta (no se puede descartar).
+    """
+    def __init__(self, verifier, block_rows=4096):
+        self.verifier = verifier
+        self.block_rows = block_rows
+        self.block = ScenarioTable()
+        self.report = {"escenarios": 0, "verificados": 0, "inconsistentes": 0, "detalle": []}
+
+    def write(self, case_id, tipo, desc, resultado, inputs):
+        self.block.append(case_id, tipo, desc, resultado, inputs)
+        if len(self.block) >= self.block_rows: self._flush()
+
+    def close(self):
+        self._flush()
+
+    def _flush(self):
+        if not len(self.block): return
+        partial = self.verifier.verify(self.block)
+        for key in ("escenarios", "verificados", "inconsistentes"): self.report[key] += partial[key]
+        self.report["detalle"].extend(partial["detalle"])
+        if "error" in partial: self.report.setdefault("error", partial["error"])
+        for fallback in partial.get("respaldo_por_filas", []):
+            fallbacks = self.report.setdefault("respaldo_por_filas", [])
+            if fallback not in fallbacks: fallbacks.append(fallback)
+        self.block = ScenarioTable()
@@ -1,3 +1,5 @@
+from app.models.domain import NODE_TYPES, TREE_TYPES
+
 class ConditionExtractor:
     def __init__(self):
         self.conditions = []
@@ -12,7 +14,7 @@ class ConditionExtractor:
             for item in logic_tree:
                 self.extract(item)
         
-        elif isinstance(logic_tree, dict):
+        elif isinstance(logic_tree, NODE_TYPES):
             # 1. Detectar cambio de Sección
             if "section" in logic_tree:
                 self.current_section = logic_tree["section"]
@@ -48,7 +50,7 @@ class ConditionExtractor:
             # 5. Recursividad genérica para otros dicts
             else:
                 for key, value in logic_tree.items():
-                    if isinstance(value, (dict, list)):
+                    if isinstance(value, TREE_TYPES):
                         self.extract(value)
 
     def _add_condition(self, node):
@@ -69,7 +71,7 @@ class ConditionExtractor:
         """Convierte un sub-arbol en string simple para leerlo facil"""
         if isinstance(item, str) or isinstance(item, (int, float)):
             return str(item)
-        if isinstance(item, dict):
+        if isinstance(item, NODE_TYPES):
             if "function" in item:
                 args = [self._to_str(a) for a in item["args"]]
                 return f"{item['function']}({', '.join(args)})"
@@ -1,46 +1,63 @@
 import csv
 import os
 import re
+from app.generator.sinks import ScenarioSink
+
+# Filas que se arman y escriben de una vez (la tabla se recorre por bloques de columnas)
+BLOCK_ROWS = 4096
 
 class CSVExporter:
     def __init__(self, output_dir):
         self.output_dir = output_dir
 
     def export(self, filename, headers_inputs, scenarios):
+        """scenarios es una ScenarioTable: las entradas se leen por columna, no fila por fila."""
         path = os.path.join(self.output_dir, filename)
+        fieldnames, layout, _ = self._header_plan(headers_inputs)
+        plan = [(scenarios.columns[key], targets) for key, targets in layout if key in scenarios.columns]
+
+        meta = scenarios.meta
+        padding = [""] * (len(fieldnames) - 4)
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(fieldnames)
+
+            for start in range(0, len(scenarios), BLOCK_ROWS):
+                stop = min(start + BLOCK_ROWS, len(scenarios))
+                block = [[str(meta["ID_Caso"][r]), meta["Tipo"][r], meta["Descripcion"][r], meta["Resultado_Esperado"][r]]
+                         + padding for r in range(start, stop)]
+
+                # Volcamos cada columna de entrada sobre las filas del bloque donde está presente
+                for column, targets in plan:
+                    rows, values = column.slice(start, stop)
+                    for r, value in zip(rows, values):
+                        out = block[r - start]
+                        for t in targets: out[t] = value
+
+                writer.writerows(block)
         
+        return path
+
+    def _header_plan(self, headers_inputs):
+        """
+        Plan de columnas, armado una vez por suite: encabezados finales y, por cada
+        entrada original, las posiciones de salida que ocupa. shared indica que alguna
+        columna visible recibe más de una entrada (hay que respetar el orden de encabezados).
+        """
         # 1. Normalizar Headers (Columnas)
         # Convertimos 'Vx010599' -> 'Vx599' y 'C1593' -> '[1593]'
         clean_headers = [self._normalize_header(h) for h in headers_inputs]
-        
+
         # Definimos las columnas finales
         fieldnames = ["ID_Caso", "Tipo", "Descripcion", "Resultado_Esperado"] + clean_headers
-        
-        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
-            writer.writeheader()
 
-            for scen in scenarios:
-                # 2. Normalizar las filas
-                # Como cambiamos los nombres de las columnas, debemos cambiar las llaves del diccionario
-                # para que coincidan.
-                clean_row = {}
-                
-                # Copiamos los metadatos fijos
-                clean_row["ID_Caso"] = scen.get("ID_Caso", "")
-                clean_row["Tipo"] = scen.get("Tipo", "")
-                clean_row["Descripcion"] = scen.get("Descripcion", "")
-                clean_row["Resultado_Esperado"] = scen.get("Resultado_Esperado", "")
-                
-                # Mapeamos los inputs a sus nombres limpios
-                for original_key in headers_inputs:
-                    if original_key in scen:
-                        new_key = self._normalize_header(original_key)
-                        clean_row[new_key] = scen[original_key]
-                
-                writer.writerow(clean_row)
-        
-        return path
+        # 2. Posición de salida de cada entrada. Si dos encabezados quedan con el mismo nombre
+        # limpio, ambas columnas reciben el valor del último presente (como hacía DictWriter).
+        positions = {}
+        for i, name in enumerate(fieldnames): positions.setdefault(name, []).append(i)
+        layout = [(key, positions[clean]) for key, clean in zip(headers_inputs, clean_headers)]
+        shared = any(len(targets) > 1 for _, targets in layout)
+        return fieldnames, layout, shared
 
     def _normalize_header(self, name):
         """Aplica el formato visual solicitado por el equipo de QA"""
@@ -62,4 +79,32 @@ class CSVExporter:
         if name.startswith("C") and name[1:].isdigit():
             return f"[{name[1:]}]"
             
-        return name
\ No newline at end of file
+        return name
+
+class CSVSink(CSVExporter, ScenarioSink):
+    """Misma salida que CSVExporter.export, escrita fila a fila mientras el builder genera."""
+    def __init__(self, output_dir, filename, headers_inputs):
+        super().__init__(output_dir)
+        self.path = os.path.join(output_dir, filename)
+        self.fieldnames, self.layout, shared = self._header_plan(headers_inputs)
+        # Caso común: cada entrada va a una sola columna y basta recorrer las entradas de la fila
+        self.index = None if shared else {key: targets[0] for key, targets in self.layout}
+        self.padding = [""] * (len(self.fieldnames) - 4)
+        self._file = open(self.path, 'w', newline='', encoding='utf-8-sig')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.fieldnames)
+
+    def write(self, case_id, tipo, desc, resultado, inputs):
+        row = [str(case_id), tipo, desc, resultado] + self.padding
+        if self.index is not None:
+            for key, value in inputs.items():
+                t = self.index.get(key)
+                if t is not None: row[t] = value
+        else:
+            for key, targets in self.layout:
+                if key in inputs:
+                    for t in targets: row[t] = inputs[key]
+        self._writer.writerow(row)
+
+    def close(self):
+        if not self._file.closed: self._file.close()
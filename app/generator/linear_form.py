@@ -0,0 +1,120 @@
+from app.models.domain import NODE_TYPES, Node
+
+class LinearForm:
+    """
+    Forma lineal dispersa de una suma/resta: const + Σ coef * variable.
+
+    terms guarda las hojas con su signo en el orden en que aparecen en el árbol
+    (con repeticiones), que es lo que necesitan los generadores para elegir
+    "líder" y polaridad. coefs es la vista agregada para evaluar como producto punto.
+    exact indica que el árbol es SOLO una suma/resta de variables y constantes
+    (sin envoltorios transparentes ni sub-árboles ignorados), o sea, que evaluar
+    la forma equivale a evaluar el árbol.
+
+    steps conserva la secuencia (hoja, signo) incluyendo constantes. Si el árbol
+    es una cadena asociada a la izquierda (a + b - c + ...), que es lo que produce
+    el transformer salvo paréntesis, sequential es True y acumular steps en orden
+    hace exactamente las mismas operaciones de punto flotante que el árbol.
+    """
+    __slots__ = ("terms", "const", "exact", "sequential", "steps", "_coefs")
+
+    def __init__(self, terms, const, exact, sequential, steps):
+        self.terms = terms
+        self.const = const
+        self.exact = exact
+        self.sequential = sequential
+        self.steps = steps
+        self._coefs = None
+
+    @property
+    def coefs(self):
+        if self._coefs is None:
+            coefs = {}
+            for name, sign in self.terms: coefs[name] = coefs.get(name, 0) + sign
+            self._coefs = coefs
+        return self._coefs
+
+    def positives(self):
+        return [name for name, sign in self.terms if sign > 0]
+
+    def negatives(self):
+        return [name for name, sign in self.terms if sign < 0]
+
+    def evaluate(self, values):
+        """Producto punto: values(nombre) -> valor."""
+        total = self.const
+        for name, coef in self.coefs.items():
+            if coef: total = total + coef * values(name)
+        return total
+
+
+class LinearFormCache:
+    """
+    Formas lineales ya calculadas, por nodo (id) y por "envoltorios transparentes":
+      - ()      : suma/resta estricta (evaluación).
+      - ("POS",): POS(x) se trata como x (descomposición de LogicProcessor).
+      - ("*",)  : A * B propaga el signo a ambos factores (polaridad de normas).
+    Se comparte entre el motor matemático y el builder de una misma observación.
+    """
+    def __init__(self):
+        self._forms = {}
+
+    def get(self, node, transparent=()):
+        if not isinstance(node, NODE_TYPES): return self._build(node, transparent)
+        key = (id(node), transparent)
+        hit = self._forms.get(key)
+        if hit is not None and hit[0] is node: return hit[1]
+        form = self._build(node, transparent)
+        self._forms[key] = (node, form)
+        return form
+
+    def _build(self, node, transparent):
+        terms = []
+        state = {"const": 0, "exact": True, "sequential": True, "steps": []}
+        self._collect(node, 1, terms, state, transparent)
+        return LinearForm(terms, state["const"], state["exact"], state["sequential"], state["steps"])
+
+    def _collect(self, node, sign, terms, state, transparent, spine=True):
+        if isinstance(node, str):
+            terms.append((node, sign))
+            state["steps"].append((node, sign))
+            return
+        if isinstance(node, bool) or not isinstance(node, (*NODE_TYPES, int, float)):
+            state["exact"] = False
+            return
+        if isinstance(node, (int, float)):
+            state["const"] += sign * node
+            state["steps"].append((node, sign))
+            return
+
+        # Un sub-árbol compuesto fuera del "espinazo" izquierdo es un paréntesis
+        if not spine: state["sequential"] = False
+
+        # Nodos del modelo por atributo (campo ausente = None); dicts sintéticos por clave
+        if isinstance(node, Node):
+            function, args, op, node_terms, left, right = node.function, node.args, node.op, node.terms, node.left, node.right
+        else:
+            function, args, op = node.get("function"), node.get("args"), node.get("op")
+            node_terms, left, right = node.get("terms"), node.get("left"), node.get("right")
+
+        if "POS" in transparent and function == "POS":
+            state["exact"] = False
+            if args: self._collect(args[0], sign, terms, state, transparent)
+            return
+
+        if op == "+":
+            if node_terms is not None:
+                for i, term in enumerate(node_terms): self._collect(term, sign, terms, state, transparent, spine and i == 0)
+            else:
+                self._collect(left, sign, terms, state, transparent, spine)
+                self._collect(right, sign, terms, state, transparent, False)
+        elif op in ["-", "–"]:
+            self._collect(left, sign, terms, state, transparent, spine)
+            self._collect(right, -sign, terms, state, transparent, False)
+        elif op == "*" and "*" in transparent:
+            state["exact"] = False
+            self._collect(left, sign, terms, state, transparent, spine)
+            self._collect(right, sign, terms, state, transparent, False)
+        else:
+            # Sub-árbol no lineal (función, comparación, condicional...): se ignora
+            state["exact"] = False
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import pickle
+import sys
+
+class MacroLibrary:
+    """
+    Biblioteca compilada de macros globales (GLOBAL_DEFINITIONS).
+
+    Guarda en disco el árbol lógico ya parseado de cada macro, indexado por el
+    hash de su texto. Todo el archivo queda invalidado si cambia la huella de
+    las herramientas (gramática, transformer, normalizador). En cada carga solo
+    se vuelven a normalizar y parsear las macros cuyo texto cambió.
+    """
+    def __init__(self, cache_path, parse, normalizer, fingerprint):
+        self.cache_path = cache_path
+        self.parse = parse              # texto -> lista de secciones (transformer aplicado)
+        self.normalizer = normalizer
+        # La huella del parser se combina con la del código del normalizador
+        self.fingerprint = f"{fingerprint}:{self._module_hash(type(normalizer))}"
+        self.stats = {"cache": 0, "compiladas": 0}
+        self.library_hash = None    # Huella del conjunto de macros cargado (ver load)
+
+    def load(self, definitions):
+        cached = self._read_cache()
+        entries = {}
+        macros = {}
+
+        for name, formula in definitions.items():
+            text_hash = hashlib.sha256(f"{name}\0{formula}".encode('utf-8')).hexdigest()
+
+            hit = cached.get(name)
+            if hit and hit[0] == text_hash:
+                logic = hit[1]
+                self.stats["cache"] += 1
+            else:
+                logic = self._compile_macro(name, formula)
+                if logic is None: continue
+                self.stats["compiladas"] += 1
+
+            entries[name] = (text_hash, logic)
+            macros[name] = logic
+
+        digest = hashlib.sha256(self.fingerprint.encode('utf-8'))
+        for name in sorted(entries): digest.update(f"{name}:{entries[name][0]};".encode('utf-8'))
+        self.library_hash = digest.hexdigest()
+
+        # Solo reescribimos si algo cambió (macros nuevas, editadas o eliminadas)
+        if self.stats["compiladas"] or set(entries) != set(cached):
+            self._write_cache(entries)
+        return macros
+
+    def _compile_macro(self, name, formula):
+        try:
+            # 1. Normalización
+            raw_input = f"{name} = {formula}"
+            clean_formula = self.normalizer.clean_section(raw_input, context_name=f"Macro {name}")
+            clean_formula = clean_formula.strip()
+
+            if not clean_formula: return None
+
+            # 2. Parseo + Transformación
+            macro_data_list = self.parse(f"Variables:\n{clean_formula}")
+
+            # 3. Extracción (la macro queda como única variable de la sección Variables)
+            for section in macro_data_list:
+                if section.get('section') == 'Variables':
+                    for var_item in section.get('content', []):
+                        if var_item.get('target') == name and var_item.get('logic'):
+                            return var_item.get('logic')
+
+            print(f"   ⚠️ FALLO: No se pudo extraer la lógica para {name}.")
+        except Exception as e:
+            print(f"   ❌ ERROR en {name}: {e}")
+        return None
+
+    def _module_hash(self, cls):
+        module = sys.modules.get(cls.__module__)
+        path = getattr(module, '__file__', None)
+        if not path or not os.path.exists(path): return ""
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def _read_cache(self):
+        if not os.path.exists(self.cache_path): return {}
+        try:
+            with open(self.cache_path, 'rb') as f:
+                data = pickle.load(f)
+            if data.get("fingerprint") != self.fingerprint: return {}
+            return data.get("macros", {})
+        except Exception:
+            # Caché corrupta o de otra versión: se reconstruye
+            return {}
+
+    def _write_cache(self, entries):
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({"fingerprint": self.fingerprint, "macros": entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_path)
@@ -1,15 +1,87 @@
+from contextlib import contextmanager
 from app.generator.sii_functions import (
     SII_POS, SII_MIN, SII_MAX, 
     SII_BIN1, SII_BIN2, SII_ABS, SII_NEG, SII_M11 
 )
+from app.generator.linear_form import LinearFormCache
+from app.models.domain import NODE_TYPES, Node, BinOp, Comparison, Sum, FunctionCall, Conditional, StringLiteral
+from app.generator.sii_vector_functions import (
+    np, SII_POS_VEC, SII_MIN_VEC, SII_MAX_VEC,
+    SII_BIN1_VEC, SII_BIN2_VEC, SII_ABS_VEC, SII_NEG_VEC, SII_INT_VEC
+)
+
+class _NotVectorizable(Exception):
+    """El árbol usa algo que no tiene versión vectorizada (M11, strings)."""
 
 class MathEngine:
-    def __init__(self, macros={}):
+    def __init__(self, macros={}, linear_forms=None):
         self.macros = macros # <--- GUARDAMOS LAS MACROS AQUÍ
+        # Sumas/restas canonizadas como formas lineales (compartidas con el builder)
+        self.linear_forms = linear_forms if linear_forms is not None else LinearFormCache()
+        # Árboles ya compilados: id(nodo) -> (nodo, función). Guardamos el nodo
+        # para que su id no pueda ser reutilizado por otro objeto mientras viva el motor.
+        self._compiled = {}
+        self._compiled_names = {}
+        # Memo de macros: valores ya calculados para el contexto activo (ver memo_scope)
+        self._memo = None
+        self._memo_ctx = None
+        self._macro_deps = {}
 
     def evaluate(self, logic_tree, context_inputs):
-        result = self._evaluate_recursive(logic_tree, context_inputs)
-        
+        # Cada macro se calcula a lo más una vez por evaluación (o por memo_scope abierto)
+        if self._memo is not None and self._memo_ctx is context_inputs:
+            return self._cosmetic(self.compile(logic_tree)(context_inputs))
+        with self.memo_scope(context_inputs):
+            return self._cosmetic(self.compile(logic_tree)(context_inputs))
+
+    # --- MEMO DE MACROS ---
+
+    @contextmanager
+    def memo_scope(self, context_inputs):
+        """
+        Mantiene el memo de macros mientras se evalúan varias fórmulas sobre el
+        mismo contexto. Si el contexto cambia dentro del bloque, usar assign()
+        para que se descarten las macros que dependen de la variable modificada.
+        """
+        previous = (self._memo, self._memo_ctx)
+        self._memo, self._memo_ctx = {}, context_inputs
+        try:
+            yield context_inputs
+        finally:
+            self._memo, self._memo_ctx = previous
+
+    def assign(self, context_inputs, name, value):
+        """context_inputs[name] = value, invalidando las macros memorizadas que dependen de name."""
+        context_inputs[name] = value
+        if self._memo and self._memo_ctx is context_inputs: self.forget(name)
+
+    def forget(self, name):
+        if not self._memo: return
+        for macro in [m for m in self._memo if m == name or name in self.macro_dependencies(m)]:
+            del self._memo[macro]
+
+    def macro_dependencies(self, macro_name):
+        """Conjunto de nombres (variables y macros) de los que depende una macro, transitivamente."""
+        deps = self._macro_deps.get(macro_name)
+        if deps is None:
+            deps = set()
+            self._macro_deps[macro_name] = deps  # Corta ciclos: una macro autorreferente queda a medio llenar
+            pending = [self.macros[macro_name]]
+            while pending:
+                node = pending.pop()
+                if isinstance(node, str):
+                    leaf = node.strip()
+                    if leaf in deps: continue
+                    deps.add(leaf)
+                    if leaf in self.macros and leaf != macro_name:
+                        deps.update(self.macro_dependencies(leaf))
+                elif isinstance(node, NODE_TYPES):
+                    pending.extend(v for k, v in node.items() if k not in ("op", "function", "type"))
+                elif isinstance(node, list):
+                    pending.extend(node)
+        return deps
+
+    def _cosmetic(self, result):
         # Corrección cosmética: Si es 5.0 -> 5
         try:
             if isinstance(result, float) and result.is_integer():
@@ -18,6 +90,342 @@ class MathEngine:
             pass
         return result
 
+    # --- COMPILACIÓN A CLOSURES ---
+    # Cada árbol se traduce una sola vez a funciones anidadas contexto -> valor.
+    # La semántica es exactamente la de _evaluate_recursive (que se mantiene como
+    # referencia y como respaldo para nodos mal formados), pero sin volver a
+    # despachar por isinstance / claves / strings de operador en cada evaluación.
+
+    def compile(self, logic_tree):
+        if isinstance(logic_tree, NODE_TYPES):
+            hit = self._compiled.get(id(logic_tree))
+            if hit is not None and hit[0] is logic_tree: return hit[1]
+            fn = self._compile_dict(logic_tree)
+            self._compiled[id(logic_tree)] = (logic_tree, fn)
+            return fn
+
+        if isinstance(logic_tree, str):
+            fn = self._compiled_names.get(logic_tree)
+            if fn is None:
+                fn = self._compile_name(logic_tree)
+                self._compiled_names[logic_tree] = fn
+            return fn
+
+        if isinstance(logic_tree, (int, float)):
+            return lambda ctx: logic_tree
+        return lambda ctx: 0
+
+    def _compile_name(self, raw_name):
+        name = raw_name.strip()
+
+        # Macros: se compilan de forma diferida (una macro puede referenciarse a sí misma)
+        if name in self.macros:
+            macro_tree = self.macros[name]
+            cosmetic = self._cosmetic
+            compiled = []
+            def eval_macro(ctx):
+                memo = self._memo
+                if memo is not None and self._memo_ctx is ctx:
+                    if name in memo: return memo[name]
+                    if not compiled: compiled.append(self.compile(macro_tree))
+                    value = memo[name] = cosmetic(compiled[0](ctx))
+                    return value
+                if not compiled: compiled.append(self.compile(macro_tree))
+                return cosmetic(compiled[0](ctx))
+            return eval_macro
+
+        if name.lower() in ["no", "sino"]: return lambda ctx: 0
+        # OJO: Si la variable vale "K" (resultado de M11), lo retornamos tal cual
+        return lambda ctx: ctx.get(name, 0)
+
+    def _compile_dict(self, node):
+        try:
+            return self._compile_dict_strict(node)
+        except (KeyError, IndexError, TypeError, AttributeError):
+            # Nodo mal formado: lo dejamos al intérprete, que solo fallará si se llega a evaluar
+            return lambda ctx: self._evaluate_recursive(node, ctx)
+
+    def _compile_node(self, node):
+        # Nodo del modelo: despacho por clase y acceso por atributo
+        cls = type(node)
+        if cls is BinOp or cls is Comparison or cls is Sum:
+            return self._compile_op(node, node.op, node.terms, node.left, node.right)
+        if cls is FunctionCall:
+            return self._compile_function(node.function, [self.compile(arg) for arg in node.args])
+        if cls is Conditional and node.cond:
+            return self._compile_conditional(node.cond, node.true, node.false)
+        if cls is StringLiteral:
+            value = node.value
+            return lambda ctx: value
+        return lambda ctx: 0
+
+    def _compile_conditional(self, cond, val_true, val_false):
+        cond_fn = self.compile(cond)
+        true_fn = self.compile(val_true)
+        false_fn = self.compile(val_false)
+        return lambda ctx: true_fn(ctx) if cond_fn(ctx) else false_fn(ctx)
+
+    def _compile_op(self, node, op, terms, left, right):
+        if op in ["+", "-", "–"]:
+            linear_fn = self._compile_linear(self.linear_forms.get(node))
+            if linear_fn is not None: return linear_fn
+        if op == "+" and terms is not None:
+            term_fns = [self.compile(term) for term in terms]
+            if len(term_fns) == 2:
+                a, b = term_fns
+                return lambda ctx: 0 + a(ctx) + b(ctx)
+            return lambda ctx: sum(f(ctx) for f in term_fns)
+        return self._compile_binary(op, self.compile(left), self.compile(right))
+
+    def _compile_dict_strict(self, node):
+        if isinstance(node, Node): return self._compile_node(node)
+
+        if "type" in node and node["type"] == "string":
+            value = node["value"]
+            return lambda ctx: value
+
+        t = node.get("type", "")
+        cond = None
+        val_true = None
+        val_false = None
+        if t == "conditional":
+            cond = node["cond"]
+            val_true = node["true"]
+            val_false = node["false"]
+        elif t.startswith("conditional_"):
+            cond = node.get("cond_1")
+            val_true = node.get("val_1")
+            val_false = node.get("val_2")
+
+        if cond: return self._compile_conditional(cond, val_true, val_false)
+
+        if "function" in node:
+            return self._compile_function(node["function"], [self.compile(arg) for arg in node["args"]])
+
+        if "op" in node:
+            terms = node["terms"] if "terms" in node else None
+            return self._compile_op(node, node["op"], terms, node.get("left"), node.get("right"))
+
+        return lambda ctx: 0
+
+    def _compile_linear(self, form):
+        # Solo cadenas a + b - c ...: acumular en orden repite las mismas operaciones que el árbol
+        if not (form.exact and form.sequential and form.steps): return None
+        step_fns = [(self.compile(leaf), sign) for leaf, sign in form.steps]
+        first, rest = step_fns[0][0], step_fns[1:]
+        def eval_linear(ctx):
+            total = first(ctx)
+            for fn, sign in rest:
+                if sign > 0: total = total + fn(ctx)
+                else: total = total - fn(ctx)
+            return total
+        return eval_linear
+
+    def _compile_function(self, fname, arg_fns):
+        if fname in ["POS", "ABS", "NEG", "M11", "INT"]:
+            a = arg_fns[0]
+            func = {"POS": SII_POS, "ABS": SII_ABS, "NEG": SII_NEG, "M11": SII_M11, "INT": int}[fname]
+            if len(arg_fns) == 1: return lambda ctx: func(a(ctx))
+            return lambda ctx: func([f(ctx) for f in arg_fns][0])
+
+        if fname in ["BIN1", "BIN2"]:
+            a, b = arg_fns[0], arg_fns[1]
+            func = SII_BIN1 if fname == "BIN1" else SII_BIN2
+            if len(arg_fns) == 2: return lambda ctx: func(a(ctx), b(ctx))
+            def eval_bin(ctx):
+                args = [f(ctx) for f in arg_fns]
+                return func(args[0], args[1])
+            return eval_bin
+
+        if fname in ["MIN", "MAX"]:
+            func = SII_MIN if fname == "MIN" else SII_MAX
+            return lambda ctx: func(*[f(ctx) for f in arg_fns])
+
+        # Función desconocida: igual se evalúan los argumentos (como el intérprete)
+        def eval_unknown(ctx):
+            for f in arg_fns: f(ctx)
+            return 0
+        return eval_unknown
+
+    def _compile_binary(self, op, left, right):
+        if op == "+": return lambda ctx: left(ctx) + right(ctx)
+        if op in ["-", "–"]: return lambda ctx: left(ctx) - right(ctx)
+        if op == "*": return lambda ctx: left(ctx) * right(ctx)
+        if op == "/":
+            def eval_div(ctx):
+                l, r = left(ctx), right(ctx)
+                return l / r if r != 0 else 0
+            return eval_div
+
+        # Soporte para evaluación lógica dentro del motor (retorna 1.0 si True, 0.0 si False)
+        if op == ">": return lambda ctx: 1.0 if left(ctx) > right(ctx) else 0.0
+        if op == ">=": return lambda ctx: 1.0 if left(ctx) >= right(ctx) else 0.0
+        if op == "<": return lambda ctx: 1.0 if left(ctx) < right(ctx) else 0.0
+        if op == "<=": return lambda ctx: 1.0 if left(ctx) <= right(ctx) else 0.0
+        if op == "=": return lambda ctx: 1.0 if left(ctx) == right(ctx) else 0.0
+        if op == "≠": return lambda ctx: 1.0 if left(ctx) != right(ctx) else 0.0
+        if op == "OR":
+            def eval_or(ctx):
+                l, r = left(ctx), right(ctx)
+                return 1.0 if (l or r) else 0.0
+            return eval_or
+        if op == "AND":
+            def eval_and(ctx):
+                l, r = left(ctx), right(ctx)
+                return 1.0 if (l and r) else 0.0
+            return eval_and
+
+        def eval_unknown(ctx):
+            left(ctx); right(ctx)
+            return 0
+        return eval_unknown
+
+    # --- EVALUACIÓN POR LOTES (NumPy) ---
+
+    def evaluate_batch(self, logic_tree, columns, size=None):
+        """
+        Evalúa el árbol para muchos escenarios a la vez.
+
+        columns: {nombre: arreglo} con una posición por escenario (Vx..., C..., P...).
+        Se aceptan escalares (ej: parámetros), que se aplican a todos los escenarios.
+        Las variables ausentes valen 0, como en evaluate(). Retorna un arreglo float
+        de largo size (por defecto, el largo de las columnas).
+
+        Si el árbol usa algo sin versión vectorizada (M11, literales de texto o
+        columnas no numéricas) se cae a evaluate() escenario por escenario.
+        """
+        if np is None:
+            raise ImportError("evaluate_batch requiere NumPy (pip install numpy)")
+
+        if size is None:
+            size = next((len(v) for v in columns.values() if hasattr(v, '__len__') and not isinstance(v, str)), 1)
+
+        try:
+            arrays = {k: self._as_column(v) for k, v in columns.items()}
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result = self._evaluate_vector(logic_tree, arrays, {})
+            return np.array(np.broadcast_to(result, (size,)), dtype=float)
+        except _NotVectorizable:
+            return self._evaluate_rows(logic_tree, columns, size)
+
+    def _as_column(self, value):
+        if isinstance(value, str): raise _NotVectorizable()
+        try:
+            return np.asarray(value, dtype=float)
+        except (ValueError, TypeError):
+            raise _NotVectorizable()
+
+    def _evaluate_rows(self, logic_tree, columns, size):
+        results = []
+        for i in range(size):
+            row = {k: (v[i] if hasattr(v, '__len__') and not isinstance(v, str) else v) for k, v in columns.items()}
+            results.append(self.evaluate(logic_tree, row))
+        try:
+            return np.array(results, dtype=float)
+        except (ValueError, TypeError):
+            return np.array(results, dtype=object)
+
+    def _evaluate_vector(self, node, cols, macro_memo):
+        if isinstance(node, (int, float)):
+            return float(node)
+
+        if isinstance(node, str):
+            name = node.strip()
+            if name in self.macros:
+                # Cada macro se evalúa una sola vez por lote
+                if name not in macro_memo:
+                    macro_memo[name] = self._evaluate_vector(self.macros[name], cols, macro_memo)
+                return macro_memo[name]
+            if name.lower() in ["no", "sino"]: return 0.0
+            return cols.get(name, 0.0)
+
+        if isinstance(node, Node):
+            # Nodo del modelo: despacho por clase y acceso por atributo
+            cls = type(node)
+            if cls is BinOp or cls is Comparison or cls is Sum:
+                return self._vector_op(node, node.op, node.terms, node.left, node.right, cols, macro_memo)
+            if cls is FunctionCall: return self._vector_function(node.function, node.args, cols, macro_memo)
+            if cls is Conditional and node.cond:
+                return self._vector_conditional(node.cond, node.true, node.false, cols, macro_memo)
+            if cls is StringLiteral: raise _NotVectorizable()
+            return 0.0
+
+        if not isinstance(node, NODE_TYPES): return 0.0
+
+        if "type" in node and node["type"] == "string":
+            raise _NotVectorizable()
+
+        t = node.get("type", "")
+        cond = None
+        if t == "conditional":
+            cond, val_true, val_false = node["cond"], node["true"], node["false"]
+        elif isinstance(t, str) and t.startswith("conditional_"):
+            cond, val_true, val_false = node.get("cond_1"), node.get("val_1"), node.get("val_2")
+
+        if cond: return self._vector_conditional(cond, val_true, val_false, cols, macro_memo)
+
+        if "function" in node: return self._vector_function(node["function"], node["args"], cols, macro_memo)
+
+        if "op" in node:
+            terms = node["terms"] if "terms" in node else None
+            return self._vector_op(node, node["op"], terms, node.get("left"), node.get("right"), cols, macro_memo)
+
+        return 0.0
+
+    def _vector_conditional(self, cond, val_true, val_false, cols, macro_memo):
+        cond_val = self._evaluate_vector(cond, cols, macro_memo)
+        true_val = self._evaluate_vector(val_true, cols, macro_memo)
+        false_val = self._evaluate_vector(val_false, cols, macro_memo)
+        return np.where(cond_val != 0, true_val, false_val)
+
+    def _vector_function(self, fname, args, cols, macro_memo):
+        args = [self._evaluate_vector(arg, cols, macro_memo) for arg in args]
+        if fname == "POS": return SII_POS_VEC(args[0])
+        if fname == "MIN": return SII_MIN_VEC(*args)
+        if fname == "MAX": return SII_MAX_VEC(*args)
+        if fname == "BIN1": return SII_BIN1_VEC(args[0], args[1])
+        if fname == "BIN2": return SII_BIN2_VEC(args[0], args[1])
+        if fname == "ABS": return SII_ABS_VEC(args[0])
+        if fname == "NEG": return SII_NEG_VEC(args[0])
+        if fname == "INT": return SII_INT_VEC(args[0])
+        if fname == "M11": raise _NotVectorizable()
+        return 0.0
+
+    def _vector_op(self, node, op, terms, left, right, cols, macro_memo):
+        if op in ["+", "-", "–"]:
+            form = self.linear_forms.get(node)
+            if form.exact:
+                # Producto punto sobre las columnas (coeficientes ya agregados)
+                total = form.const
+                for name, coef in form.coefs.items():
+                    if coef: total = total + coef * self._evaluate_vector(name, cols, macro_memo)
+                return total
+        if op == "+" and terms is not None:
+            total = 0.0
+            for term in terms: total = total + self._evaluate_vector(term, cols, macro_memo)
+            return total
+
+        left = self._evaluate_vector(left, cols, macro_memo)
+        right = self._evaluate_vector(right, cols, macro_memo)
+
+        if op == "+": return left + right
+        if op in ["-", "–"]: return left - right
+        if op == "*": return left * right
+        if op == "/": return np.where(right != 0, left / np.where(right != 0, right, 1.0), 0.0)
+
+        # np.asarray: con dos escalares (literales, nombres sin columna) el resultado es un bool
+        if op == ">": return np.asarray(left > right, dtype=float)
+        if op == ">=": return np.asarray(left >= right, dtype=float)
+        if op == "<": return np.asarray(left < right, dtype=float)
+        if op == "<=": return np.asarray(left <= right, dtype=float)
+        if op == "=": return np.asarray(left == right, dtype=float)
+        if op == "≠": return np.asarray(left != right, dtype=float)
+        if op == "OR": return np.asarray((left != 0) | (right != 0), dtype=float)
+        if op == "AND": return np.asarray((left != 0) & (right != 0), dtype=float)
+        return 0.0
+
+    # --- INTÉRPRETE DE REFERENCIA ---
+
     def _evaluate_recursive(self, logic_tree, context_inputs):
         # 1. Valor Directo
         if isinstance(logic_tree, (int, float)):
@@ -39,7 +447,7 @@ class MathEngine:
             return val
 
         # 3. Estructura Compleja
-        if isinstance(logic_tree, dict):
+        if isinstance(logic_tree, NODE_TYPES):
             
             # NUEVO: Soporte para Literales de String ("K")
             if "type" in logic_tree and logic_tree["type"] == "string":
@@ -0,0 +1,135 @@
+import os
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: solo lo requiere la exportación Parquet
+    pa = pq = None
+from app.models.scenario_table import ScenarioTable
+from app.generator.sinks import ScenarioSink
+
+# Filas por row group (la tabla se recorre por bloques de columnas, como en CSV / SII)
+BLOCK_ROWS = 4096
+
+# Columna de partición del dataset (una carpeta Documento=<nombre> por documento)
+PARTITION_FIELD = "Documento"
+
+class ParquetExporter:
+    """
+    Exporta la suite a Parquet: una columna por campo, en vez del CSV ancho y disperso.
+
+      - Documento, ID_Caso, Tipo, Descripcion, Resultado_Esperado.
+      - Una columna float64 nullable por entrada (Vx / C), con el nombre original del
+        scanner (Vx010599, C1593), de modo que el mismo código es la misma columna en
+        todos los documentos. Las entradas ausentes quedan en null, no en "".
+
+    Con dataset_dir la suite se escribe como partición Documento=<nombre> de un dataset
+    compartido (una carpeta por documento, al estilo Hive). Reprocesar un documento
+    reemplaza solo su partición, así que muchos documentos (o workers de BatchRunner)
+    pueden ir agregándose al mismo dataset. read_dataset() lo lee unificando columnas.
+    """
+    def __init__(self, output_dir):
+        if pa is None:
+            raise ImportError("La exportación Parquet requiere pyarrow (pip install pyarrow)")
+        self.output_dir = output_dir
+        self.skipped = 0    # Valores no numéricos que quedaron en null
+
+    def export(self, filename, headers_inputs, scenarios, document, dataset_dir=None):
+        """scenarios es una ScenarioTable: cada bloque de filas se escribe como un row group."""
+        path, schema = self._open_plan(filename, headers_inputs, document, dataset_dir)
+        with pq.ParquetWriter(path, schema) as writer:
+            for start in range(0, len(scenarios), BLOCK_ROWS):
+                writer.write_table(self._block(scenarios, start, min(start + BLOCK_ROWS, len(scenarios))))
+            if not len(scenarios): writer.write_table(schema.empty_table())
+        return path
+
+    @staticmethod
+    def partition_path(dataset_dir, document):
+        return os.path.join(dataset_dir, f"{PARTITION_FIELD}={document}")
+
+    @staticmethod
+    def read_dataset(dataset_dir):
+        """Lee el dataset completo: las columnas de entrada de cada documento se unen por nombre."""
+        if pa is None:
+            raise ImportError("La lectura del dataset Parquet requiere pyarrow (pip install pyarrow)")
+        import pyarrow.dataset as ds
+        dataset = ds.dataset(dataset_dir, format="parquet", partitioning="hive")
+        schema = pa.unify_schemas([fragment.physical_schema for fragment in dataset.get_fragments()] +
+                                  [pa.schema([(PARTITION_FIELD, pa.string())])])
+        return ds.dataset(dataset_dir, format="parquet", partitioning="hive", schema=schema).to_table()
+
+    def _open_plan(self, filename, headers_inputs, document, dataset_dir):
+        # Esquema fijo por suite (los encabezados se conocen antes de generar)
+        fields = [("ID_Caso", pa.int64()), ("Tipo", pa.string()), ("Descripcion", pa.string()),
+                  ("Resultado_Esperado", pa.string())]
+        if dataset_dir is None:
+            # Archivo suelto: el documento va como columna; en el dataset lo da la carpeta
+            fields.insert(0, (PARTITION_FIELD, pa.string()))
+            path = os.path.join(self.output_dir, filename)
+        else:
+            partition = self.partition_path(dataset_dir, document)
+            os.makedirs(partition, exist_ok=True)
+            path = os.path.join(partition, filename)
+
+        # Un encabezado repetido es una sola columna
+        self.headers = list(dict.fromkeys(headers_inputs))
+        self.schema = pa.schema(fields + [(key, pa.float64()) for key in self.headers])
+        self.document = document if dataset_dir is None else None
+        return path, self.schema
+
+    def _block(self, scenarios, start, stop):
+        size = stop - start
+        meta = scenarios.meta
+        arrays = [pa.array(meta["ID_Caso"][start:stop], type=pa.int64()),
+                  pa.array(meta["Tipo"][start:stop], type=pa.string()),
+                  pa.array(meta["Descripcion"][start:stop], type=pa.string()),
+                  pa.array([str(r) for r in meta["Resultado_Esperado"][start:stop]], type=pa.string())]
+        if self.document is not None:
+            arrays.insert(0, pa.array([self.document] * size, type=pa.string()))
+
+        for key in self.headers:
+            column = scenarios.columns.get(key)
+            rows, values = column.slice(start, stop) if column is not None else ((), ())
+            if not len(rows):
+                arrays.append(pa.nulls(size, type=pa.float64()))
+                continue
+            dense = [None] * size
+            for r, value in zip(rows, values): dense[r - start] = self._to_float(value)
+            arrays.append(pa.array(dense, type=pa.float64()))
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def _to_float(self, value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            self.skipped += 1
+            return None
+
+class ParquetSink(ParquetExporter, ScenarioSink):
+    """
+    Misma salida que ParquetExporter.export en modo streaming: las filas se acumulan en
+    una ScenarioTable de block_rows y cada bloque lleno se escribe como un row group.
+    """
+    def __init__(self, output_dir, filename, headers_inputs, document, dataset_dir=None, block_rows=BLOCK_ROWS):
+        super().__init__(output_dir)
+        self.block_rows = block_rows
+        self.path, schema = self._open_plan(filename, headers_inputs, document, dataset_dir)
+        self._writer = pq.ParquetWriter(self.path, schema)
+        self._written = 0
+        self.block = ScenarioTable()
+
+    def write(self, case_id, tipo, desc, resultado, inputs):
+        self.block.append(case_id, tipo, desc, resultado, inputs)
+        if len(self.block) >= self.block_rows: self._flush()
+
+    def close(self):
+        if self._writer is None: return
+        self._flush()
+        if not self._written: self._writer.write_table(self.schema.empty_table())
+        self._writer.close()
+        self._writer = None
+
+    def _flush(self):
+        if not len(self.block): return
+        self._writer.write_table(self._block(self.block, 0, len(self.block)))
+        self._written += len(self.block)
+        self.block = ScenarioTable()
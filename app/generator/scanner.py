@@ -1,3 +1,5 @@
+from app.models.domain import NODE_TYPES, TREE_TYPES, Node
+
 class VariableScanner:
     def __init__(self):
         self.inputs_vector = set()  # Vx...
@@ -13,21 +15,21 @@ class VariableScanner:
         if isinstance(logic_tree, list):
             for item in logic_tree:
                 # Si el item es una estructura compleja, recursividad
-                if isinstance(item, (dict, list)):
+                if isinstance(item, TREE_TYPES):
                     self.scan(item)
                 # ¡CORRECCION! Si el item es un String directo (ej: "Vx014639"), leerlo
                 elif isinstance(item, str):
                     self._categorize(item)
         
         # CASO 2: Es un DICCIONARIO
-        elif isinstance(logic_tree, dict):
-            # Guardamos el nombre de la variable objetivo (target)
-            if "target" in logic_tree:
+        elif isinstance(logic_tree, NODE_TYPES):
+            # Guardamos el nombre de la variable objetivo (target): solo las instrucciones (dicts) lo tienen
+            if not isinstance(logic_tree, Node) and "target" in logic_tree:
                 self.defined_vars.add(logic_tree["target"])
             
             # Recorremos valores
-            for key, value in logic_tree.items():
-                if isinstance(value, (dict, list)):
+            for value in logic_tree.values():
+                if isinstance(value, TREE_TYPES):
                     self.scan(value) # Recursividad
                 elif isinstance(value, str):
                     self._categorize(value)
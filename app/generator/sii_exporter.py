@@ -1,4 +1,20 @@
 import os
+from app.generator.sinks import ScenarioSink
+
+# Filas que se arman y escriben de una vez (la tabla se recorre por bloques de columnas)
+BLOCK_ROWS = 4096
+
+# --- MAPA DE TRADUCCIÓN (NUEVO) ---
+# Convierte tipos internos de debug a tipos oficiales del SII
+TYPE_MAPPING = {
+    "Valida POS=0": "Norma NK",
+}
+
+# Encabezado del archivo
+HEADER_ROW = "Numero de caso|Tipo de caso|Datos de prueba|Resultado\n"
+
+# Enteros que float() representa exactamente: para ellos _format_number es str(valor)
+EXACT_INT_LIMIT = 2**53
 
 class SIIExporter:
     def __init__(self, output_dir):
@@ -9,73 +25,112 @@ class SIIExporter:
         Genera un archivo delimitado por PIPES (|) con el formato:
         Numero de caso|Tipo de caso|Datos de prueba|Resultado
         Donde Datos de prueba es: [Cod]=Val; ... ; VxVector=Val;
+
+        scenarios es una ScenarioTable: las entradas se leen por columna, no fila por fila.
         """
         path = os.path.join(self.output_dir, filename)
-        
-        # --- MAPA DE TRADUCCIÓN (NUEVO) ---
-        # Convierte tipos internos de debug a tipos oficiales del SII
-        TYPE_MAPPING = {
-            "Valida POS=0": "Norma NK",
-        }
-
-        # Encabezado del archivo
-        header_row = "Numero de caso|Tipo de caso|Datos de prueba|Resultado\n"
+        plan, needs_sort = self._header_plan(headers_inputs)
+        plan = [(scenarios.columns[key], prefix, is_code) for key, prefix, is_code in plan if key in scenarios.columns]
         
         with open(path, 'w', encoding='utf-8') as f:
-            f.write(header_row)
-
-            for scen in scenarios:
-                # 1. Construir la cadena de Datos de Prueba
-                input_string = self._build_input_string(scen, headers_inputs)
-                
-                # 2. Formatear Resultado (limpieza básica)
-                resultado = str(scen.get("Resultado_Esperado", "")).replace("\n", " ")
-
-                # 3. Traducir Tipo de Caso (NUEVO LÓGICA)
-                tipo_original = scen['Tipo']
-                tipo_final = TYPE_MAPPING.get(tipo_original, tipo_original)
-
-                # 4. Construir la línea final
-                line = f"{scen['ID_Caso']}|{tipo_final}|{input_string}|{resultado}\n"
-                f.write(line)
+            f.write(HEADER_ROW)
+
+            meta = scenarios.meta
+            for start in range(0, len(scenarios), BLOCK_ROWS):
+                stop = min(start + BLOCK_ROWS, len(scenarios))
+                # 1. Construir las cadenas de Datos de Prueba del bloque
+                input_strings = self._build_input_strings(plan, needs_sort, start, stop)
+
+                lines = [self._format_line(meta["ID_Caso"][r], meta["Tipo"][r], input_strings[r - start],
+                                           meta["Resultado_Esperado"][r]) for r in range(start, stop)]
+                f.write("".join(lines))
         
         return path
 
-    def _build_input_string(self, scenario_data, headers_inputs):
+    def _format_line(self, case_id, tipo_original, input_string, resultado):
+        # 2. Formatear Resultado (limpieza básica)
+        resultado = str(resultado).replace("\n", " ")
+
+        # 3. Traducir Tipo de Caso (NUEVO LÓGICA)
+        tipo_final = TYPE_MAPPING.get(tipo_original, tipo_original)
+
+        # 4. Construir la línea final
+        return f"{case_id}|{tipo_final}|{input_string}|{resultado}\n"
+
+    def _header_plan(self, headers_inputs):
         """
-        Separa en Códigos y Vectores, normaliza nombres y valores, y une con punto y coma.
+        Plan de columnas, armado una vez por suite: (clave original, "Llave=", es_código)
+        ya en el orden de salida (primero Códigos, luego Vectores, cada grupo alfabético).
+        Así cada fila solo formatea valores: sin normalizar llaves ni ordenar.
+
+        Ordenar por "Llave=" equivale a ordenar las entradas "Llave=Valor", porque las
+        llaves no contienen '='. Solo si dos encabezados quedan con la misma llave visible
+        el orden depende del valor: needs_sort indica que hay que ordenar cada fila.
         """
         codigos = []
         vectores = []
-
-        # Recorremos todos los inputs posibles que detectó el Scanner
         for key in headers_inputs:
-            # Obtenemos el valor del escenario (si no existe, asumimos vacío o 0 según logica, aquí vacío para no ensuciar)
-            raw_val = scenario_data.get(key)
-            
-            # Solo agregamos si hay un valor definido (distinto de None)
-            if raw_val is not None:
-                # Normalizamos Valor (111.0 -> 111)
-                val_str = self._format_number(raw_val)
-                
-                # Normalizamos Llave y clasificamos
-                norm_key = self._normalize_header(key)
-                
-                # Armamos el par "Llave=Valor"
-                entry = f"{norm_key}={val_str}"
-
-                if "[" in norm_key: # Es un Código [123]
-                    codigos.append(entry)
-                else: # Es un Vector Vx...
-                    vectores.append(entry)
-
-        # Ordenamos alfabéticamente para que se vea ordenado (opcional pero recomendado)
-        codigos.sort()
-        vectores.sort()
-
-        # Unimos: Primero Códigos, luego Vectores
-        full_list = codigos + vectores
-        return "; ".join(full_list) + ";" # Agregamos ; al final como en tu ejemplo
+            # Normalizamos Llave y clasificamos: Código [123] o Vector Vx...
+            norm_key = self._normalize_header(key)
+            if "[" in norm_key: codigos.append((key, f"{norm_key}=", True))
+            else: vectores.append((key, f"{norm_key}=", False))
+        codigos.sort(key=lambda item: item[1])
+        vectores.sort(key=lambda item: item[1])
+
+        plan = codigos + vectores
+        prefixes = [prefix for _, prefix, _ in plan]
+        needs_sort = len(set(prefixes)) != len(prefixes)
+        return plan, needs_sort
+
+    def _build_input_strings(self, plan, needs_sort, start, stop):
+        """
+        Para las filas [start, stop): arma las cadenas de Datos de Prueba recorriendo
+        las columnas del plan (ya ordenadas), así cada fila queda ordenada al armarla.
+        """
+        entries = [[] for _ in range(start, stop)]
+        flags = [[] for _ in range(start, stop)] if needs_sort else None
+        format_value = self._format_value
+
+        for column, prefix, is_code in plan:
+            rows, values = column.slice(start, stop)
+            for r, raw_val in zip(rows, values):
+                # Solo agregamos si hay un valor definido (distinto de None)
+                if raw_val is None: continue
+                entries[r - start].append(prefix + format_value(raw_val))
+                if needs_sort: flags[r - start].append(is_code)
+
+        if needs_sort:
+            return [self._join_sorted(row, row_flags) for row, row_flags in zip(entries, flags)]
+        return ["; ".join(row) + ";" for row in entries] # Agregamos ; al final como en tu ejemplo
+
+    def _build_input_string(self, inputs, plan, needs_sort, ranks=None):
+        """
+        Lo mismo que _build_input_strings para una sola fila (dict de entradas).
+        Con ranks (clave -> posición en el plan) se recorren solo las entradas de la fila.
+        """
+        if ranks is not None:
+            present = sorted(ranks[key] for key, raw_val in inputs.items() if raw_val is not None and key in ranks)
+            plan = [plan[i] for i in present]
+        entries = []
+        flags = []
+        for key, prefix, is_code in plan:
+            raw_val = inputs.get(key)
+            if raw_val is None: continue
+            entries.append(prefix + self._format_value(raw_val))
+            flags.append(is_code)
+        if needs_sort: return self._join_sorted(entries, flags)
+        return "; ".join(entries) + ";"
+
+    def _join_sorted(self, entries, flags):
+        # Llaves visibles repetidas: orden alfabético por fila, primero Códigos, luego Vectores
+        codigos = sorted(e for e, is_code in zip(entries, flags) if is_code)
+        vectores = sorted(e for e, is_code in zip(entries, flags) if not is_code)
+        return "; ".join(codigos + vectores) + ";"
+
+    def _format_value(self, value):
+        # Atajo para el caso común (enteros exactos); el resto pasa por _format_number
+        if type(value) is int and -EXACT_INT_LIMIT <= value <= EXACT_INT_LIMIT: return str(value)
+        return self._format_number(value)
 
     def _normalize_header(self, name):
         """Convierte C123 -> [123] y Vx010599 -> Vx599"""
@@ -101,4 +156,23 @@ class SIIExporter:
                 return str(int(f_val))
             return str(f_val)
         except:
-            return str(value)
\ No newline at end of file
+            return str(value)
+
+class SIISink(SIIExporter, ScenarioSink):
+    """Misma salida que SIIExporter.export, escrita fila a fila mientras el builder genera."""
+    def __init__(self, output_dir, filename, headers_inputs):
+        super().__init__(output_dir)
+        self.path = os.path.join(output_dir, filename)
+        self.plan, self.needs_sort = self._header_plan(headers_inputs)
+        # Posición de cada clave en el plan (si un encabezado se repite, se recorre el plan completo)
+        ranks = {key: i for i, (key, _, _) in enumerate(self.plan)}
+        self.ranks = ranks if len(ranks) == len(self.plan) else None
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write(HEADER_ROW)
+
+    def write(self, case_id, tipo, desc, resultado, inputs):
+        input_string = self._build_input_string(inputs, self.plan, self.needs_sort, self.ranks)
+        self._file.write(self._format_line(case_id, tipo, input_string, resultado))
+
+    def close(self):
+        if not self._file.closed: self._file.close()
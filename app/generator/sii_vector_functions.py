@@ -0,0 +1,42 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: solo lo requiere la evaluación por lotes
+    np = None
+
+# --- VERSIONES VECTORIZADAS DE LAS FUNCIONES SII ---
+# Reciben arreglos NumPy (una posición por escenario) y replican la semántica
+# de app/generator/sii_functions.py elemento a elemento.
+
+def SII_POS_VEC(valor):
+    """Retorna el valor si es positivo, sino 0"""
+    return np.maximum(0.0, valor)
+
+def SII_MIN_VEC(*args):
+    """Mínimo elemento a elemento de los argumentos"""
+    if not args: return 0.0
+    return np.minimum.reduce(np.broadcast_arrays(*args))
+
+def SII_MAX_VEC(*args):
+    """Máximo elemento a elemento de los argumentos"""
+    if not args: return 0.0
+    return np.maximum.reduce(np.broadcast_arrays(*args))
+
+def SII_BIN1_VEC(val1, val2):
+    """Entrega primer valor solo si este es MAYOR que el segundo, si no 0"""
+    return np.where(val1 > val2, val1, 0.0)
+
+def SII_BIN2_VEC(val1, val2):
+    """Entrega primer valor solo si este es MENOR que el segundo, si no 0"""
+    return np.where(val1 < val2, val1, 0.0)
+
+def SII_ABS_VEC(val):
+    """Valor absoluto"""
+    return np.abs(val)
+
+def SII_NEG_VEC(val):
+    """Opuesto de POS: Si es negativo entrega su valor absoluto, sino 0"""
+    return np.where(val < 0, np.abs(val), 0.0)
+
+def SII_INT_VEC(val):
+    """Parte entera (trunca hacia cero, como int())"""
+    return np.trunc(val)
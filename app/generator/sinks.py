@@ -0,0 +1,18 @@
+class ScenarioSink:
+    """
+    Destino de escenarios en modo streaming: ScenarioBuilder._add_case llama a write()
+    con cada fila apenas se genera (mismos datos que ScenarioTable.append) y el
+    pipeline llama a close() al terminar la suite. Todos los sinks de una suite
+    comparten esa única pasada, así que la memoria queda acotada por una fila.
+    """
+    def write(self, case_id, tipo, desc, resultado, inputs):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,52 @@
+import hashlib
+import json
+import os
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""): digest.update(chunk)
+    return digest.hexdigest()
+
+class BuildManifest:
+    """
+    Manifiesto de construcción incremental (manifest.json en el directorio de salida).
+
+    Por cada documento guarda las huellas de todo lo que determina su salida
+    (texto de entrada, parameters.csv, biblioteca de macros, gramática, código)
+    junto con el resumen y los archivos generados. Si al volver a procesar las
+    huellas coinciden y los archivos siguen en disco, el documento se omite y
+    se reutilizan sus salidas anteriores.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get("documentos", {})
+            except (ValueError, OSError):
+                # Manifiesto corrupto: se reconstruye todo
+                self.entries = {}
+
+    def is_fresh(self, key, fingerprints, output_dir):
+        entry = self.entries.get(key)
+        if not entry or entry.get("huellas") != fingerprints: return False
+        return all(os.path.exists(os.path.join(output_dir, name)) for name in entry.get("archivos", []))
+
+    def summary(self, key):
+        return dict(self.entries[key]["resumen"])
+
+    def record(self, key, fingerprints, summary):
+        self.entries[key] = {
+            "huellas": fingerprints,
+            "archivos": summary.get("archivos", []),
+            "resumen": summary
+        }
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"documentos": self.entries}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
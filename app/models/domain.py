@@ -0,0 +1,114 @@
+from collections.abc import Mapping
+
+# --- MODELO DE NODOS DEL ÁRBOL LÓGICO ---
+# Clases con __slots__ que produce ObservacionTransformer. Ocupan una fracción de
+# la memoria de un dict y se recorren por atributo (node.left, node.terms...).
+# Los recorridos calientes (MathEngine, LinearFormCache, LeafIndex, scanner...)
+# despachan por clase y leen atributos: un campo que la clase no tiene vale None.
+#
+# Para la exportación JSON y los predicados sintéticos (dicts) cada nodo se
+# comporta además como un Mapping de solo lectura con EXACTAMENTE las mismas
+# claves, en el mismo orden, que el dict que generaba el transformer:
+# node["op"], node.get("type", ""), "terms" in node, node.items()...
+# Los nodos son inmutables por convención (se comparten en el DAG del parser).
+
+class Node(Mapping):
+    __slots__ = ()
+    KEYS = ()   # Claves JSON, en orden de salida (cada una es un atributo)
+    _KEYSET = frozenset()
+    # Campos ausentes: valen None a nivel de clase (los slots de cada subclase los tapan)
+    op = left = right = terms = function = args = cond = true = false = value = type = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._KEYSET = frozenset(cls.KEYS)
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values): object.__setattr__(self, name, value)
+
+    def __getitem__(self, key):
+        if key in self._KEYSET: return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self._KEYSET: return getattr(self, key)
+        return default
+
+    def __contains__(self, key):
+        return key in self._KEYSET
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def items(self):
+        return tuple((key, getattr(self, key)) for key in self.KEYS)
+
+    def values(self):
+        return tuple(getattr(self, key) for key in self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return repr(to_json(self))
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, name) for name in self.__slots__))
+
+class Comparison(Node):
+    """left <op> right, con op en >, <, >=, <=, =, ≠"""
+    __slots__ = ("op", "left", "right")
+    KEYS = ("op", "left", "right")
+
+class BinOp(Node):
+    """Operación binaria: -, *, / y los conectores lógicos OR / AND"""
+    __slots__ = ("op", "left", "right")
+    KEYS = ("op", "left", "right")
+
+class Sum(Node):
+    """Suma n-aria (el transformer entrega siempre 2 términos, anidados a la izquierda)"""
+    __slots__ = ("terms",)
+    KEYS = ("op", "terms")
+    op = "+"
+
+class FunctionCall(Node):
+    """POS, MIN, MAX, BIN1, BIN2, ABS, NEG, M11..."""
+    __slots__ = ("function", "args")
+    KEYS = ("function", "args")
+
+class Conditional(Node):
+    """SI(cond; true; false)"""
+    __slots__ = ("cond", "true", "false")
+    KEYS = ("type", "cond", "true", "false")
+    type = "conditional"
+
+class StringLiteral(Node):
+    """Literal de texto, ej: "K" (resultado de M11)"""
+    __slots__ = ("value",)
+    KEYS = ("type", "value")
+    type = "string"
+
+class Var(str):
+    """Nombre de variable (Vx..., C..., P..., o variable calculada). Es un str."""
+    __slots__ = ()
+
+# Tipos que los recorridos deben tratar como nodo: los del modelo y los dicts
+# que arman los generadores (predicados sintéticos, variantes de comparación...)
+NODE_TYPES = (dict, Node)
+TREE_TYPES = (dict, Node, list)
+
+def node_get(node, key):
+    """Campo de un nodo del modelo (por atributo) o de un dict sintético (por clave); None si falta."""
+    return getattr(node, key) if isinstance(node, Node) else node.get(key)
+
+def to_json(tree):
+    """Adaptador JSON: convierte el árbol (nodos, listas, hojas) a dicts/listas planos."""
+    if isinstance(tree, NODE_TYPES): return {k: to_json(v) for k, v in tree.items()}
+    if isinstance(tree, list): return [to_json(item) for item in tree]
+    if isinstance(tree, Var): return str(tree)
+    return tree
+
+def json_default(obj):
+    """Para json.dump(..., default=json_default): serializa nodos como su dict equivalente."""
+    if isinstance(obj, Node): return dict(obj.items())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
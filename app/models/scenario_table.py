@@ -0,0 +1,144 @@
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+# --- TABLA COLUMNAR DE ESCENARIOS ---
+# Reemplaza a la lista de dicts "anchos" de ScenarioBuilder.scenarios:
+#  - Metadatos (ID_Caso, Tipo, Descripcion, Resultado_Esperado): una lista por campo
+#    (ID_Caso en un arreglo de enteros, Tipo internado).
+#  - Entradas: una columna por nombre (nombres internados). Cada columna es dispersa:
+#    guarda solo las filas donde la entrada está presente (rows) y sus valores en un
+#    arreglo tipado ('q' enteros / 'd' float) mientras todos sean del mismo tipo; ante
+#    tipos mezclados pasa a lista, para conservar exactamente el valor (1000 vs 1000.0).
+#  - Contexto_Visual ya no se guarda: se arma al pedirlo.
+#
+# Iterar la tabla entrega vistas de solo lectura con las mismas claves y orden que el
+# dict de antes, para los consumidores que aún recorren fila por fila.
+
+META_FIELDS = ("ID_Caso", "Tipo", "Descripcion", "Resultado_Esperado")
+INT64_MIN, INT64_MAX = -2**63, 2**63 - 1
+
+class InputColumn:
+    __slots__ = ("name", "index", "rows", "values")
+
+    def __init__(self, name, index):
+        self.name = name
+        self.index = index          # posición en la tabla (id usado en el índice por fila)
+        self.rows = array('q')      # filas con valor (crecientes)
+        self.values = array('q')    # valor de cada fila presente
+
+    def append(self, row, value):
+        self.rows.append(row)
+        values = self.values
+        if isinstance(values, array):
+            if not values and type(value) is float and values.typecode == 'q':
+                values = self.values = array('d')
+            if values.typecode == 'q' and type(value) is int and INT64_MIN <= value <= INT64_MAX:
+                values.append(value)
+                return
+            if values.typecode == 'd' and type(value) is float:
+                values.append(value)
+                return
+            values = self.values = list(values)
+        values.append(value)
+
+    def get(self, row, default=None):
+        i = bisect_left(self.rows, row)
+        if i < len(self.rows) and self.rows[i] == row: return self.values[i]
+        return default
+
+    def slice(self, start, stop):
+        """(filas, valores) presentes en [start, stop)."""
+        lo = bisect_left(self.rows, start)
+        hi = bisect_left(self.rows, stop)
+        return self.rows[lo:hi], self.values[lo:hi]
+
+class ScenarioTable:
+    def __init__(self):
+        self.meta = {"ID_Caso": array('q'), "Tipo": [], "Descripcion": [], "Resultado_Esperado": []}
+        self.columns = {}                # nombre -> InputColumn (orden de aparición)
+        self._row_columns = array('q')   # por fila, ids de columna presentes (CSR)
+        self._row_offsets = array('q', [0])
+        self._column_list = []           # id -> InputColumn
+
+    def __len__(self):
+        return len(self.meta["Tipo"])
+
+    def __iter__(self):
+        for i in range(len(self)): yield ScenarioRow(self, i)
+
+    def __getitem__(self, i):
+        if i < 0: i += len(self)
+        if not 0 <= i < len(self): raise IndexError(i)
+        return ScenarioRow(self, i)
+
+    def append(self, case_id, tipo, desc, resultado, inputs):
+        """Agrega un escenario; inputs son las entradas ya filtradas (en orden). Retorna la fila."""
+        row = len(self)
+        self.meta["ID_Caso"].append(int(case_id))
+        self.meta["Tipo"].append(sys.intern(str(tipo)))
+        self.meta["Descripcion"].append(desc)
+        self.meta["Resultado_Esperado"].append(resultado)
+        for name, value in inputs.items():
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = InputColumn(sys.intern(str(name)), len(self._column_list))
+                self._column_list.append(column)
+            column.append(row, value)
+            self._row_columns.append(column.index)
+        self._row_offsets.append(len(self._row_columns))
+        return row
+
+    def append_description(self, row, text):
+        self.meta["Descripcion"][row] += text
+
+    def select(self, rows):
+        """Nueva tabla con las filas indicadas (en ese orden)."""
+        table = ScenarioTable()
+        for i in rows:
+            table.append(self.meta["ID_Caso"][i], self.meta["Tipo"][i], self.meta["Descripcion"][i],
+                         self.meta["Resultado_Esperado"][i], dict(self.inputs(i)))
+        return table
+
+    def column_names(self):
+        return list(self.columns)
+
+    def inputs(self, row):
+        """Pares (entrada, valor) de una fila, en el orden en que se agregaron."""
+        start, stop = self._row_offsets[row], self._row_offsets[row + 1]
+        for column_id in self._row_columns[start:stop]:
+            column = self._column_list[column_id]
+            yield column.name, column.get(row)
+
+    def visual_context(self, row):
+        return "; ".join([f"{k}={v}" if k.startswith("Vx") else f"[{k[1:]}]={v}" for k, v in self.inputs(row)])
+
+class ScenarioRow(Mapping):
+    """Vista de una fila con las claves del dict de escenario original."""
+    __slots__ = ("table", "row")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, key):
+        table = self.table
+        if key == "ID_Caso": return str(table.meta["ID_Caso"][self.row])
+        if key in table.meta: return table.meta[key][self.row]
+        if key == "Contexto_Visual": return table.visual_context(self.row)
+        column = table.columns.get(key)
+        if column is not None:
+            missing = object()
+            value = column.get(self.row, missing)
+            if value is not missing: return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from META_FIELDS
+        yield "Contexto_Visual"
+        for name, _ in self.table.inputs(self.row): yield name
+
+    def __len__(self):
+        start, stop = self.table._row_offsets[self.row], self.table._row_offsets[self.row + 1]
+        return len(META_FIELDS) + 1 + (stop - start)
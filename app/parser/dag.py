@@ -0,0 +1,89 @@
+from app.models.domain import Node
+
+class ExpressionDAG:
+    """
+    Hash-consing de los árboles del transformer: sub-árboles estructuralmente
+    idénticos pasan a ser el MISMO objeto, así que el documento completo
+    queda como un DAG (ej: REX y REX_2 comparten todo su árbol).
+
+    Solo se internan los nodos del modelo (app.models.domain), que son inmutables.
+    Los dicts planos (secciones, instrucciones) se copian: cada aparición es un dict
+    propio con sus hijos internados, y nunca se comparte. Las cachés por nodo (compilación del MathEngine, formas lineales, hojas...)
+    están indexadas por id(nodo), de modo que se calculan una vez por sub-árbol
+    único. Cada nodo recibe además un ID estable (orden de internado), útil para
+    tablas laterales y depuración.
+
+    Los nodos internados son compartidos: NO se deben modificar en el lugar.
+    El JSON resultante es idéntico al del árbol original (mismo orden de claves).
+
+    base: otro DAG (ej: el de las macros globales) cuyos nodos se reutilizan.
+    """
+    def __init__(self, base=None):
+        self.base = base
+        self._table = {}    # clave estructural -> nodo
+        self._ids = {}      # id(nodo) -> (nodo, node_id)
+        self._next_id = base._next_id if base else 0
+
+    def __len__(self):
+        return len(self._table) + (len(self.base) if self.base else 0)
+
+    def intern(self, tree):
+        """Retorna el árbol con sus sub-árboles compartidos."""
+        return self._intern(tree)[0]
+
+    def node_id(self, node):
+        hit = self._ids.get(id(node))
+        if hit is not None and hit[0] is node: return hit[1]
+        if self.base: return self.base.node_id(node)
+        return None
+
+    def _lookup(self, key):
+        node = self._table.get(key)
+        if node is None and self.base: return self.base._lookup(key)
+        return node
+
+    def _register(self, key, node):
+        self._table[key] = node
+        self._ids[id(node)] = (node, self._next_id)
+        self._next_id += 1
+
+    def _intern(self, tree):
+        # Retorna (valor internado, clave estructural)
+        if isinstance(tree, Node):
+            # Nodo del modelo: se reconstruye con sus campos (slots) internados
+            values = []
+            value_keys = []
+            for name in tree.__slots__:
+                value, value_key = self._intern(getattr(tree, name))
+                values.append(value)
+                value_keys.append(value_key)
+            key = (type(tree).__name__, tuple(value_keys))
+            node = self._lookup(key)
+            if node is None:
+                node = type(tree)(*values)
+                self._register(key, node)
+            return node, ("n", self.node_id(node))
+
+        if isinstance(tree, dict):
+            items = []
+            for k, v in tree.items():
+                items.append((k, self._intern(v)[0]))
+            # Mutable: copia propia; su clave es la identidad, así que quien lo contenga tampoco se comparte
+            node = dict(items)
+            return node, ("o", id(node))
+
+        if isinstance(tree, list):
+            values = []
+            keys = []
+            for item in tree:
+                value, value_key = self._intern(item)
+                values.append(value)
+                keys.append(value_key)
+            return values, ("l", tuple(keys))
+
+        # Hojas: el tipo es parte de la clave (1, 1.0 y True no son lo mismo en la salida)
+        if isinstance(tree, float): return tree, ("f", tree.hex())
+        try:
+            return tree, (type(tree).__name__, tree)
+        except TypeError:
+            return tree, ("o", id(tree))
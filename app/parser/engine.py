@@ -0,0 +1,62 @@
+import hashlib
+import os
+from lark import Lark
+from app.parser import transformer as transformer_module
+from app.models import domain as domain_module
+
+PARSER_DIR = os.path.dirname(os.path.abspath(__file__))
+GRAMMAR_FILES = {
+    "lalr": os.path.join(PARSER_DIR, 'grammar_lalr.lark'),
+    "earley": os.path.join(PARSER_DIR, 'grammar.lark'),
+}
+
+class ParserEngine:
+    """
+    Fábrica de parsers Lark para las observaciones.
+
+    - 'lalr' (por defecto): usa grammar_lalr.lark. Las tablas LALR se serializan
+      en cache_dir la primera vez y en los arranques siguientes solo se cargan
+      desde disco (Lark verifica el hash de la gramática y recompila si cambió).
+    - 'earley': gramática original, sin caché. Útil para comparar resultados.
+
+    Si se entrega un transformer (solo LALR), se aplica en línea durante el
+    parseo: parse() retorna directamente las estructuras del transformer, sin
+    materializar el árbol Lark intermedio ni hacer una segunda pasada.
+    """
+    def __init__(self, mode="lalr", cache_dir=None):
+        if mode not in GRAMMAR_FILES:
+            raise ValueError(f"Modo de parser desconocido: {mode}")
+        self.mode = mode
+        self.cache_dir = cache_dir
+
+    def load_grammar(self):
+        with open(GRAMMAR_FILES[self.mode], 'r', encoding='utf-8') as file:
+            return file.read()
+
+    def fingerprint(self):
+        """Huella de gramática + transformer + modelo de nodos: cambia si cambia la forma de los árboles."""
+        digest = hashlib.sha256(self.load_grammar().encode('utf-8'))
+        for module in (transformer_module, domain_module):
+            with open(module.__file__, 'rb') as f:
+                digest.update(f.read())
+        return digest.hexdigest()
+
+    def build(self, propagate_positions=True, transformer=None):
+        grammar_text = self.load_grammar()
+
+        if self.mode == "earley":
+            if transformer is not None:
+                raise ValueError("El transformer en línea solo está disponible en modo 'lalr'")
+            return Lark(grammar_text, start='start', propagate_positions=propagate_positions)
+
+        return Lark(grammar_text, start='start', parser='lalr',
+                    propagate_positions=propagate_positions,
+                    transformer=transformer,
+                    cache=self._cache_path(propagate_positions))
+
+    def _cache_path(self, propagate_positions):
+        # Sin directorio explícito, Lark usa su caché en el directorio temporal
+        if not self.cache_dir: return True
+        os.makedirs(self.cache_dir, exist_ok=True)
+        suffix = "_pos" if propagate_positions else ""
+        return os.path.join(self.cache_dir, f"grammar_lalr{suffix}.lark_cache")
@@ -1,5 +1,61 @@
 import re
 
+# --- PATRONES PRECOMPILADOS ---
+# Cada pasada de _normalize_formula conserva su regex original (el orden de las pasadas
+# importa: fusionar ".y." con ".o." o " y " con " o " cambia el resultado en casos borde),
+# pero se compila una sola vez y se omite cuando la línea no contiene el literal que la
+# regex exige para coincidir. Así una línea común hace unas pocas búsquedas de substring
+# en vez de ~25 re.sub, y el resultado es byte a byte el mismo.
+_TITLE_CONDITION = re.compile(r'^\s*Condici[oó]n de Entrada\s*:?\s*', re.IGNORECASE | re.MULTILINE)
+_TITLE_VARIABLES = re.compile(r'^\s*Variables\s*:?\s*', re.IGNORECASE | re.MULTILINE)
+
+_TRAILING_DOT = re.compile(r'(\d+)\.\s*$')
+_DOT_BEFORE_PAREN = re.compile(r'(\d+)\.\s*\)')
+_PAREN_DOT = re.compile(r'\)\.\s*$')
+
+_AUDIT_VECTOR = re.compile(r'\b[vV][xX]\.?\s*(\d+)')
+_AUDIT_AND = re.compile(r'(\.[yY]\.| \s*[yY]\s* )')
+_AUDIT_OR = re.compile(r'(\.[oO]\.| \s*[oO]\s* )')
+
+# Fase 0: entidades
+_VECTOR = _AUDIT_VECTOR
+_CODE = re.compile(r'\b[cC]\s*(\d+)')
+_PARAM = re.compile(r'\b[pP]\s*(\d+)')
+_SHORTHAND_OR = re.compile(r'(\b[a-zA-Z_]\w*\s*=\s*[\w\.]+)\s*\.[oO]\.\s*([\w\.]+)(?=\s*(?:\.[oO]\.|\.[yY]\.|\)|$))',
+                           re.IGNORECASE)
+
+# Fase 1: operadores y funciones
+_DOT_AND = re.compile(r'\s*\.\s*[yY]\s*\.\s*')
+_DOT_OR = re.compile(r'\s*\.\s*[oO]\s*\.\s*')
+_WORD_AND = re.compile(r'\s+\b[yY]\b\s+')
+_WORD_OR = re.compile(r'\s+\b[oO]\b\s+')
+# MIN / MAX / POS son palabras disjuntas del mismo largo: una sola pasada equivale a las tres
+_FUNCTIONS = re.compile(r'\b(?:(Min)|(Max)|Pos)\b', re.IGNORECASE)
+
+# Fase 2: condicionales (todas exigen "si" en la línea)
+_IF_STANDARD = re.compile(r'=\s*Si\s*\((.*?)\)\s*=\s*(\d+)\s+(\d+)\s*,\s*Sino', re.IGNORECASE)
+_IF_MACRO = re.compile(r'=\s*(\d+)\s*;\s*(?:si\s+)?(.+?)\s*;\s*(\d+)\s*;\s*si\s*no\.?', re.IGNORECASE)
+_IF_LAX = re.compile(r'=\s*(\d+)\s*;\s*(?:si\s+)?(.*?)\s+(?:(\d+)\s*;\s*)?si\s*no\.?', re.IGNORECASE)
+_PIECEWISE = re.compile(r'(.*?=\s*)(.+?)\s*,si\s*(.+)\s+(.+?)\s*,si\s*(.*)', re.IGNORECASE)
+_IF_TUPLE = re.compile(r'\(\s*(.*?)\s*;\s*(.*?)\s*[;]\s*(.*?)\s*;\s*sino\s*\)', re.IGNORECASE)
+_IF_RESIDUE = re.compile(r'SI\(\s*Si\s+', re.IGNORECASE)
+
+def _expand_or(match):
+    full_assign = match.group(1)
+    var_name = full_assign.split('=')[0].strip()
+    next_val = match.group(2)
+    if '=' in next_val: return match.group(0)
+    return f"{full_assign} .o. {var_name}={next_val}"
+
+def _replace_piecewise(match):
+    prefix = match.group(1)
+    val1 = match.group(2)
+    cond1 = match.group(3)
+    val2 = match.group(4)
+    if val1.startswith("(") and val1.count("(") > val1.count(")"):
+        val1 = val1[1:]
+    return f"{prefix} SI({cond1}; {val1}; {val2})"
+
 class Normalizer:
     def __init__(self):
         # Lista de diccionarios: { "nivel":Str, "contexto":Str, "mensaje":Str }
@@ -13,8 +69,8 @@ class Normalizer:
         text = raw_text.replace("–", "-").replace("“", '"').replace("”", '"')
         
         # 2. Eliminación de Títulos de Usuario
-        text = re.sub(r'^\s*Condici[oó]n de Entrada\s*:?\s*', '', text, flags=re.IGNORECASE | re.MULTILINE)
-        text = re.sub(r'^\s*Variables\s*:?\s*', '', text, flags=re.IGNORECASE | re.MULTILINE)
+        text = _TITLE_CONDITION.sub('', text)
+        text = _TITLE_VARIABLES.sub('', text)
         
         # 3. Unificar líneas rotas
         lines = text.split('\n')
@@ -41,9 +97,10 @@ class Normalizer:
         normalized_lines = []
         for line in consolidated_lines:
             # --- PRE-CLEAN: CORRECCIÓN DE PUNTOS SEGURA ---
-            line = re.sub(r'(\d+)\.\s*$', r'\1', line)
-            line = re.sub(r'(\d+)\.\s*\)', r'\1)', line)
-            line = re.sub(r'\)\.\s*$', ')', line)
+            if "." in line:
+                line = _TRAILING_DOT.sub(lambda m: m.group(1), line)
+                line = _DOT_BEFORE_PAREN.sub(lambda m: m.group(1) + ")", line)
+                line = _PAREN_DOT.sub(')', line)
             
             # A. Auditoría Preventiva
             self._audit_line(line, context_name)
@@ -53,7 +110,7 @@ class Normalizer:
             norm = self._balance_parentheses(norm, context_name)
             
             # --- POST-CLEAN: LIMPIEZA FINAL ---
-            norm = re.sub(r'\)\.\s*$', ')', norm)
+            if "." in norm: norm = _PAREN_DOT.sub(')', norm)
             
             normalized_lines.append(norm)
             
@@ -74,7 +131,7 @@ class Normalizer:
         full_context = f"{context} -> {var_owner}"
 
         # 1. VALIDACIÓN DE VECTORES
-        matches = re.finditer(r'\b[vV][xX]\.?\s*(\d+)', text)
+        matches = _AUDIT_VECTOR.finditer(text)
         for match in matches:
             digits = match.group(1)
             full_str = match.group(0)
@@ -85,8 +142,8 @@ class Normalizer:
                               f"NO SE PUEDE DETERMINAR QUÉ VECTOR ES.")
 
         # 2. DETECCIÓN DE AMBIGÜEDAD DE OPERADORES
-        has_and = re.search(r'(\.[yY]\.| \s*[yY]\s* )', text)
-        has_or = re.search(r'(\.[oO]\.| \s*[oO]\s* )', text)
+        has_and = _AUDIT_AND.search(text)
+        has_or = _AUDIT_OR.search(text)
 
         if has_and and has_or:
             if "(" not in text and ")" not in text:
@@ -128,66 +185,51 @@ class Normalizer:
     def _normalize_formula(self, text, context):
         # --- FASE 0: ESTANDARIZACIÓN DE ENTIDADES ---
         text = text.replace("[", "").replace("]", "")
-        text = re.sub(r'\b[vV][xX]\.?\s*(\d+)', r'Vx\1', text)
-        text = re.sub(r'\b[cC]\s*(\d+)', r'C\1', text)
-        text = re.sub(r'\b[pP]\s*(\d+)', r'P\1', text)
-
-        # FASE 0.5: Expansión de "Shorthand OR"
-        for _ in range(10): 
-            def expand_or(match):
-                full_assign = match.group(1)   
-                var_name = full_assign.split('=')[0].strip()
-                next_val = match.group(2)      
-                if '=' in next_val: return match.group(0)
-                return f"{full_assign} .o. {var_name}={next_val}"
-
-            pattern = r'(\b[a-zA-Z_]\w*\s*=\s*[\w\.]+)\s*\.[oO]\.\s*([\w\.]+)(?=\s*(?:\.[oO]\.|\.[yY]\.|\)|$))'
-            
-            new_text = re.sub(pattern, expand_or, text, flags=re.IGNORECASE)
-            if new_text == text: break
-            text = new_text
+        # (reemplazos con función: una plantilla r'Vx\1' se expande en Python en cada coincidencia)
+        if "x" in text or "X" in text: text = _VECTOR.sub(lambda m: "Vx" + m.group(1), text)
+        if "c" in text or "C" in text: text = _CODE.sub(lambda m: "C" + m.group(1), text)
+        if "p" in text or "P" in text: text = _PARAM.sub(lambda m: "P" + m.group(1), text)
+
+        # FASE 0.5: Expansión de "Shorthand OR" (solo si hay un ".o." que expandir)
+        if ".o." in text or ".O." in text:
+            for _ in range(10):
+                new_text = _SHORTHAND_OR.sub(_expand_or, text)
+                if new_text == text: break
+                text = new_text
 
         # FASE 1: Operadores
-        text = re.sub(r'\s*\.\s*[yY]\s*\.\s*', ' Y ', text)
-        text = re.sub(r'\s*\.\s*[oO]\s*\.\s*', ' O ', text)
-        text = re.sub(r'\s+\b[yY]\b\s+', ' Y ', text)
-        text = re.sub(r'\s+\b[oO]\b\s+', ' O ', text)
-        
-        text = re.sub(r'\bMin\b', 'MIN', text, flags=re.IGNORECASE)
-        text = re.sub(r'\bMax\b', 'MAX', text, flags=re.IGNORECASE)
-        text = re.sub(r'\bPos\b', 'POS', text, flags=re.IGNORECASE)
+        if "." in text:
+            text = _DOT_AND.sub(' Y ', text)
+            text = _DOT_OR.sub(' O ', text)
+        if "y" in text or "Y" in text: text = _WORD_AND.sub(' Y ', text)
+        if "o" in text or "O" in text: text = _WORD_OR.sub(' O ', text)
+
+        text = _FUNCTIONS.sub(lambda m: "MIN" if m.group(1) else "MAX" if m.group(2) else "POS", text)
         text = text.replace("{", "(").replace("}", ")")
 
         # FASE 2: Patrones Condicionales (REGEX CORREGIDAS)
-        
+        # Todas exigen "si" (Si, Sino, si no, ,si, SI(): sin él la línea ya está lista.
+        # Solo en ASCII: con IGNORECASE "ſ" / "ı" / "İ" también coinciden con s / i
+        if text.isascii() and "si" not in text.lower(): return text
+
         # Patrón 1: = Si(...) = A B, Sino (Estándar)
-        text = re.sub(r'=\s*Si\s*\((.*?)\)\s*=\s*(\d+)\s+(\d+)\s*,\s*Sino', r'= SI(\1; \2; \3)', text, flags=re.IGNORECASE)
-        
+        text = _IF_STANDARD.sub(r'= SI(\1; \2; \3)', text)
+
         # Patrón 2: = A; Cond; B; Sino (Estilo Macros Crudas)
         # Importante: Excluye el ";" de la condición
-        text = re.sub(r'=\s*(\d+)\s*;\s*(?:si\s+)?(.+?)\s*;\s*(\d+)\s*;\s*si\s*no\.?', r'= SI(\2; \1; \3)', text, flags=re.IGNORECASE)
-        
+        text = _IF_MACRO.sub(r'= SI(\2; \1; \3)', text)
+
         # Patrón 3: Variación más laxa (para casos como Mi=1; Cond... 0; sino)
         # ELIMINAMOS EL IF RESTRICTIVO para que esto aplique siempre
         if "si(" not in text.lower():
-             text = re.sub(r'=\s*(\d+)\s*;\s*(?:si\s+)?(.*?)\s+(?:(\d+)\s*;\s*)?si\s*no\.?', r'= SI(\2; \1; \3)', text, flags=re.IGNORECASE)
+             text = _IF_LAX.sub(r'= SI(\2; \1; \3)', text)
 
         if ",si" in text.lower():
-            def replace_piecewise(match):
-                prefix = match.group(1)
-                val1 = match.group(2)
-                cond1 = match.group(3)
-                val2 = match.group(4)
-                cond2 = match.group(5)
-                if val1.startswith("(") and val1.count("(") > val1.count(")"):
-                    val1 = val1[1:]
-                return f"{prefix} SI({cond1}; {val1}; {val2})"
-            pattern = r'(.*?=\s*)(.+?)\s*,si\s*(.+)\s+(.+?)\s*,si\s*(.*)'
-            text = re.sub(pattern, replace_piecewise, text, flags=re.IGNORECASE)
-
-        text = re.sub(r'\(\s*(.*?)\s*;\s*(.*?)\s*[;]\s*(.*?)\s*;\s*sino\s*\)', r'SI(\2; \1; \3)', text, flags=re.IGNORECASE)
+            text = _PIECEWISE.sub(_replace_piecewise, text)
+
+        text = _IF_TUPLE.sub(r'SI(\2; \1; \3)', text)
 
         # Limpieza final de residuos "Si"
-        text = re.sub(r'SI\(\s*Si\s+', 'SI(', text, flags=re.IGNORECASE)
+        text = _IF_RESIDUE.sub('SI(', text)
 
-        return text
\ No newline at end of file
+        return text
@@ -1,4 +1,5 @@
 from lark import Transformer, Discard
+from app.models.domain import Comparison, BinOp, Sum, FunctionCall, Conditional, StringLiteral, Var
 
 class ObservacionTransformer(Transformer):
     # ... (Encabezados igual que antes) ...
@@ -9,17 +10,19 @@ class ObservacionTransformer(Transformer):
     def header_variables(self, _): return "Variables"
     def header_norma(self, _): return "Norma_Observacion"
     def instruction(self, s): return {"target": s[0], "logic": s[1]}
+    # Solo LALR: asignación cuyo destino parece Vx/C/P (Earley lo lee como var_nombre)
+    def instruction_codigo(self, s): return self.instruction([self.var_nombre(s[:1]), s[1]])
 
     # --- OPERADORES EXCEL ---
-    def or_op(self, s): return {"op": "OR", "left": s[0], "right": s[1]}
-    def and_op(self, s): return {"op": "AND", "left": s[0], "right": s[1]}
+    def or_op(self, s): return BinOp("OR", s[0], s[1])
+    def and_op(self, s): return BinOp("AND", s[0], s[1])
     
     # ... (Suma, Resta, Multi, Div, Comparison IGUAL QUE ANTES) ...
-    def comparison(self, s): return {"op": str(s[1]), "left": s[0], "right": s[2]}
-    def suma(self, s): return {"op": "+", "terms": s}
-    def resta(self, s): return {"op": "-", "left": s[0], "right": s[1]}
-    def multi(self, s): return {"op": "*", "left": s[0], "right": s[1]}
-    def div(self, s): return {"op": "/", "left": s[0], "right": s[1]}
+    def comparison(self, s): return Comparison(str(s[1]), s[0], s[2])
+    def suma(self, s): return Sum(s)
+    def resta(self, s): return BinOp("-", s[0], s[1])
+    def multi(self, s): return BinOp("*", s[0], s[1])
+    def div(self, s): return BinOp("/", s[0], s[1])
 
     # --- FUNCIONES ---
     def function_call(self, items):
@@ -28,27 +31,25 @@ class ObservacionTransformer(Transformer):
         
         # MAPEO ESPECIAL: SI(Cond; True; False) -> Estructura interna 'conditional'
         if fname == "SI":
-            return {
-                "type": "conditional",
-                "cond": args[0],
-                "true": args[1],
-                "false": args[2] if len(args) > 2 else 0
-            }
+            return Conditional(args[0], args[1], args[2] if len(args) > 2 else 0)
             
-        return {"function": fname, "args": args}
+        return FunctionCall(fname, args)
 
     def args(self, items): return items
     
     # --- ATOMOS (IGUAL QUE ANTES) ---
     def atom(self, s): return s[0]
-    def var_valor(self, s): return f"VALOR_{''.join(s)}"
+    def var_valor(self, s): return Var(f"VALOR_{''.join(s)}")
     def var_nombre(self, s): 
-        return str(s[0]).upper()
-    def VECTOR(self, t): return str(t)
-    def CODIGO(self, t): return f"C{t.split('C')[-1].strip()}"
-    def PARAMETRO(self, t): return str(t)
+        return Var(str(s[0]).upper())
+    def VECTOR(self, t): return Var(t)
+    def CODIGO(self, t): return Var(f"C{t.split('C')[-1].strip()}")
+    # Variantes LALR de Vx.12 / C 12 (Earley las lee con VECTOR / CODIGO)
+    VECTOR_PUNTO = VECTOR
+    CODIGO_ESPACIO = CODIGO
+    def PARAMETRO(self, t): return Var(t)
     def NUMBER(self, t): return float(t) if '.' in t else int(t)
 
     def string_literal(self, s):
         # s[0] viene con comillas: "K". Las quitamos con [1:-1]
-        return {"type": "string", "value": s[0][1:-1]}
\ No newline at end of file
+        return StringLiteral(s[0][1:-1])
\ No newline at end of file
@@ -0,0 +1,350 @@
+import os
+import re
+import glob
+import gzip
+import json
+import time
+import hashlib
+from collections.abc import Mapping
+from app.parser.engine import ParserEngine
+from app.parser.transformer import ObservacionTransformer
+from app.parser.normalizer import Normalizer
+from app.parser.dag import ExpressionDAG
+from app.models.domain import json_default
+from app.generator.scanner import VariableScanner
+from app.generator.csv_exporter import CSVExporter, CSVSink
+from app.generator.sii_exporter import SIIExporter, SIISink
+from app.generator.parquet_exporter import ParquetExporter, ParquetSink
+from app.generator.builder import ScenarioBuilder, ScenarioVerifier, VerificationSink
+from app.generator.param_loader import ParamLoader
+from app.generator.macro_library import MacroLibrary
+from app.generator.global_definitions import GLOBAL_DEFINITIONS
+from app.manifest import file_hash
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_CODE_FINGERPRINT = None
+
+def code_fingerprint():
+    """Huella del código de app/: un cambio en el generador invalida las salidas previas."""
+    global _CODE_FINGERPRINT
+    if _CODE_FINGERPRINT is None:
+        digest = hashlib.sha256()
+        for path in sorted(glob.glob(os.path.join(APP_DIR, '**', '*.py'), recursive=True)):
+            digest.update(os.path.relpath(path, APP_DIR).encode('utf-8'))
+            digest.update(file_hash(path).encode('utf-8'))
+        _CODE_FINGERPRINT = digest.hexdigest()
+    return _CODE_FINGERPRINT
+
+# Formatos de los JSON de salida (arbol_logico, reportes):
+#  - "indentado": indent=2, legible (por defecto solo con --debug).
+#  - "compacto" : sin espacios; se escribe elemento por elemento del nivel superior.
+#  - "jsonl"    : un registro por línea (.jsonl): cada elemento de una lista, o cada
+#                 par {clave: valor} de un dict, así se puede leer sin cargar todo.
+JSON_FORMATS = ("indentado", "compacto", "jsonl")
+
+# Encoder compacto: encode() usa la versión en C (json.dump con indent recorre en Python)
+_COMPACT_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=json_default)
+
+def nombre_json(nombre, formato="indentado", comprimir=False):
+    """Nombre final del archivo: arbol_logico.json -> arbol_logico.jsonl(.gz) según el formato."""
+    if formato == "jsonl": nombre = os.path.splitext(nombre)[0] + ".jsonl"
+    return nombre + ".gz" if comprimir else nombre
+
+def guardar_json(output_dir, nombre, datos, formato="indentado", comprimir=False):
+    path = os.path.join(output_dir, nombre_json(nombre, formato, comprimir))
+    opener = gzip.open if comprimir else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        if formato == "indentado":
+            json.dump(datos, f, indent=2, ensure_ascii=False, default=json_default)
+        else:
+            for chunk in _json_chunks(datos, formato): f.write(chunk)
+    return path
+
+def _json_chunks(datos, formato):
+    # Un trozo por elemento del nivel superior: nunca se arma el documento completo
+    encode = _COMPACT_ENCODER.encode
+    is_dict = isinstance(datos, Mapping)
+    if not is_dict and not isinstance(datos, (list, tuple)):
+        yield encode(datos) + "\n"
+        return
+
+    if formato == "jsonl":
+        records = ({key: value} for key, value in datos.items()) if is_dict else datos
+        for record in records: yield encode(record) + "\n"
+        return
+
+    yield "{" if is_dict else "["
+    items = datos.items() if is_dict else enumerate(datos)
+    for i, (key, value) in enumerate(items):
+        prefix = "," if i else ""
+        if is_dict: prefix += encode(str(key)) + ":"
+        yield prefix + encode(value)
+    yield "}\n" if is_dict else "]\n"
+
+def leer_input_segmentado(path):
+    with open(path, 'r', encoding='utf-8') as f: content = f.read()
+    def extract(tag):
+        match = re.search(f'<<<{tag}>>>(.*?)($|<<<)', content, re.DOTALL)
+        return match.group(1).strip() if match else ""
+    return {
+        "vars_pre": extract("VARIABLES_PRE"),
+        "cond_entrada": extract("CONDICION_ENTRADA"),
+        "vars_post": extract("VARIABLES_POST"),
+        "normas": extract("NORMAS")
+    }
+
+class ObservationPipeline:
+    """
+    Pipeline completo de una observación: normaliza, parsea, genera escenarios y exporta.
+
+    Todo lo que no depende del documento (parámetros, parser LALR, biblioteca de
+    macros) se prepara una sola vez en el constructor, de modo que una misma
+    instancia ("en caliente") procesa muchos documentos seguidos.
+    """
+    def __init__(self, param_path, cache_dir, debug=False, verbose=True, max_scenarios=None, covering_strength=None,
+                 verification="reportar", collapse_duplicates=False, streaming=False, parquet=False,
+                 parquet_dataset=None, json_format=None, json_gzip=False):
+        self.debug = debug
+        self.verbose = verbose
+        self.param_path = param_path
+        # Opciones del generador: forman parte de las huellas (cambiarlas invalida las salidas)
+        self.builder_options = {"max_scenarios": max_scenarios, "covering_strength": covering_strength,
+                                "collapse_duplicates": collapse_duplicates}
+        # Verificación de la suite: "reportar" (solo reporte), "descartar" (quita los inconsistentes) o None
+        self.verification = verification
+        # Streaming: CSV / SII (y la verificación) reciben cada escenario apenas se genera,
+        # sin retener la suite en memoria. Los duplicados solo se descartan y no hay "descartar".
+        self.streaming = streaming
+        # Parquet: casos_de_prueba.parquet junto al CSV y/o la partición del documento
+        # dentro de un dataset compartido (parquet_dataset/Documento=<nombre>/)
+        self.parquet = parquet
+        self.parquet_dataset = parquet_dataset
+        if parquet or parquet_dataset: ParquetExporter(None)   # Falla aquí si falta pyarrow
+        # JSON de salida: indentado solo en debug, salvo que se pida un formato explícito
+        self.json_format = json_format or ("indentado" if debug else "compacto")
+        self.json_gzip = json_gzip
+
+        self._log("📥 Cargando Parámetros...")
+        self.parameters = ParamLoader(param_path).load()
+
+        # Parser LALR: las tablas se cargan desde cache_dir (se compilan solo la primera vez)
+        self.engine = ParserEngine(cache_dir=cache_dir)
+        self.transformer = ObservacionTransformer()
+        if debug:
+            # Modo debug: árbol Lark completo con posiciones + transformación aparte
+            self.parser = self.engine.build(propagate_positions=True)
+        else:
+            # Modo normal: el transformer se aplica en línea, sin árbol intermedio
+            self.parser = self.engine.build(propagate_positions=False, transformer=self.transformer)
+
+        # Macros globales (Biblioteca compilada en cache_dir)
+        self._log("\n🌍 Procesando Definiciones Globales...")
+        self.macro_library = MacroLibrary(os.path.join(cache_dir, "macros.pkl"), self.parse,
+                                          Normalizer(), self.engine.fingerprint())
+        # Las macros se internan en un DAG compartido: sub-fórmulas repetidas (REX / REX_2,
+        # PGLO / REC8...) son un único nodo, y los documentos reutilizan esos nodos.
+        self.dag = ExpressionDAG()
+        self.macros = {name: self.dag.intern(logic) for name, logic in self.macro_library.load(GLOBAL_DEFINITIONS).items()}
+        self._log(f"   ♻️ {self.macro_library.stats['cache']} desde caché, {self.macro_library.stats['compiladas']} compiladas")
+        self._log(f"🐛 [DEBUG] Macros cargadas: {len(self.macros)}")
+
+    def parse(self, texto):
+        if self.debug: return self.transformer.transform(self.parser.parse(texto))
+        return self.parser.parse(texto)
+
+    def fingerprints(self, input_path):
+        """Huellas de todo lo que determina la salida de un documento (ver BuildManifest)."""
+        return {
+            "entrada": file_hash(input_path),
+            "parametros": file_hash(self.param_path) if os.path.exists(self.param_path) else "",
+            "macros": self.macro_library.library_hash,
+            "gramatica": self.engine.fingerprint(),
+            "codigo": code_fingerprint(),
+            "debug": self.debug,
+            "opciones": {**self.builder_options, "verificacion": self.verification, "streaming": self.streaming,
+                         "parquet": self.parquet, "parquet_dataset": self.parquet_dataset,
+                         "json": self.json_format, "json_gzip": self.json_gzip}
+        }
+
+    def process(self, input_path, output_dir):
+        """Procesa un documento y deja todos sus archivos en output_dir. Retorna un resumen."""
+        start = time.perf_counter()
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._log("📥 Leyendo segmentos de entrada...")
+        input_data = leer_input_segmentado(input_path)
+
+        self._log("🧹 Normalizando reglas de negocio...")
+        normalizer = Normalizer()
+
+        clean_vars_pre = normalizer.clean_section(input_data["vars_pre"], "Variables PRE")
+        clean_cond = normalizer.clean_section(input_data["cond_entrada"], "Condición Entrada")
+        clean_vars_post = normalizer.clean_section(input_data["vars_post"], "Variables POST")
+        clean_normas = normalizer.clean_section(input_data["normas"], "Normas")
+
+        # --- GESTIÓN DE REPORTES DE CALIDAD ---
+        archivo_calidad = self._guardar_json(output_dir, "reporte_calidad.json", normalizer.report)
+        critical_count = self._write_syntax_report(output_dir, normalizer.report)
+
+        # ENSAMBLAJE DEL TEXTO MAESTRO
+        texto_maestro = ""
+        if clean_cond: texto_maestro += f"Condición de Entrada: {clean_cond}\n\n"
+
+        vars_total = []
+        if clean_vars_pre: vars_total.append(clean_vars_pre)
+        if clean_vars_post: vars_total.append(clean_vars_post)
+        if vars_total: texto_maestro += "Variables:\n" + "\n".join(vars_total) + "\n\n"
+
+        if clean_normas: texto_maestro += clean_normas + "\n"
+
+        with open(os.path.join(output_dir, "debug_assembler.txt"), 'w', encoding='utf-8') as f:
+            f.write(texto_maestro)
+
+        # PARSING
+        if self.debug:
+            arbol_bruto = self.parser.parse(texto_maestro)
+            with open(os.path.join(output_dir, "debug_arbol_lark.txt"), 'w', encoding='utf-8') as f:
+                f.write(arbol_bruto.pretty())
+            datos_arbol = self.transformer.transform(arbol_bruto)
+        else:
+            datos_arbol = self.parser.parse(texto_maestro)
+        datos_arbol = ExpressionDAG(base=self.dag).intern(datos_arbol)
+
+        # GENERACIÓN
+        scanner = VariableScanner()
+        scanner.scan(datos_arbol)
+
+        self._log("🔍 Escaneando variables en macros globales...")
+        for macro_name, macro_logic in self.macros.items():
+            dummy_structure = {
+                "variables": [
+                    {"target": macro_name, "logic": macro_logic}
+                ]
+            }
+            scanner.scan(dummy_structure)
+
+        reporte_vars = scanner.get_report()
+
+        headers = reporte_vars["Vectores_Requeridos"] + reporte_vars["Codigos_Requeridos"]
+
+        self._log("🧠 Generando Escenarios...")
+        builder = ScenarioBuilder(datos_arbol, parameters=self.parameters, macros=self.macros,
+                                  retain_scenarios=not self.streaming, **self.builder_options)
+        documento = os.path.splitext(os.path.basename(input_path))[0]
+        if self.streaming:
+            total, reporte_verif = self._build_streaming(builder, output_dir, headers, documento)
+        else:
+            total, reporte_verif = self._build_and_export(builder, output_dir, headers, documento)
+
+        if builder.duplicate_count:
+            accion = "colapsados" if builder.collapse_duplicates else "detectados (usa --colapsar-duplicados para fundirlos)"
+            self._log(f"   ♻️ {builder.duplicate_count} escenarios duplicados {accion}")
+
+        inconsistentes = 0
+        if reporte_verif is not None:
+            inconsistentes = reporte_verif["inconsistentes"]
+            if "error" in reporte_verif:
+                self._log(f"   ⚠️ No se pudo verificar la suite completa: {reporte_verif['error']}")
+            if "respaldo_por_filas" in reporte_verif:
+                self._log(f"   ⚠️ Verificación escenario por escenario (falló el lote): {reporte_verif['respaldo_por_filas'][0]}")
+            if inconsistentes:
+                self._log(f"   ⚠️ {inconsistentes} de {reporte_verif['verificados']} escenarios no cumplen lo que afirman")
+            archivo_verif = self._guardar_json(output_dir, "reporte_verificacion.json", reporte_verif)
+
+        archivo_arbol = self._guardar_json(output_dir, "arbol_logico.json", datos_arbol)
+
+        archivos = [archivo_calidad, "advertencias_sintaxis.txt", "debug_assembler.txt",
+                    "casos_de_prueba.csv", "casos_oficiales_sii.txt", archivo_arbol]
+        if self.verification: archivos.append(archivo_verif)
+        if self.parquet: archivos.append("casos_de_prueba.parquet")
+        if self.debug: archivos.append("debug_arbol_lark.txt")
+
+        return {
+            "documento": os.path.basename(input_path),
+            "estado": "OK",
+            "escenarios": total,
+            "inconsistentes": inconsistentes,
+            "duplicados": builder.duplicate_count,
+            "errores_graves": critical_count,
+            "segundos": round(time.perf_counter() - start, 4),
+            "archivos": archivos
+        }
+
+    def _build_and_export(self, builder, output_dir, headers, documento):
+        """Suite completa en memoria: se verifica (y filtra) antes de exportar."""
+        escenarios = builder.build_suite()
+
+        reporte_verif = None
+        if self.verification:
+            self._log("🔎 Verificando escenarios...")
+            verifier = ScenarioVerifier(builder)
+            reporte_verif = verifier.verify(escenarios)
+            if self.verification == "descartar" and reporte_verif["inconsistentes"]:
+                escenarios = verifier.discard_invalid(escenarios, reporte_verif)
+
+        CSVExporter(output_dir).export("casos_de_prueba.csv", headers, escenarios)
+        SIIExporter(output_dir).export("casos_oficiales_sii.txt", headers, escenarios)
+        for dataset_dir in self._parquet_targets():
+            exporter = ParquetExporter(output_dir)
+            exporter.export("casos_de_prueba.parquet", headers, escenarios, documento, dataset_dir=dataset_dir)
+            self._log_parquet(exporter)
+        return len(escenarios), reporte_verif
+
+    def _build_streaming(self, builder, output_dir, headers, documento):
+        """Cada escenario va directo a los sinks (CSV, SII, Parquet, verificación) en una sola pasada."""
+        sinks = [builder.add_sink(CSVSink(output_dir, "casos_de_prueba.csv", headers)),
+                 builder.add_sink(SIISink(output_dir, "casos_oficiales_sii.txt", headers))]
+        parquet_sinks = [builder.add_sink(ParquetSink(output_dir, "casos_de_prueba.parquet", headers, documento,
+                                                      dataset_dir=dataset_dir))
+                         for dataset_dir in self._parquet_targets()]
+        sinks.extend(parquet_sinks)
+        verification = None
+        if self.verification:
+            if self.verification == "descartar":
+                self._log("   ⚠️ En streaming la verificación solo reporta (las filas ya se escribieron)")
+            verification = builder.add_sink(VerificationSink(ScenarioVerifier(builder)))
+            sinks.append(verification)
+        try:
+            builder.build_suite()
+        finally:
+            for sink in sinks: sink.close()
+        for sink in parquet_sinks: self._log_parquet(sink)
+        return builder.case_count, verification.report if verification else None
+
+    def _parquet_targets(self):
+        # None = archivo suelto en output_dir; un directorio = partición del dataset
+        targets = [None] if self.parquet else []
+        if self.parquet_dataset: targets.append(self.parquet_dataset)
+        return targets
+
+    def _log_parquet(self, exporter):
+        if exporter.skipped:
+            self._log(f"   ⚠️ Parquet: {exporter.skipped} valores no numéricos quedaron en null")
+
+    def _guardar_json(self, output_dir, nombre, datos):
+        """guardar_json con el formato configurado; retorna el nombre del archivo escrito."""
+        return os.path.basename(guardar_json(output_dir, nombre, datos, self.json_format, self.json_gzip))
+
+    def _write_syntax_report(self, output_dir, report):
+        critical_count = 0
+        with open(os.path.join(output_dir, "advertencias_sintaxis.txt"), 'w', encoding='utf-8') as f:
+            if report:
+                f.write("="*80 + "\n")
+                f.write("⚠️  REPORTE DE INCIDENCIAS EN EL DOCUMENTO ORIGINAL\n")
+                f.write("="*80 + "\n\n")
+                for item in report:
+                    prefix = "[INFO]"
+                    if item['nivel'] == 'CRITICAL':
+                        prefix = "[⛔ ERROR GRAVE]"
+                        critical_count += 1
+                    elif item['nivel'] == 'WARNING':
+                        prefix = "[⚠️ ADVERTENCIA]"
+                    f.write(f"{prefix} {item['contexto']}\n")
+                    f.write(f"    {item['mensaje']}\n")
+                    f.write("-" * 40 + "\n")
+            else:
+                f.write("✅ Documento procesado sin incidencias.")
+        return critical_count
+
+    def _log(self, message):
+        if self.verbose: print(message)
@@ -0,0 +1,126 @@
+"""
+Benchmark de los exportadores CSV / SII sobre una suite sintética grande.
+
+Mide el costo por fila de:
+  - CSVExporter / SIIExporter.export sobre una ScenarioTable (plan de columnas por suite),
+  - CSVSink / SIISink (streaming, fila a fila),
+  - ParquetExporter / ParquetSink, si pyarrow está instalado (incluye el tamaño frente al CSV),
+  - la implementación anterior (normalizar cada encabezado y ordenar en cada fila),
+    que se conserva aquí solo como referencia y para comprobar que la salida es idéntica.
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_exporters.py [--filas 100000] [--entradas 12]
+"""
+import os
+import sys
+import csv
+import time
+import random
+import argparse
+import tempfile
+import filecmp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.scenario_table import ScenarioTable
+from app.generator.csv_exporter import CSVExporter, CSVSink
+from app.generator.sii_exporter import SIIExporter, SIISink, HEADER_ROW, TYPE_MAPPING
+from app.generator.parquet_exporter import ParquetExporter, ParquetSink, pa
+
+TIPOS = ["Cond. OK", "Cond. NK", "Norma OK", "Norma NK", "Valida POS=0", "ALFA"]
+
+def suite_sintetica(filas, entradas_por_fila, seed=7):
+    """Encabezados al estilo del scanner (Vx + C) y filas con unas pocas entradas cada una."""
+    rng = random.Random(seed)
+    headers = [f"Vx01{n:04d}" for n in rng.sample(range(10000), 400)] + [f"C{n}" for n in rng.sample(range(1, 5000), 200)]
+    filas_datos = []
+    for i in range(filas):
+        claves = sorted(rng.sample(headers, entradas_por_fila))
+        inputs = {k: (rng.choice([1000, 1001, 999, 10, 111]) if rng.random() < 0.9 else rng.choice([0.5, 1000.0, 2.25]))
+                  for k in claves}
+        tipo = rng.choice(TIPOS)
+        filas_datos.append((11468 + i, tipo, f"Caso sintético #{i}", "Cumple" if i % 2 else "1000", inputs))
+    return headers, filas_datos
+
+# --- Implementación anterior (lista de dicts, todo por fila) ---
+
+def legacy_csv(path, headers_inputs, scenarios, exporter):
+    clean_headers = [exporter._normalize_header(h) for h in headers_inputs]
+    fieldnames = ["ID_Caso", "Tipo", "Descripcion", "Resultado_Esperado"] + clean_headers
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        for scen in scenarios:
+            clean_row = {k: scen.get(k, "") for k in ("ID_Caso", "Tipo", "Descripcion", "Resultado_Esperado")}
+            for original_key in headers_inputs:
+                if original_key in scen: clean_row[exporter._normalize_header(original_key)] = scen[original_key]
+            writer.writerow(clean_row)
+
+def legacy_sii(path, headers_inputs, scenarios, exporter):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(HEADER_ROW)
+        for scen in scenarios:
+            codigos, vectores = [], []
+            for key in headers_inputs:
+                raw_val = scen.get(key)
+                if raw_val is not None:
+                    norm_key = exporter._normalize_header(key)
+                    entry = f"{norm_key}={exporter._format_number(raw_val)}"
+                    (codigos if "[" in norm_key else vectores).append(entry)
+            codigos.sort()
+            vectores.sort()
+            input_string = "; ".join(codigos + vectores) + ";"
+            resultado = str(scen.get("Resultado_Esperado", "")).replace("\n", " ")
+            tipo = TYPE_MAPPING.get(scen['Tipo'], scen['Tipo'])
+            f.write(f"{scen['ID_Caso']}|{tipo}|{input_string}|{resultado}\n")
+
+def medir(nombre, filas, funcion):
+    start = time.perf_counter()
+    funcion()
+    segundos = time.perf_counter() - start
+    print(f"  {nombre:<34} {segundos:8.3f} s   {segundos / filas * 1e6:7.2f} µs/fila")
+    return segundos
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark de CSVExporter / SIIExporter")
+    arg_parser.add_argument("--filas", type=int, default=100000)
+    arg_parser.add_argument("--entradas", type=int, default=12, help="Entradas (Vx / C) presentes por fila")
+    args = arg_parser.parse_args()
+
+    headers, filas_datos = suite_sintetica(args.filas, args.entradas)
+    table = ScenarioTable()
+    for row in filas_datos: table.append(*row)
+    dicts = [{"ID_Caso": str(cid), "Tipo": tipo, "Descripcion": desc, "Resultado_Esperado": res, **inputs}
+             for cid, tipo, desc, res, inputs in filas_datos]
+
+    print(f"📊 {args.filas} filas, {len(headers)} encabezados, {args.entradas} entradas por fila")
+    with tempfile.TemporaryDirectory() as out:
+        def ruta(nombre): return os.path.join(out, nombre)
+
+        def streaming(sink_class, filename, *extra):
+            with sink_class(out, filename, headers, *extra) as sink:
+                for row in filas_datos: sink.write(*row)
+
+        print("CSV")
+        medir("anterior (dict por fila)", args.filas, lambda: legacy_csv(ruta("legacy.csv"), headers, dicts, CSVExporter(out)))
+        medir("export (tabla columnar)", args.filas, lambda: CSVExporter(out).export("tabla.csv", headers, table))
+        medir("CSVSink (streaming)", args.filas, lambda: streaming(CSVSink, "sink.csv"))
+
+        print("SII")
+        medir("anterior (dict por fila)", args.filas, lambda: legacy_sii(ruta("legacy.txt"), headers, dicts, SIIExporter(out)))
+        medir("export (tabla columnar)", args.filas, lambda: SIIExporter(out).export("tabla.txt", headers, table))
+        medir("SIISink (streaming)", args.filas, lambda: streaming(SIISink, "sink.txt"))
+
+        if pa is not None:
+            print("Parquet")
+            medir("export (tabla columnar)", args.filas, lambda: ParquetExporter(out).export("tabla.parquet", headers, table, "bench"))
+            medir("ParquetSink (streaming)", args.filas, lambda: streaming(ParquetSink, "sink.parquet", "bench"))
+            for nombre in ("tabla.csv", "tabla.parquet"):
+                print(f"  tamaño {nombre:<27} {os.path.getsize(ruta(nombre)) / 2**20:8.2f} MB")
+
+        identicos = all(filecmp.cmp(ruta("legacy.csv"), ruta(n), shallow=False) for n in ("tabla.csv", "sink.csv")) and \
+                    all(filecmp.cmp(ruta("legacy.txt"), ruta(n), shallow=False) for n in ("tabla.txt", "sink.txt"))
+        print("✅ Salidas idénticas a la implementación anterior" if identicos else "❌ Las salidas difieren")
+
+if __name__ == "__main__":
+    main()
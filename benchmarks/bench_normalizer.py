@@ -0,0 +1,305 @@
+"""
+Verificación y benchmark de Normalizer (app/parser/normalizer.py).
+
+Compara, byte a byte, la salida de clean_section (texto normalizado + reporte de
+calidad) contra la implementación anterior, que se conserva aquí tal cual como
+referencia: ~25 re.sub por línea, compilando cada patrón al vuelo.
+
+Corpus:
+  - input.txt y las definiciones globales (macros) del repo,
+  - los *.txt de --corpus DIR (observaciones reales, por sección),
+  - líneas sintéticas armadas con fragmentos de observaciones (semilla fija), que
+    mezclan ".o." abreviados, "Si ... sino", tramos ",si", llaves, puntos finales,
+    tabulaciones y caracteres que IGNORECASE confunde ("ſ", "ı", "İ").
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_normalizer.py [--corpus DIR] [--sinteticas 20000]
+"""
+import os
+import re
+import sys
+import glob
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.parser.normalizer import Normalizer
+from app.pipeline import leer_input_segmentado
+from app.generator.global_definitions import GLOBAL_DEFINITIONS
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECTIONS = ("vars_pre", "cond_entrada", "vars_post", "normas")
+
+# --- Implementación anterior (referencia) ---
+
+class LegacyNormalizer:
+        def __init__(self):
+            # Lista de diccionarios: { "nivel":Str, "contexto":Str, "mensaje":Str }
+            self.report = [] 
+
+        def clean_section(self, raw_text, context_name="General"):
+            """
+            Limpia un bloque de texto, elimina títulos y corrige sintaxis agresivamente.
+            """
+            # 1. Limpieza básica
+            text = raw_text.replace("–", "-").replace("“", '"').replace("”", '"')
+        
+            # 2. Eliminación de Títulos de Usuario
+            text = re.sub(r'^\s*Condici[oó]n de Entrada\s*:?\s*', '', text, flags=re.IGNORECASE | re.MULTILINE)
+            text = re.sub(r'^\s*Variables\s*:?\s*', '', text, flags=re.IGNORECASE | re.MULTILINE)
+        
+            # 3. Unificar líneas rotas
+            lines = text.split('\n')
+            consolidated_lines = []
+            buffer = []
+        
+            for line in lines:
+                line = line.strip()
+                if not line: continue
+            
+                # Detectamos inicio de instrucción
+                is_start = ("=" in line and not line.lower().startswith(("si", "sino", "."))) or line.strip().endswith(":")
+                if not buffer and not is_start: is_start = True
+
+                if is_start:
+                    if buffer: consolidated_lines.append(" ".join(buffer))
+                    buffer = [line]
+                else:
+                    buffer.append(line)
+        
+            if buffer: consolidated_lines.append(" ".join(buffer))
+        
+            # 4. Procesar línea por línea
+            normalized_lines = []
+            for line in consolidated_lines:
+                # --- PRE-CLEAN: CORRECCIÓN DE PUNTOS SEGURA ---
+                line = re.sub(r'(\d+)\.\s*$', r'\1', line)
+                line = re.sub(r'(\d+)\.\s*\)', r'\1)', line)
+                line = re.sub(r'\)\.\s*$', ')', line)
+            
+                # A. Auditoría Preventiva
+                self._audit_line(line, context_name)
+            
+                # B. Normalización y Corrección
+                norm = self._normalize_formula(line, context_name)
+                norm = self._balance_parentheses(norm, context_name)
+            
+                # --- POST-CLEAN: LIMPIEZA FINAL ---
+                norm = re.sub(r'\)\.\s*$', ')', norm)
+            
+                normalized_lines.append(norm)
+            
+            return "\n".join(normalized_lines)
+
+        def _add_log(self, level, context, message):
+            self.report.append({
+                "nivel": level,
+                "contexto": context,
+                "mensaje": message
+            })
+
+        def _audit_line(self, text, context):
+            """
+            Analiza la línea cruda buscando errores lógicos que no se deben autocorregir.
+            """
+            var_owner = text.split("=")[0].strip() if "=" in text else "Condición"
+            full_context = f"{context} -> {var_owner}"
+
+            # 1. VALIDACIÓN DE VECTORES
+            matches = re.finditer(r'\b[vV][xX]\.?\s*(\d+)', text)
+            for match in matches:
+                digits = match.group(1)
+                full_str = match.group(0)
+                if len(digits) != 6:
+                    self._add_log("CRITICAL", full_context, 
+                                  f"AMBIGÜEDAD GRAVE: El vector '{full_str}' tiene {len(digits)} dígitos. "
+                                  f"Se requieren exactamente 6 dígitos (ej: Vx011555). "
+                                  f"NO SE PUEDE DETERMINAR QUÉ VECTOR ES.")
+
+            # 2. DETECCIÓN DE AMBIGÜEDAD DE OPERADORES
+            has_and = re.search(r'(\.[yY]\.| \s*[yY]\s* )', text)
+            has_or = re.search(r'(\.[oO]\.| \s*[oO]\s* )', text)
+
+            if has_and and has_or:
+                if "(" not in text and ")" not in text:
+                     self._add_log("CRITICAL", full_context, 
+                                  "AMBIGÜEDAD LÓGICA GRAVE: Uso mixto de 'Y' y 'O' sin paréntesis. "
+                                  "POR FAVOR USE PARÉNTESIS para definir la jerarquía explícitamente.")
+                else:
+                     self._add_log("WARNING", full_context,
+                                   "PRECAUCIÓN LÓGICA: Se detectó mezcla de 'Y' y 'O'. Verifique paréntesis.")
+
+        def _balance_parentheses(self, text, context):
+            open_count = text.count("(")
+            close_count = text.count(")")
+        
+            if open_count == close_count:
+                return text
+            
+            var_name = text.split("=")[0].strip() if "=" in text else "Expresión"
+            full_context = f"{context} -> {var_name}"
+        
+            if close_count > open_count:
+                diff = close_count - open_count
+                new_text = text
+                for _ in range(diff):
+                    last_paren_index = new_text.rfind(")")
+                    if last_paren_index != -1:
+                        new_text = new_text[:last_paren_index] + new_text[last_paren_index+1:]
+                self._add_log("CRITICAL", full_context, f"ERROR GRAVE: Sobraban {diff} paréntesis de cierre. Se eliminaron.")
+                return new_text
+
+            if open_count > close_count:
+                diff = open_count - close_count
+                new_text = text + (")" * diff)
+                self._add_log("CRITICAL", full_context, f"ERROR GRAVE: Faltaban {diff} paréntesis de cierre. Se agregaron.")
+                return new_text
+            
+            return text
+
+        def _normalize_formula(self, text, context):
+            # --- FASE 0: ESTANDARIZACIÓN DE ENTIDADES ---
+            text = text.replace("[", "").replace("]", "")
+            text = re.sub(r'\b[vV][xX]\.?\s*(\d+)', r'Vx\1', text)
+            text = re.sub(r'\b[cC]\s*(\d+)', r'C\1', text)
+            text = re.sub(r'\b[pP]\s*(\d+)', r'P\1', text)
+
+            # FASE 0.5: Expansión de "Shorthand OR"
+            for _ in range(10): 
+                def expand_or(match):
+                    full_assign = match.group(1)   
+                    var_name = full_assign.split('=')[0].strip()
+                    next_val = match.group(2)      
+                    if '=' in next_val: return match.group(0)
+                    return f"{full_assign} .o. {var_name}={next_val}"
+
+                pattern = r'(\b[a-zA-Z_]\w*\s*=\s*[\w\.]+)\s*\.[oO]\.\s*([\w\.]+)(?=\s*(?:\.[oO]\.|\.[yY]\.|\)|$))'
+            
+                new_text = re.sub(pattern, expand_or, text, flags=re.IGNORECASE)
+                if new_text == text: break
+                text = new_text
+
+            # FASE 1: Operadores
+            text = re.sub(r'\s*\.\s*[yY]\s*\.\s*', ' Y ', text)
+            text = re.sub(r'\s*\.\s*[oO]\s*\.\s*', ' O ', text)
+            text = re.sub(r'\s+\b[yY]\b\s+', ' Y ', text)
+            text = re.sub(r'\s+\b[oO]\b\s+', ' O ', text)
+        
+            text = re.sub(r'\bMin\b', 'MIN', text, flags=re.IGNORECASE)
+            text = re.sub(r'\bMax\b', 'MAX', text, flags=re.IGNORECASE)
+            text = re.sub(r'\bPos\b', 'POS', text, flags=re.IGNORECASE)
+            text = text.replace("{", "(").replace("}", ")")
+
+            # FASE 2: Patrones Condicionales (REGEX CORREGIDAS)
+        
+            # Patrón 1: = Si(...) = A B, Sino (Estándar)
+            text = re.sub(r'=\s*Si\s*\((.*?)\)\s*=\s*(\d+)\s+(\d+)\s*,\s*Sino', r'= SI(\1; \2; \3)', text, flags=re.IGNORECASE)
+        
+            # Patrón 2: = A; Cond; B; Sino (Estilo Macros Crudas)
+            # Importante: Excluye el ";" de la condición
+            text = re.sub(r'=\s*(\d+)\s*;\s*(?:si\s+)?(.+?)\s*;\s*(\d+)\s*;\s*si\s*no\.?', r'= SI(\2; \1; \3)', text, flags=re.IGNORECASE)
+        
+            # Patrón 3: Variación más laxa (para casos como Mi=1; Cond... 0; sino)
+            # ELIMINAMOS EL IF RESTRICTIVO para que esto aplique siempre
+            if "si(" not in text.lower():
+                 text = re.sub(r'=\s*(\d+)\s*;\s*(?:si\s+)?(.*?)\s+(?:(\d+)\s*;\s*)?si\s*no\.?', r'= SI(\2; \1; \3)', text, flags=re.IGNORECASE)
+
+            if ",si" in text.lower():
+                def replace_piecewise(match):
+                    prefix = match.group(1)
+                    val1 = match.group(2)
+                    cond1 = match.group(3)
+                    val2 = match.group(4)
+                    cond2 = match.group(5)
+                    if val1.startswith("(") and val1.count("(") > val1.count(")"):
+                        val1 = val1[1:]
+                    return f"{prefix} SI({cond1}; {val1}; {val2})"
+                pattern = r'(.*?=\s*)(.+?)\s*,si\s*(.+)\s+(.+?)\s*,si\s*(.*)'
+                text = re.sub(pattern, replace_piecewise, text, flags=re.IGNORECASE)
+
+            text = re.sub(r'\(\s*(.*?)\s*;\s*(.*?)\s*[;]\s*(.*?)\s*;\s*sino\s*\)', r'SI(\2; \1; \3)', text, flags=re.IGNORECASE)
+
+            # Limpieza final de residuos "Si"
+            text = re.sub(r'SI\(\s*Si\s+', 'SI(', text, flags=re.IGNORECASE)
+
+            return text
+
+# --- Corpus ---
+
+FRAGMENTOS = [
+    "Vx010599", "vx 010599", "VX.011555", "vX12", "C1105", "c 608", "[C136]", "P18", "p 36", "[REX_2]",
+    "POS {Vx010055-Vx010087}", "pos(C1)", "Min(C1; C2)", "max (Vx010042, 0)", "MIN", "Posición",
+    "= 111", "=115", "≠1", ">0", "> P36", "<=", ">= 1000", "+", "-", "*", "(1-Mi)", "(épsilon)",
+    ".o.", ".O.", ".y.", ".Y.", ". y .", " y ", " o ", " Y ", " O ", "\t", "  ",
+    "Si", "si", "SI(", "Si (C1 > 0) = 1 0, Sino", "1; si", "0; si no.", "0; sino", "1; Si", "; sino)",
+    ",si", ", si", "(1; C1>0; 0; sino)", "sino", "si no", "ſi", "ıf", "İ", "K",
+    "(", ")", "{", "}", "12.", "3.)", ").", ".", ";", ",", "Condición de Entrada:", "Variables:",
+]
+
+def lineas_sinteticas(cantidad, seed=11):
+    rng = random.Random(seed)
+    lineas = []
+    for _ in range(cantidad):
+        partes = [rng.choice(FRAGMENTOS) for _ in range(rng.randint(2, 14))]
+        if rng.random() < 0.6: partes.insert(0, rng.choice(["Alfa =", "Mi= ", "x1=", "EPSILON =", "valor 3="]))
+        sep = rng.choice(["", " ", " ", "  "])
+        lineas.append(sep.join(partes))
+    return lineas
+
+def casos_repo(corpus_dir):
+    """(contexto, texto) de input.txt, las macros globales y los documentos de corpus_dir."""
+    casos = []
+    rutas = [os.path.join(REPO_DIR, "input.txt")]
+    if corpus_dir: rutas += sorted(glob.glob(os.path.join(corpus_dir, "*.txt")))
+    for ruta in rutas:
+        if not os.path.exists(ruta): continue
+        segmentos = leer_input_segmentado(ruta)
+        casos += [(f"{os.path.basename(ruta)}:{s}", segmentos[s]) for s in SECTIONS]
+    casos += [(f"Macro {name}", f"{name} = {formula}") for name, formula in GLOBAL_DEFINITIONS.items()]
+    return casos
+
+def ejecutar(normalizer_class, casos):
+    normalizer = normalizer_class()
+    salidas = [normalizer.clean_section(texto, contexto) for contexto, texto in casos]
+    return salidas, normalizer.report
+
+def medir(nombre, normalizer_class, casos, repeticiones):
+    start = time.perf_counter()
+    for _ in range(repeticiones): ejecutar(normalizer_class, casos)
+    segundos = (time.perf_counter() - start) / repeticiones
+    print(f"  {nombre:<28} {segundos * 1000:9.2f} ms   {segundos / len(casos) * 1e6:8.2f} µs/bloque")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Verificación y benchmark de Normalizer")
+    arg_parser.add_argument("--corpus", metavar="DIR", default=None, help="Directorio con observaciones (*.txt)")
+    arg_parser.add_argument("--sinteticas", type=int, default=20000, help="Líneas sintéticas a verificar")
+    arg_parser.add_argument("--repeticiones", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    casos = casos_repo(args.corpus)
+    sinteticas = [(f"Sintética {i}", linea) for i, linea in enumerate(lineas_sinteticas(args.sinteticas))]
+
+    diferencias = 0
+    for nombre, grupo in (("repo / corpus", casos), ("sintéticas", sinteticas)):
+        esperado, reporte_esperado = ejecutar(LegacyNormalizer, grupo)
+        obtenido, reporte_obtenido = ejecutar(Normalizer, grupo)
+        malas = [(c, e, o) for (c, _), e, o in zip(grupo, esperado, obtenido) if e != o]
+        if reporte_esperado != reporte_obtenido: malas.append(("reporte", "...", "..."))
+        print(f"🔎 {nombre}: {len(grupo)} bloques, {len(malas)} diferencias")
+        for contexto, e, o in malas[:5]: print(f"   ❌ {contexto}\n      antes: {e!r}\n      ahora: {o!r}")
+        diferencias += len(malas)
+
+    print("⏱️ clean_section")
+    for nombre, grupo, repeticiones in (("repo / corpus", casos, args.repeticiones),
+                                        ("sintéticas", sinteticas[:2000], max(1, args.repeticiones // 10))):
+        print(f" {nombre}")
+        medir("anterior (re.sub al vuelo)", LegacyNormalizer, grupo, repeticiones)
+        medir("precompilado + filtros", Normalizer, grupo, repeticiones)
+
+    print("✅ Salida idéntica a la implementación anterior" if not diferencias else f"❌ {diferencias} diferencias")
+    return 1 if diferencias else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
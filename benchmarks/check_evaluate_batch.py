@@ -0,0 +1,83 @@
+"""
+Verificación de MathEngine.evaluate_batch contra evaluate() escenario por escenario.
+
+Cada fórmula se normaliza y parsea igual que una variable del documento, se evalúa
+por lotes sobre columnas aleatorias y se compara con el intérprete de referencia.
+Incluye fórmulas donde todos los operandos son escalares (literales o nombres sin
+columna, que valen 0): ahí NumPy entrega un bool de Python y no un arreglo.
+
+Uso (desde la raíz del repo):
+    python benchmarks/check_evaluate_batch.py [--filas 200]
+"""
+import os
+import sys
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.parser.engine import ParserEngine
+from app.parser.transformer import ObservacionTransformer
+from app.parser.normalizer import Normalizer
+from app.generator.math_engine import MathEngine
+
+FORMULAS = [
+    # Solo escalares
+    "SI(OTRO > 0; 1; 0)",
+    "SI(1 > 0; 2; 3)",
+    "SI(OTRO = 0 Y 2 >= 1; 1; 0)",
+    "SI(OTRO ≠ 0 O 0 < 1; 1; 0)",
+    "SI(OTRO <= 0; 5; 6)",
+    "POS(OTRO - 1) + MAX(0; 1)",
+    # Escalares mezclados con columnas
+    "SI(C1105 > 0 Y OTRO > 0; 1; 0)",
+    "SI(C1105 > 0 O OTRO > 0; 1; 0)",
+    "SI(POS(Vx010055 - Vx010087) > P36; 1; 0)",
+    "C608 + C610 - C136 * 2",
+    "MIN(C608; C610) / C136",
+]
+
+def parse_formula(parser, transformer, normalizer, formula):
+    clean = normalizer.clean_section(f"X = {formula}", "Verificación").strip()
+    data = transformer.transform(parser.parse(f"Variables:\n{clean}"))
+    for section in data:
+        if section.get('section') == 'Variables':
+            for item in section.get('content', []):
+                if item.get('target') == "X": return item.get('logic')
+    return None
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Verificación de MathEngine.evaluate_batch")
+    arg_parser.add_argument("--filas", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    parser = ParserEngine(cache_dir=None).build()
+    transformer = ObservacionTransformer()
+    normalizer = Normalizer()
+    engine = MathEngine()
+
+    rng = random.Random(3)
+    names = ["C1105", "C608", "C610", "C136", "Vx010055", "Vx010087"]
+    columns = {name: [rng.choice([0, 1, 5, 100, 1000]) for _ in range(args.filas)] for name in names}
+    columns["P36"] = 100
+
+    fallas = 0
+    for formula in FORMULAS:
+        tree = parse_formula(parser, transformer, normalizer, formula)
+        try:
+            batch = engine.evaluate_batch(tree, columns, args.filas)
+        except Exception as e:
+            print(f"❌ {formula}: {type(e).__name__}: {e}")
+            fallas += 1
+            continue
+        rows = [{k: (v[i] if isinstance(v, list) else v) for k, v in columns.items()} for i in range(args.filas)]
+        expected = [float(engine.evaluate(tree, row)) for row in rows]
+        distintos = sum(1 for a, b in zip(batch, expected) if a != b)
+        print(f"{'✅' if not distintos else '❌'} {formula}: {distintos} filas distintas")
+        fallas += bool(distintos)
+
+    print("✅ evaluate_batch coincide con evaluate()" if not fallas else f"❌ {fallas} fórmulas con diferencias")
+    return 1 if fallas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
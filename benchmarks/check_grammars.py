@@ -0,0 +1,87 @@
+"""
+Verificación de grammar_lalr.lark contra la gramática Earley original (grammar.lark).
+
+Ambas deben producir los mismos árboles (tras ObservacionTransformer) para:
+  - input.txt y los *.txt de --corpus DIR, normalizados y ensamblados como en el pipeline,
+  - las definiciones globales (macros),
+  - identificadores que empiezan como un Código / Vector / Parámetro (C1X, Vx1a, P18a...):
+    Earley los lee como un solo nombre; con espacio o punto intermedio los separa
+    (y "Vx.12 = 3" o "C 12 = 3" son comparaciones, no asignaciones).
+
+Uso (desde la raíz del repo):
+    python benchmarks/check_grammars.py [--corpus DIR]
+"""
+import os
+import sys
+import glob
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.parser.engine import ParserEngine
+from app.parser.transformer import ObservacionTransformer
+from app.parser.normalizer import Normalizer
+from app.pipeline import leer_input_segmentado
+from app.models.domain import to_json
+from app.generator.global_definitions import GLOBAL_DEFINITIONS
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IDENTIFICADORES = [
+    "C1X = 1", "C12X = 1", "C1_2 = 3", "Vx1a = 2", "P18a = 4",
+    "Alfa = C1X + 1", "Alfa = Vx1a + Vx010599", "Alfa = P18a + P18", "Alfa = C1ñ",
+    "Alfa = Vx.1b", "Alfa = C 12x", "Alfa = Cx1", "Alfa = C1 + Vx010599 + P3",
+    "C1105 = 2", "Vx010599 = C1105 * P18", "Vx.12 = 3", "C 12 = 3", "Vx010599 = 1 Vx.12 = 3",
+]
+
+def texto_maestro(path):
+    """Mismo ensamblaje que ObservationPipeline.process (sin reportes)."""
+    data = leer_input_segmentado(path)
+    normalizer = Normalizer()
+    cond = normalizer.clean_section(data["cond_entrada"], "Condición Entrada")
+    variables = [normalizer.clean_section(data[k], k) for k in ("vars_pre", "vars_post")]
+    normas = normalizer.clean_section(data["normas"], "Normas")
+    texto = f"Condición de Entrada: {cond}\n\n" if cond else ""
+    variables = [v for v in variables if v]
+    if variables: texto += "Variables:\n" + "\n".join(variables) + "\n\n"
+    if normas: texto += normas + "\n"
+    return texto
+
+def casos(corpus_dir):
+    rutas = [os.path.join(REPO_DIR, "input.txt")]
+    if corpus_dir: rutas += sorted(glob.glob(os.path.join(corpus_dir, "*.txt")))
+    resultado = [(os.path.basename(r), texto_maestro(r)) for r in rutas if os.path.exists(r)]
+    normalizer = Normalizer()
+    for name, formula in GLOBAL_DEFINITIONS.items():
+        clean = normalizer.clean_section(f"{name} = {formula}", f"Macro {name}").strip()
+        resultado.append((f"Macro {name}", f"Variables:\n{clean}"))
+    resultado += [(texto, f"Variables:\n{texto}") for texto in IDENTIFICADORES]
+    return resultado
+
+def parsear(parser, transformer, texto):
+    try:
+        return to_json(transformer.transform(parser.parse(texto)))
+    except Exception as e:
+        return f"ERROR {type(e).__name__}"
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compara las gramáticas Earley y LALR")
+    arg_parser.add_argument("--corpus", metavar="DIR", default=None, help="Directorio con observaciones (*.txt)")
+    args = arg_parser.parse_args()
+
+    earley = ParserEngine("earley").build(propagate_positions=False)
+    lalr = ParserEngine("lalr", cache_dir=None).build(propagate_positions=False)
+    transformer = ObservacionTransformer()
+
+    diferencias = 0
+    for nombre, texto in casos(args.corpus):
+        esperado, obtenido = parsear(earley, transformer, texto), parsear(lalr, transformer, texto)
+        if esperado != obtenido:
+            diferencias += 1
+            print(f"❌ {nombre}\n   earley: {esperado}\n   lalr:   {obtenido}")
+
+    print("✅ LALR produce los mismos árboles que Earley" if not diferencias else f"❌ {diferencias} diferencias")
+    return 1 if diferencias else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
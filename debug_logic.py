@@ -1,9 +1,10 @@
 import os
 import json
-from lark import Lark
+from app.parser.engine import ParserEngine
 from app.parser.transformer import ObservacionTransformer
 from app.parser.normalizer import Normalizer
 from app.generator.builder.logic_processor import LogicProcessor
+from app.models.domain import json_default
 
 # --- DEFINICIONES A DIAGNOSTICAR ---
 DEFINITIONS = {
@@ -13,15 +14,13 @@ DEFINITIONS = {
 
 # --- CONFIGURACIÓN ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-GRAMMAR_PATH = os.path.join(BASE_DIR, 'app', 'parser', 'grammar.lark')
+CACHE_DIR = os.path.join(BASE_DIR, '.cache')
 
 def debug_definitions():
     print("🔬 INICIANDO DIAGNÓSTICO DE LÓGICA 🔬\n")
     
-    # 1. Cargar Gramática
-    with open(GRAMMAR_PATH, 'r', encoding='utf-8') as f:
-        grammar = f.read()
-    parser = Lark(grammar, start='start', propagate_positions=True)
+    # 1. Cargar Parser (LALR precompilado)
+    parser = ParserEngine(cache_dir=CACHE_DIR).build()
     normalizer = Normalizer()
     transformer = ObservacionTransformer()
     processor = LogicProcessor()
@@ -59,7 +58,7 @@ def debug_definitions():
             continue
 
         print(f"🌳 Estructura del Árbol (Condición):")
-        print(json.dumps(logic_node, indent=2))
+        print(json.dumps(logic_node, indent=2, default=json_default))
         
         # 4. Prueba de LogicProcessor (Flatten + Extract)
         print(f"\n🧠 Análisis del LogicProcessor:")
@@ -1,181 +1,92 @@
 import os
-import json
-import re
+import argparse
 import traceback # Importante para ver errores completos
-from lark import Lark, UnexpectedCharacters, UnexpectedToken
-from app.parser.transformer import ObservacionTransformer
-from app.parser.normalizer import Normalizer
-from app.generator.scanner import VariableScanner
-from app.generator.csv_exporter import CSVExporter
-from app.generator.sii_exporter import SIIExporter
-from app.generator.builder import ScenarioBuilder
-from app.generator.param_loader import ParamLoader
-# 1. IMPORTAR DEFINICIONES GLOBALES
-from app.generator.global_definitions import GLOBAL_DEFINITIONS 
+from app.pipeline import ObservationPipeline, JSON_FORMATS
+from app.batch import BatchRunner
+from app.manifest import BuildManifest
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-GRAMMAR_PATH = os.path.join(BASE_DIR, 'app', 'parser', 'grammar.lark')
+CACHE_DIR = os.path.join(BASE_DIR, '.cache')
 INPUT_PATH = os.path.join(BASE_DIR, 'input.txt')
 OUTPUT_DIR = os.path.join(BASE_DIR, 'output')
 PARAM_PATH = os.path.join(BASE_DIR, 'parameters.csv')
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-def cargar_gramatica():
+def entero_positivo(texto):
+    """Tipo argparse: entero >= 1 (un tope de 0 escenarios dejaría la suite vacía)."""
     try:
-        with open(GRAMMAR_PATH, 'r', encoding='utf-8') as file: return file.read()
-    except FileNotFoundError: exit()
-
-def guardar_json(nombre, datos):
-    path = os.path.join(OUTPUT_DIR, nombre)
-    with open(path, 'w', encoding='utf-8') as f: json.dump(datos, f, indent=2, ensure_ascii=False)
-    return path
-
-def leer_input_segmentado(path):
-    with open(path, 'r', encoding='utf-8') as f: content = f.read()
-    def extract(tag):
-        match = re.search(f'<<<{tag}>>>(.*?)($|<<<)', content, re.DOTALL)
-        return match.group(1).strip() if match else ""
-    return {
-        "vars_pre": extract("VARIABLES_PRE"),
-        "cond_entrada": extract("CONDICION_ENTRADA"),
-        "vars_post": extract("VARIABLES_POST"),
-        "normas": extract("NORMAS")
-    }
+        valor = int(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"se esperaba un entero, no '{texto}'")
+    if valor < 1: raise argparse.ArgumentTypeError(f"debe ser al menos 1 (se recibió {valor})")
+    return valor
 
 if __name__ == "__main__":
-    try:
-        print("📥 Cargando Parámetros...")
-        param_loader = ParamLoader(PARAM_PATH)
-        parametros_dict = param_loader.load()
-
-        print("📥 Leyendo segmentos de entrada...")
-        input_data = leer_input_segmentado(INPUT_PATH)
-        
-        print("🧹 Normalizando reglas de negocio...")
-        normalizer = Normalizer()
-        
-        clean_vars_pre = normalizer.clean_section(input_data["vars_pre"], "Variables PRE")
-        clean_cond = normalizer.clean_section(input_data["cond_entrada"], "Condición Entrada")
-        clean_vars_post = normalizer.clean_section(input_data["vars_post"], "Variables POST")
-        clean_normas = normalizer.clean_section(input_data["normas"], "Normas")
+    arg_parser = argparse.ArgumentParser(description="Generador de casos de prueba para observaciones")
+    arg_parser.add_argument("--debug", action="store_true",
+                            help="Genera el árbol Lark con posiciones (debug_arbol_lark.txt) y transforma en una segunda pasada")
+    arg_parser.add_argument("--batch", metavar="DIR",
+                            help="Procesa en paralelo todas las observaciones (*.txt) de un directorio")
+    arg_parser.add_argument("--output", metavar="DIR", default=OUTPUT_DIR,
+                            help="Directorio de salida (en modo lote, una subcarpeta por documento)")
+    arg_parser.add_argument("--workers", type=int, default=None,
+                            help="Procesos en modo lote (por defecto, uno por CPU)")
+    arg_parser.add_argument("--force", action="store_true",
+                            help="Regenera todo aunque las entradas no hayan cambiado (ignora manifest.json)")
+    arg_parser.add_argument("--max-escenarios", type=entero_positivo, default=None, dest="max_escenarios",
+                            help="Tope de combinaciones por condición; al superarlo se toma una muestra determinista")
+    arg_parser.add_argument("--cobertura", type=int, default=None, metavar="T",
+                            help="Combina los bloques AND con un arreglo de cobertura T-wise (2 = pairwise) en vez del producto completo")
+    arg_parser.add_argument("--verificacion", choices=["reportar", "descartar", "no"], default="reportar",
+                            help="Reevalúa cada escenario y reporta (o descarta) los que no cumplen lo que afirman")
+    arg_parser.add_argument("--colapsar-duplicados", action="store_true", dest="colapsar_duplicados",
+                            help="Funde los escenarios con mismas entradas, tipo y resultado (se unen las descripciones)")
+    arg_parser.add_argument("--streaming", action="store_true",
+                            help="Escribe CSV / SII a medida que se generan los escenarios, sin retener la suite en memoria")
+    arg_parser.add_argument("--parquet", action="store_true",
+                            help="Exporta además casos_de_prueba.parquet (columnar, requiere pyarrow)")
+    arg_parser.add_argument("--parquet-dataset", metavar="DIR", default=None, dest="parquet_dataset",
+                            help="Agrega la suite de cada documento como partición Documento=<nombre> de un dataset Parquet")
+    arg_parser.add_argument("--json", choices=JSON_FORMATS, default=None, dest="json_format",
+                            help="Formato de arbol_logico.json y los reportes (por defecto compacto; indentado con --debug)")
+    arg_parser.add_argument("--json-gzip", action="store_true", dest="json_gzip",
+                            help="Comprime los JSON de salida (.json.gz / .jsonl.gz)")
+    args = arg_parser.parse_args()
+    verificacion = None if args.verificacion == "no" else args.verificacion
+    parquet_dataset = os.path.abspath(args.parquet_dataset) if args.parquet_dataset else None
 
-        # --- GESTIÓN DE REPORTES DE CALIDAD ---
-        path_json_report = guardar_json("reporte_calidad.json", normalizer.report)
-        path_txt_report = os.path.join(OUTPUT_DIR, "advertencias_sintaxis.txt")
-        critical_count = 0
-        with open(path_txt_report, 'w', encoding='utf-8') as f:
-            if normalizer.report:
-                f.write("="*80 + "\n")
-                f.write("⚠️  REPORTE DE INCIDENCIAS EN EL DOCUMENTO ORIGINAL\n")
-                f.write("="*80 + "\n\n")
-                for item in normalizer.report:
-                    prefix = "[INFO]"
-                    if item['nivel'] == 'CRITICAL': 
-                        prefix = "[⛔ ERROR GRAVE]"
-                        critical_count += 1
-                    elif item['nivel'] == 'WARNING':
-                        prefix = "[⚠️ ADVERTENCIA]"
-                    f.write(f"{prefix} {item['contexto']}\n")
-                    f.write(f"    {item['mensaje']}\n")
-                    f.write("-" * 40 + "\n")
+    try:
+        if args.batch:
+            runner = BatchRunner(args.batch, args.output, PARAM_PATH, CACHE_DIR,
+                                 workers=args.workers, incremental=not args.force,
+                                 max_scenarios=args.max_escenarios, covering_strength=args.cobertura,
+                                 verification=verificacion, collapse_duplicates=args.colapsar_duplicados,
+                                 streaming=args.streaming, parquet=args.parquet, parquet_dataset=parquet_dataset,
+                                 json_format=args.json_format, json_gzip=args.json_gzip)
+            resumen = runner.run()
+            print("\n✅ LOTE COMPLETADO")
+            print(f"🚀 {resumen['escenarios_totales']} escenarios en {resumen['procesados']} documentos "
+                  f"({resumen['sin_cambios']} sin cambios, {resumen['fallidos']} fallidos) en {resumen['segundos_totales']}s.")
+        else:
+            pipeline = ObservationPipeline(PARAM_PATH, CACHE_DIR, debug=args.debug,
+                                           max_scenarios=args.max_escenarios, covering_strength=args.cobertura,
+                                           verification=verificacion, collapse_duplicates=args.colapsar_duplicados,
+                                           streaming=args.streaming, parquet=args.parquet,
+                                           parquet_dataset=parquet_dataset, json_format=args.json_format,
+                                           json_gzip=args.json_gzip)
+            manifest = BuildManifest(os.path.join(args.output, "manifest.json"))
+            huellas = pipeline.fingerprints(INPUT_PATH)
+
+            if not args.force and manifest.is_fresh(INPUT_PATH, huellas, args.output):
+                print("♻️ Entradas sin cambios: se reutilizan las salidas anteriores.")
+                resumen = manifest.summary(INPUT_PATH)
             else:
-                f.write("✅ Documento procesado sin incidencias.")
-        
-        # ENSAMBLAJE DEL TEXTO MAESTRO
-        texto_maestro = ""
-        if clean_cond: texto_maestro += f"Condición de Entrada: {clean_cond}\n\n"
-        
-        vars_total = []
-        if clean_vars_pre: vars_total.append(clean_vars_pre)
-        if clean_vars_post: vars_total.append(clean_vars_post)
-        if vars_total: texto_maestro += "Variables:\n" + "\n".join(vars_total) + "\n\n"
-        
-        if clean_normas: texto_maestro += clean_normas + "\n"
-
-        with open(os.path.join(OUTPUT_DIR, "debug_assembler.txt"), 'w', encoding='utf-8') as f:
-            f.write(texto_maestro)
-
-        # PARSING
-        grammar_text = cargar_gramatica()
-        parser = Lark(grammar_text, start='start', propagate_positions=True)
-        arbol_bruto = parser.parse(texto_maestro)
-        transformer = ObservacionTransformer()
-        datos_arbol = transformer.transform(arbol_bruto)
-
-        # 2. PROCESAR MACROS GLOBALES (FIXED)
-        print("\n🌍 Procesando Definiciones Globales...")
-        parsed_macros = {}
-        
-        for name, formula in GLOBAL_DEFINITIONS.items():
-            try:
-                # 1. Normalización
-                raw_input = f"{name} = {formula}"
-                clean_formula = normalizer.clean_section(raw_input, context_name=f"Macro {name}")
-                clean_formula = clean_formula.strip()
-                
-                if not clean_formula: continue
-
-                # 2. Parseo
-                macro_text = f"Variables:\n{clean_formula}"
-                macro_tree = parser.parse(macro_text)
-                
-                # 3. Transformación
-                macro_data_list = transformer.transform(macro_tree)
-                
-                # 4. Extracción Correcta (Manejo de Lista de Secciones)
-                logic_found = None
-                
-                # Iteramos sobre las secciones encontradas (usualmente solo una: Variables)
-                for section in macro_data_list:
-                    if section.get('section') == 'Variables':
-                        # Iteramos sobre las variables dentro de la sección
-                        for var_item in section.get('content', []):
-                            if var_item.get('target') == name:
-                                logic_found = var_item.get('logic')
-                                break
-                    if logic_found: break
-                
-                if logic_found:
-                    parsed_macros[name] = logic_found
-                    # print(f"   ✅ {name} cargada.")
-                else:
-                    print(f"   ⚠️ FALLO: No se pudo extraer la lógica para {name}.")
-
-            except Exception as e:
-                print(f"   ❌ ERROR en {name}: {e}")
-
-        print(f"🐛 [DEBUG] Macros cargadas: {len(parsed_macros)}")
-
-        # GENERACIÓN
-        scanner = VariableScanner()
-        scanner.scan(datos_arbol)
-
-        print("🔍 Escaneando variables en macros globales...")
-        for macro_name, macro_logic in parsed_macros.items():
-            dummy_structure = {
-                "variables": [
-                    {"target": macro_name, "logic": macro_logic}
-                ]
-            }
-            scanner.scan(dummy_structure)
-        
-        reporte_vars = scanner.get_report()
-
-        print("🧠 Generando Escenarios...")
-        # 3. PASAMOS LAS MACROS AL BUILDER
-        builder = ScenarioBuilder(datos_arbol, parameters=parametros_dict, macros=parsed_macros)
-        escenarios = builder.build_suite()
-
-        headers = reporte_vars["Vectores_Requeridos"] + reporte_vars["Codigos_Requeridos"]
-        CSVExporter(OUTPUT_DIR).export("casos_de_prueba.csv", headers, escenarios)
-        SIIExporter(OUTPUT_DIR).export("casos_oficiales_sii.txt", headers, escenarios)
-        
-        guardar_json("arbol_logico.json", datos_arbol)
-        
-        print("\n✅ PROCESO COMPLETADO")
-        print(f"🚀 {len(escenarios)} escenarios generados.")
+                resumen = pipeline.process(INPUT_PATH, args.output)
+                manifest.record(INPUT_PATH, huellas, resumen)
+                manifest.save()
+            print("\n✅ PROCESO COMPLETADO")
+            print(f"🚀 {resumen['escenarios']} escenarios generados.")
 
     except Exception as e:
-        import traceback
         traceback.print_exc()
-        print(f"\n❌ ERROR FATAL: {e}")
\ No newline at end of file
+        print(f"\n❌ ERROR FATAL: {e}")
@@ -0,0 +1,32 @@
+import itertools
+from app.generator.builder.covering import covering_array
+
+def assert_covers(rows, sizes, strength):
+    for group in itertools.combinations(range(len(sizes)), strength):
+        seen = {tuple(row[c] for c in group) for row in rows}
+        assert seen == set(itertools.product(*[range(sizes[c]) for c in group])), group
+
+def test_first_row_is_the_golden_path():
+    assert covering_array([3, 2, 4, 2])[0] == (0, 0, 0, 0)
+
+def test_pairwise_covers_every_pair_with_fewer_rows():
+    sizes = [3, 3, 3, 3]
+    rows = covering_array(sizes)
+    assert_covers(rows, sizes, 2)
+    assert len(rows) < 3 ** 4
+    assert len(set(rows)) == len(rows)
+
+def test_strength_three():
+    sizes = [2, 2, 2, 2, 2]
+    assert_covers(covering_array(sizes, strength=3), sizes, 3)
+
+def test_few_components_give_the_full_product():
+    assert covering_array([2, 3]) == tuple(itertools.product(range(2), range(3)))
+    assert covering_array([4]) == ((0,), (1,), (2,), (3,))
+
+def test_empty_component_gives_no_rows():
+    assert covering_array([3, 0, 2]) == ()
+
+def test_memoized_by_shape():
+    assert covering_array([3, 2, 2]) is covering_array((3, 2, 2))
+    assert isinstance(covering_array([3, 2, 2]), tuple)
@@ -0,0 +1,59 @@
+from app.generator.builder.core import ScenarioBuilder
+
+def make_builder(**kwargs):
+    return ScenarioBuilder([], parameters={"P18": 10000}, **kwargs)
+
+def descriptions(builder):
+    return [builder.scenarios[i]["Descripcion"] for i in range(len(builder.scenarios))]
+
+def test_case_key_is_a_fixed_size_digest():
+    builder = make_builder()
+    key = builder._case_key("Cond. OK", "Cumple", {"C1": 1, "Vx010599": 2})
+    assert isinstance(key, bytes) and len(key) == 16
+    assert key == builder._case_key("Cond. OK", "Cumple", {"C1": 1, "Vx010599": 2})
+    # repr distingue 1000 de 1000.0
+    assert builder._case_key("Cond. OK", "Cumple", {"C1": 1000}) != builder._case_key("Cond. OK", "Cumple", {"C1": 1000.0})
+
+def test_duplicates_are_counted_but_kept_by_default():
+    builder = make_builder()
+    builder._add_case("Cond. OK", "a", {"C1": 5, "P18": 10000, "Alfa": 3}, "Cumple")
+    builder._add_case("Cond. OK", "b", {"C1": 5}, "Cumple")
+    builder._add_case("Cond. OK", "c", {"C1": 6}, "Cumple")
+    assert len(builder.scenarios) == 3
+    assert builder.duplicate_count == 1
+    assert builder.case_index == {}
+    assert len(builder.case_digests) == 2
+
+def test_collapse_merges_descriptions_into_first_row():
+    builder = make_builder(collapse_duplicates=True)
+    builder._add_case("Cond. OK", "a", {"C1": 5}, "Cumple")
+    builder._add_case("Cond. OK", "b", {"C1": 5, "C2": 0}, "Cumple")
+    builder._add_case("Cond. NK", "c", {"C1": 5}, "No Cumple")
+    assert len(builder.scenarios) == 2
+    assert builder.duplicate_count == 1
+    assert descriptions(builder) == ["a | b", "c"]
+    assert len(builder.case_index) == 2 and not builder.case_digests
+
+class ListSink:
+    def __init__(self): self.rows = []
+    def write(self, case_id, tipo, desc, resultado, inputs): self.rows.append((case_id, desc, dict(inputs)))
+
+def stream_builder(collapse):
+    builder = make_builder(collapse_duplicates=collapse, retain_scenarios=False)
+    return builder, builder.add_sink(ListSink())
+
+def test_streaming_keeps_only_digests():
+    builder, sink = stream_builder(collapse=False)
+    for i in range(50): builder._add_case("Cond. OK", f"#{i}", {"C1": i % 5}, "Cumple")
+    assert len(sink.rows) == 50
+    assert builder.duplicate_count == 45
+    assert len(builder.scenarios) == 0 and builder.case_index == {}
+    assert len(builder.case_digests) == 5
+
+def test_streaming_collapse_drops_duplicates():
+    builder, sink = stream_builder(collapse=True)
+    for i in range(50): builder._add_case("Cond. OK", f"#{i}", {"C1": i % 5}, "Cumple")
+    assert [desc for _, desc, _ in sink.rows] == ["#0", "#1", "#2", "#3", "#4"]
+    assert [case_id for case_id, _, _ in sink.rows] == list(range(11468, 11473))
+    assert builder.duplicate_count == 45
+    assert builder.case_index == {} and len(builder.case_digests) == 5
@@ -0,0 +1,52 @@
+from app.generator.builder.dependency_graph import VariableDependencyGraph
+from app.generator.math_engine import MathEngine
+from app.models.domain import BinOp, Comparison, Conditional, Sum, Var
+
+MACROS = {"DEP": Sum([Var("C940"), Var("C938")])}
+
+def instr(target, logic):
+    return {"target": target, "logic": logic}
+
+# Gamma se lee antes de definirse: el orden topológico la adelanta
+BLOCK = [
+    instr("Alfa", BinOp("+", Var("C1"), Var("Gamma"))),
+    instr("Beta", BinOp("*", Var("C2"), 2)),
+    instr("Gamma", Conditional(Comparison(">", Var("DEP"), 0), Var("C3"), 0)),
+    instr("Delta", BinOp("-", Var("Alfa"), Var("Beta"))),
+]
+
+def make_graph(block=BLOCK):
+    return VariableDependencyGraph(block, MathEngine(macros=MACROS))
+
+def test_stable_topological_order():
+    graph = make_graph()
+    assert graph.valid
+    assert [item["target"] for item in graph.order] == ["Beta", "Gamma", "Alfa", "Delta"]
+
+def test_affected_follows_macros_and_readers():
+    graph = make_graph()
+    assert graph.affected({"C940"}) == {"Gamma", "Alfa", "Delta"}
+    assert graph.affected({"C2"}) == {"Beta", "Delta"}
+    assert graph.affected({"C99"}) == set()
+
+def test_recompute_matches_full_evaluation():
+    graph = make_graph()
+    base = {"C1": 10, "C2": 3, "C3": 7, "C940": 1}
+    base_results = graph.evaluate(base)
+    assert base_results == {"Beta": 6, "Gamma": 7, "Alfa": 17, "Delta": 11}
+    for change in ({"C940": 0}, {"C2": 5}, {"C1": 10.0}, {"C3": 1, "C938": 4}, {}):
+        new = {**base, **change}
+        assert graph.recompute(base, base_results, new) == graph.evaluate(new), change
+
+def test_recompute_reuses_unaffected_results():
+    graph = make_graph()
+    base = {"C1": 10, "C2": 3, "C3": 7, "C940": 1}
+    # Beta no depende de C1: se toma de base_results aunque no coincida con evaluate()
+    stale = dict(graph.evaluate(base), Beta=-1)
+    assert graph.recompute(base, stale, {**base, "C1": 20}) == {"Beta": -1, "Gamma": 7, "Alfa": 27, "Delta": 28}
+
+def test_cycles_fall_back_to_file_order():
+    graph = make_graph([instr("A", BinOp("+", Var("B"), 1)), instr("B", BinOp("+", Var("A"), 1))])
+    assert not graph.valid
+    assert [item["target"] for item in graph.order] == ["A", "B"]
+    assert graph.affected({"C1"}) == {"A", "B"}
@@ -0,0 +1,26 @@
+"""
+Salida de referencia: input.txt debe producir exactamente el CSV y el SII de la
+versión base (tests/golden/). Un cambio intencional en la suite actualiza estos
+archivos en el mismo commit.
+"""
+import os
+import pytest
+from app.pipeline import ObservationPipeline
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+@pytest.fixture(scope="module")
+def output_dir(tmp_path_factory):
+    out = tmp_path_factory.mktemp("output")
+    pipeline = ObservationPipeline(os.path.join(REPO_DIR, "parameters.csv"), str(tmp_path_factory.mktemp("cache")),
+                                   verbose=False)
+    pipeline.process(os.path.join(REPO_DIR, "input.txt"), str(out))
+    return out
+
+@pytest.mark.parametrize("filename", ["casos_de_prueba.csv", "casos_oficiales_sii.txt"])
+def test_input_txt_matches_golden(output_dir, filename):
+    with open(os.path.join(GOLDEN_DIR, filename), "rb") as f: expected = f.read().decode("utf-8-sig").splitlines()
+    with open(os.path.join(output_dir, filename), "rb") as f: obtained = f.read().decode("utf-8-sig").splitlines()
+    assert len(obtained) == len(expected)
+    assert obtained == expected
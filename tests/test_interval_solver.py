@@ -0,0 +1,64 @@
+from app.generator.builder.core import ScenarioBuilder
+from app.generator.builder.interval_solver import Interval, REPRESENTATIVE_AMOUNT
+from app.models.domain import BinOp, Conditional, Comparison, FunctionCall, Sum, Var
+
+PARAMETERS = {"P18": 10000}
+MACROS = {
+    "DEP": Sum([Var("C940"), Var("C938")]),
+    "REX_2": Conditional(Comparison(">", Var("C104"), 0), 1, 0),
+}
+
+def make_solver():
+    return ScenarioBuilder([], parameters=dict(PARAMETERS), macros=MACROS).interval_solver
+
+def pred(left, op, right, target=None):
+    if target is None: target = left if isinstance(left, str) else make_solver().leaf_index.leaves(left, "processor")[0]
+    return {"target": target, "op": op, "right_tree": right, "value": [0], "left_tree": left}
+
+def test_interval_pick():
+    assert Interval(1, float("inf")).pick() == REPRESENTATIVE_AMOUNT
+    assert Interval(10001, float("inf")).pick() == 10001
+    assert Interval(0, 99).pick() == 99
+    assert Interval(0, float("inf")).pick(avoid=1) == 2
+    assert Interval(0, 5).pick(avoid=5) == 4
+
+def test_simple_bounds():
+    solver = make_solver()
+    assert solver.solve([pred("C1105", ">", 0)]) == {"C1105": 1000}
+    assert solver.solve([pred("Vx014684", ">", "P18")]) == {"Vx014684": 10001}
+    assert solver.solve([pred("Vx010599", "=", 111)]) == {"Vx010599": 111}
+    assert solver.solve([pred("Vx010042", "≠", 1)]) == {"Vx010042": 2}
+
+def test_residual_of_sums_and_differences():
+    solver = make_solver()
+    assert solver.solve([pred(Sum([Var("C1592"), Var("C1024")]), "<", 100)]) == {"C1592": 99}
+    difference = BinOp("-", BinOp("-", Var("C1"), Var("C2")), Var("C3"))
+    assert solver.solve([pred(difference, ">", 0)]) == {"C1": 1000}
+
+def test_intersects_every_predicate_on_a_variable():
+    assert make_solver().solve([pred("C300", "<", 20), pred("C300", ">", 5)]) == {"C300": 19}
+
+def test_products_greater_than_zero():
+    product = BinOp("*", Var("C1"), Var("C2"))
+    assert make_solver().solve([pred(product, ">", 0)]) == {"C1": 1000, "C2": 1000}
+    assert make_solver().solve([pred(product, ">", 0)], violate=True) == {"C1": 0}
+
+def test_pos_is_transparent_when_equivalent():
+    left = FunctionCall("POS", [BinOp("-", Var("C1"), Var("C2"))])
+    assert make_solver().solve([pred(left, ">", 0)]) == {"C1": 1000}
+
+def test_linear_macros_expand_to_their_inputs():
+    solver = make_solver()
+    assert solver.solve([pred("DEP", ">", "P18")]) == {"C940": 10001}
+    assert solver.solve([pred("DEP", ">", "P18")], violate=True) == {"C940": 10000}
+
+def test_violate_only_assigns_real_inputs():
+    # REX_2 es una macro condicional: no hay entrada que resolver, no se inventa un sabotaje
+    left = Sum([Var("REX_2"), Var("Vx010156")])
+    assert make_solver().solve([pred(left, "=", 0)], violate=True) == {}
+    # En el caso OK el líder se delega igual que antes
+    assert make_solver().solve([pred(left, "=", 0)]) == {"REX_2": 0}
+
+def test_violate_keeps_in_predicates():
+    assert make_solver().solve([pred("C5", "IN", 0)]) == {"C5": 0}
+    assert make_solver().solve([pred("C5", "IN", 0)], violate=True) == {"C5": 1}
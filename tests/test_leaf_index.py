@@ -0,0 +1,28 @@
+from app.generator.builder.leaf_index import LeafIndex
+from app.models.domain import BinOp, Comparison, Conditional, FunctionCall, Sum, Var
+
+TREE = Conditional(Comparison(">", FunctionCall("MIN", [Var("C1"), Var("Alfa")]), Var("P18")),
+                   Sum([Var("Vx010599"), Var("REX_2")]), 0)
+
+def test_leaves_in_order_per_flavor():
+    index = LeafIndex()
+    assert index.leaves(TREE) == ["C1", "Alfa", "P18", "Vx010599", "REX_2"]
+    # "processor" no omite la clave type: "conditional" es una hoja para LogicProcessor
+    assert index.leaves(TREE, "processor") == ["conditional", "C1", "Alfa", "P18", "Vx010599", "REX_2"]
+    assert index.leaves(BinOp("-", Var("C1"), 100)) == ["C1"]
+    assert index.leaves("MIN") == [] and index.leaves("Y", "processor") == ["Y"]
+
+def test_dict_nodes_match_model_nodes():
+    as_dict = {"op": "+", "terms": [{"op": ">", "left": "C2", "right": "P3"}, "C_4", "1000"]}
+    assert LeafIndex().leaves(as_dict) == ["C2", "P3", "C_4", "1000"]
+
+def test_roots_resolve_through_var_definitions():
+    index = LeafIndex({"Alfa": BinOp("+", Var("C7"), Var("Beta")), "Beta": Var("Vx010087")})
+    assert index.roots(TREE) == ["C1", "C7", "Vx010087", "P18", "Vx010599", "REX_2"]
+
+def test_annotated_results_are_fresh_lists():
+    index = LeafIndex().annotate(TREE)
+    first = index.leaves(TREE)
+    first.append("X")
+    assert index.leaves(TREE) == ["C1", "Alfa", "P18", "Vx010599", "REX_2"]
+    assert index.roots(TREE) is not index.roots(TREE)
@@ -0,0 +1,46 @@
+from array import array
+from app.models.scenario_table import InputColumn, ScenarioTable
+
+def make_table():
+    table = ScenarioTable()
+    table.append(11468, "Cond. OK", "a", "Cumple", {"C1": 5, "Vx010599": 1000})
+    table.append(11469, "Cond. NK", "b", "No Cumple", {"Vx010599": 1000.0})
+    table.append(11470, "Cond. OK", "c", "Cumple", {"C2": "K", "C1": 7})
+    return table
+
+def test_column_keeps_typed_arrays_while_homogeneous():
+    ints, floats = InputColumn("C1", 0), InputColumn("C2", 1)
+    for row, value in enumerate([1, 2, 3]): ints.append(row, value)
+    for row, value in enumerate([1.5, 2.0]): floats.append(row, value)
+    assert isinstance(ints.values, array) and ints.values.typecode == 'q'
+    assert isinstance(floats.values, array) and floats.values.typecode == 'd'
+
+def test_column_switches_to_list_on_mixed_types():
+    column = InputColumn("C1", 0)
+    for row, value in enumerate([1000, 1000.0, 2 ** 70, "K"]): column.append(row * 2, value)
+    assert isinstance(column.values, list)
+    values = [column.get(row) for row in (0, 2, 4, 6)]
+    assert values == [1000, 1000.0, 2 ** 70, "K"]
+    assert [type(v) for v in values] == [int, float, int, str]
+    assert column.get(1) is None and column.get(1, 0) == 0
+    rows, values = column.slice(2, 6)
+    assert list(rows) == [2, 4] and list(values) == [1000.0, 2 ** 70]
+
+def test_rows_read_like_the_original_dicts():
+    table = make_table()
+    assert len(table) == 3
+    assert dict(table[0]) == {"ID_Caso": "11468", "Tipo": "Cond. OK", "Descripcion": "a",
+                              "Resultado_Esperado": "Cumple", "Contexto_Visual": "[1]=5; Vx010599=1000",
+                              "C1": 5, "Vx010599": 1000}
+    assert table[-1]["C2"] == "K" and "C2" not in table[0]
+    assert type(table[1]["Vx010599"]) is float
+    assert list(table.inputs(2)) == [("C2", "K"), ("C1", 7)]
+    assert table.column_names() == ["C1", "Vx010599", "C2"]
+
+def test_append_description_and_select():
+    table = make_table()
+    table.append_description(0, " | d")
+    selected = table.select([2, 0])
+    assert [row["Descripcion"] for row in selected] == ["c", "a | d"]
+    assert [row["ID_Caso"] for row in selected] == ["11470", "11468"]
+    assert dict(selected.inputs(1)) == {"C1": 5, "Vx010599": 1000}